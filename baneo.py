@@ -0,0 +1,478 @@
+# =============================
+# MOTOR DE BANEO (MÁSCARAS DE BITS) - REV
+# =============================
+# Cada mapa del pool tiene UNA máscara chica en fase["bans"]:
+#   bit 1 = Axis baneado, bit 2 = Allies baneado  (3 = mapa muerto)
+# Solo se guardan los mapas con algún ban ({mapa: máscara}); el resto vale 0.
+# Reemplaza a la lista de strings fase["baneados"] ("Omaha Axis"), que se
+# recorría con in / startswith en cada click (y startswith confundía mapas
+# con nombres que empiezan igual: "Omaha" vs "Omaha Beach").
+# Funciones puras sobre el dict de la fase: sin Discord ni persistencia.
+from collections import namedtuple
+from functools import lru_cache
+
+AXIS = 1
+ALLIES = 2
+AMBAS = AXIS | ALLIES
+PICK = 4                 # formatos de veto: mapa elegido para jugar
+TODOS = AMBAS | PICK
+
+FACCIONES = ("Axis", "Allies")
+BITS = {"Axis": AXIS, "Allies": ALLIES}
+
+# facciones vivas por máscara (tabla de 4 entradas, en orden Axis/Allies)
+_VIVAS = tuple(
+    tuple(f for f in FACCIONES if not m & BITS[f])
+    for m in range(AMBAS + 1)
+)
+
+# mapa todavía en juego (ni muerto ni pickeado), por máscara
+_EN_JUEGO = tuple((m & AMBAS) != AMBAS and not m & PICK for m in range(TODOS + 1))
+
+
+def opuesta(faccion: str) -> str:
+    return "Axis" if faccion == "Allies" else "Allies"
+
+
+def mascara(fase: dict, mapa) -> int:
+    return fase.get("bans", {}).get(mapa, 0)
+
+
+def esta_baneada(fase: dict, mapa, faccion: str) -> bool:
+    return bool(mascara(fase, mapa) & BITS.get(faccion, 0))
+
+
+def banear(fase: dict, mapa, faccion: str) -> bool:
+    """Marca el ban. Devuelve False si ya estaba (o la facción no existe)."""
+    bit = BITS.get(faccion)
+    if bit is None:
+        return False
+
+    bans = fase.setdefault("bans", {})
+    actual = bans.get(mapa, 0)
+    if actual & bit:
+        return False
+
+    bans[mapa] = actual | bit
+    return True
+
+
+def facciones_vivas(fase: dict, mapa) -> tuple:
+    return _VIVAS[mascara(fase, mapa) & AMBAS]
+
+
+def mapas_vivos(fase: dict) -> list:
+    bans = fase.get("bans", {})
+    return [m for m in fase.get("map_pool", []) if _EN_JUEGO[bans.get(m, 0)]]
+
+
+def evaluar_cierre(fase: dict):
+    """
+    Mismas rutas que antes, sobre las máscaras:
+    - 1 mapa / 1 facción   -> RUTA_2_AUTO (cierre automático)
+    - 1 mapa / 2 facciones -> RUTA_2_FINAL_BAN (Final Ban decide facción)
+    - 2 mapas / 1 facción c/u -> RUTA_1_FINAL_BAN (Final Ban decide mapa)
+    - si no -> None
+    """
+    bans = fase.get("bans", {})
+    vivos = []
+    for m in fase.get("map_pool", []):
+        if bans.get(m, 0) != AMBAS:
+            vivos.append(m)
+            if len(vivos) > 2:
+                return None  # aún quedan demasiados mapas
+
+    if len(vivos) == 1:
+        mapa = vivos[0]
+        facciones = _VIVAS[bans.get(mapa, 0)]
+
+        if len(facciones) == 1:
+            equipo_final = fase["coinflip"]["ganador"]
+            equipo_opuesto = "B" if equipo_final == "A" else "A"
+            return {
+                "ruta": "RUTA_2_AUTO",
+                "mapa_final": mapa,
+                "facciones_finales": {
+                    equipo_final: facciones[0],
+                    equipo_opuesto: opuesta(facciones[0])
+                }
+            }
+
+        return {
+            "ruta": "RUTA_2_FINAL_BAN",
+            "accion": "esperar_final_ban_faccion",
+            "mapa": mapa
+        }
+
+    if len(vivos) == 2 and all(bans.get(m, 0) in (AXIS, ALLIES) for m in vivos):
+        return {
+            "ruta": "RUTA_1_FINAL_BAN",
+            "accion": "esperar_final_ban_mapa",
+            "mapas": vivos,
+            "facciones_por_mapa": {m: set(_VIVAS[bans[m]]) for m in vivos}
+        }
+
+    return None
+
+# =============================
+# CONVERSIÓN LEGACY "baneados" -> MÁSCARAS - REV
+# =============================
+def convertir_legacy(map_pool: list, baneados: list, bans: dict | None = None):
+    """
+    ["Omaha Axis", ...] -> {"Omaha": 1, ...} con match EXACTO de mapa.
+    Devuelve (bans, resto): `resto` son las entradas que no corresponden a
+    ningún mapa/facción del pool (se conservan tal cual: no se pierde nada).
+    """
+    bans = dict(bans or {})
+    pool = set(map_pool)
+    resto = []
+
+    for entrada in baneados:
+        mapa, _, faccion = str(entrada).rpartition(" ")
+        bit = BITS.get(faccion)
+        if bit is None or mapa not in pool:
+            resto.append(entrada)
+            continue
+        bans[mapa] = bans.get(mapa, 0) | bit
+
+    return bans, resto
+
+
+def a_legacy(fase: dict) -> list:
+    """Inverso de convertir_legacy (en el orden del pool)."""
+    bans = fase.get("bans", {})
+    return [
+        f"{m} {f}"
+        for m in fase.get("map_pool", [])
+        for f in FACCIONES
+        if bans.get(m, 0) & BITS[f]
+    ]
+
+# =============================
+# MÁQUINA DE ESTADOS DE LA FASE - REV
+# =============================
+# Turnos, Extra/Final ban y rutas de cierre en UNA tabla precompilada por
+# tamaño de pool. El estado abstracto no guarda QUÉ mapa se baneó, solo
+# cuántos mapas quedan con 2 facciones (n2) y con 1 (n1): con eso alcanza
+# para decidir turno y cierre. Los estados y acciones son ints, así que
+# apply() es una indexación de lista (sirve para simular millones de
+# secuencias al verificar).
+
+ELEGIR = "ELEGIR"        # el ganador del coinflip elige Extra o Final
+NORMAL = "NORMAL"
+FINAL_BAN = "FINAL_BAN"
+CERRADA = "CERRADA"
+
+# acciones
+ELEGIR_EXTRA = 0         # el ganador del coinflip toma Extra Ban (2)
+ELEGIR_FINAL = 1         # el ganador del coinflip toma Final Ban (1)
+BAN_MAPA_LLENO = 2       # ban en un mapa con las 2 facciones vivas
+BAN_MAPA_MEDIO = 3       # ban de la última facción viva de un mapa
+_ACCIONES = 4
+
+RUTA_2_AUTO = "RUTA_2_AUTO"
+RUTA_2_FINAL_BAN = "RUTA_2_FINAL_BAN"
+RUTA_1_FINAL_BAN = "RUTA_1_FINAL_BAN"
+
+EstadoFase = namedtuple("EstadoFase", "etapa turno extra contador n2 n1")
+
+
+def _otro(equipo: str) -> str:
+    return "B" if equipo == "A" else "A"
+
+
+def ruta_cierre(n2: int, n1: int):
+    """Misma regla que evaluar_cierre, sobre los contadores."""
+    if n2 + n1 == 1:
+        return RUTA_2_AUTO if n1 == 1 else RUTA_2_FINAL_BAN
+    if n2 == 0 and n1 == 2:
+        return RUTA_1_FINAL_BAN
+    return None
+
+
+def _siguiente(e: EstadoFase, accion: int):
+    if e.etapa == ELEGIR:
+        if accion not in (ELEGIR_EXTRA, ELEGIR_FINAL):
+            return None
+        # el equipo con Final Ban siempre abre los baneos
+        extra = e.turno if accion == ELEGIR_EXTRA else _otro(e.turno)
+        etapa = FINAL_BAN if ruta_cierre(e.n2, e.n1) in (RUTA_1_FINAL_BAN, RUTA_2_FINAL_BAN) else NORMAL
+        return e._replace(etapa=etapa, turno=_otro(extra), extra=extra)
+
+    if e.etapa not in (NORMAL, FINAL_BAN):
+        return None
+
+    if accion == BAN_MAPA_LLENO and e.n2 > 0:
+        e = e._replace(n2=e.n2 - 1, n1=e.n1 + 1)
+    elif accion == BAN_MAPA_MEDIO and e.n1 > 0:
+        e = e._replace(n1=e.n1 - 1)
+    else:
+        return None
+
+    ruta = ruta_cierre(e.n2, e.n1)
+    if ruta == RUTA_2_AUTO:
+        return e._replace(etapa=CERRADA)
+    if ruta is not None:
+        # Final Ban: decide el equipo con tipo "final"
+        return e._replace(etapa=FINAL_BAN, turno=_otro(e.extra))
+    if e.etapa != NORMAL:
+        return e
+
+    # turno normal: Extra banea DOS veces seguidas, Final UNA
+    if e.turno == e.extra and e.contador + 1 < 2:
+        return e._replace(contador=e.contador + 1)
+    return e._replace(turno=_otro(e.turno), contador=0)
+
+
+class MaquinaBaneo:
+    __slots__ = ("n_mapas", "estados", "indice", "tabla", "rutas")
+
+    def __init__(self, n_mapas: int):
+        self.n_mapas = n_mapas
+        self.estados = []
+        self.indice = {}
+        self.tabla = []
+        self.rutas = []
+
+        pendientes = [self._alta(EstadoFase(ELEGIR, g, None, 0, n_mapas, 0)) for g in ("A", "B")]
+        while pendientes:
+            i = pendientes.pop()
+            for accion in range(_ACCIONES):
+                sig = _siguiente(self.estados[i], accion)
+                if sig is None:
+                    continue
+                nuevo = sig not in self.indice
+                j = self._alta(sig)
+                self.tabla[i * _ACCIONES + accion] = j
+                if nuevo:
+                    pendientes.append(j)
+
+    def _alta(self, e: EstadoFase) -> int:
+        i = self.indice.get(e)
+        if i is None:
+            i = len(self.estados)
+            self.indice[e] = i
+            self.estados.append(e)
+            self.tabla.extend([-1] * _ACCIONES)
+            self.rutas.append(ruta_cierre(e.n2, e.n1) if e.etapa != ELEGIR else None)
+        return i
+
+    def inicial(self, ganador: str) -> int:
+        return self.indice[EstadoFase(ELEGIR, ganador, None, 0, self.n_mapas, 0)]
+
+    def apply(self, estado: int, accion: int) -> int:
+        """Transición O(1). Devuelve -1 si la acción no vale en ese estado."""
+        if estado < 0:
+            return -1
+        return self.tabla[estado * _ACCIONES + accion]
+
+    def ruta(self, estado: int):
+        return self.rutas[estado]
+
+
+@lru_cache(maxsize=None)
+def maquina(n_mapas: int) -> MaquinaBaneo:
+    """Se compila UNA vez por tamaño de pool."""
+    return MaquinaBaneo(n_mapas)
+
+# =============================
+# FASE (dict) <-> ESTADO DE LA MÁQUINA - REV
+# =============================
+def accion_ban(fase: dict, mapa) -> int:
+    return BAN_MAPA_LLENO if mascara(fase, mapa) == 0 else BAN_MAPA_MEDIO
+
+
+def estado_de_fase(fase: dict):
+    """(máquina, estado) de una fase guardada; estado -1 si es inconsistente."""
+    pool = fase.get("map_pool", [])
+    m = maquina(len(pool))
+
+    bans = fase.get("bans", {})
+    n2 = n1 = 0
+    for mapa in pool:
+        b = bans.get(mapa, 0)
+        if b == 0:
+            n2 += 1
+        elif b != AMBAS:
+            n1 += 1
+
+    equipos = fase.get("equipos", {})
+    extra = next((k for k in ("A", "B") if equipos.get(k, {}).get("tipo") == "extra"), None)
+    ganador = fase.get("coinflip", {}).get("ganador")
+
+    if extra is None:
+        e = EstadoFase(ELEGIR, ganador, None, 0, n2, n1)
+    else:
+        if not fase.get("activa", True):
+            etapa = CERRADA
+        else:
+            etapa = FINAL_BAN if fase.get("estado") == FINAL_BAN else NORMAL
+        e = EstadoFase(etapa, fase.get("turno_actual"), extra, fase.get("contador_extra", 0), n2, n1)
+
+    return m, m.indice.get(e, -1)
+
+
+def volcar_estado(fase: dict, m: MaquinaBaneo, estado: int):
+    """Escribe en la fase lo que la máquina decide (turno, tipos, etapa)."""
+    if estado < 0:
+        return  # fase inconsistente: no se toca
+    e = m.estados[estado]
+    fase["turno_actual"] = e.turno
+    fase["contador_extra"] = e.contador
+
+    if e.extra is not None:
+        final = _otro(e.extra)
+        equipos = fase.setdefault("equipos", {})
+        equipos.setdefault(e.extra, {}).update(tipo="extra", baneos_restantes=2)
+        equipos.setdefault(final, {}).update(tipo="final", baneos_restantes=1)
+
+        coinflip = fase.setdefault("coinflip", {})
+        coinflip["eleccion"] = "extra" if coinflip.get("ganador") == e.extra else "final"
+
+    if e.etapa in (NORMAL, FINAL_BAN):
+        fase["estado"] = e.etapa
+    elif e.etapa == CERRADA:
+        fase["activa"] = False
+
+# =============================
+# FORMATOS DE VETO (DATA-DRIVEN) - REV
+# =============================
+# Un formato es una secuencia de pasos (acción, equipo):
+#   "ban"  -> descarta un mapa entero        "pick" -> elige un mapa para jugar
+#   "lado" -> elige facción en el último pick (el rival juega la otra)
+#   equipo "G" = ganador del coinflip, "P" = perdedor
+# Después de `pasos`, `relleno` se repite (bans alternados) hasta que queda
+# UN mapa: ese es el decider (pick automático) y `lado_decider` elige lado.
+# Se compila por (formato, tamaño de pool) a una tupla de pasos: cada click
+# es una indexación, sin ramas por formato en la UI.
+# El flujo Extra Ban / Final Ban original sigue siendo la máquina de arriba
+# (fase sin "formato").
+FORMATOS_VETO = {
+    "BO1": {
+        "pasos": (),
+        "relleno": (("ban", "G"), ("ban", "P")),
+        "lado_decider": "P",
+    },
+    "BO3": {
+        "pasos": (
+            ("ban", "G"), ("ban", "P"),
+            ("pick", "G"), ("lado", "P"),
+            ("pick", "P"), ("lado", "G"),
+        ),
+        "relleno": (("ban", "G"), ("ban", "P")),
+        "lado_decider": "G",
+    },
+}
+
+PasoVeto = namedtuple("PasoVeto", "accion equipo botones con_next")
+
+# botones por acción: (etiqueta, valor); valor None = mapa actual
+_BOTONES = {
+    "ban": (("🚫 Ban map", None),),  # FIX (EN)
+    "pick": (("✅ Pick map", None),),  # FIX (EN)
+    "lado": (("🎖️ Play Axis", "Axis"), ("🎖️ Play Allies", "Allies")),  # FIX (EN)
+    "decider": (),
+}
+
+
+@lru_cache(maxsize=None)
+def compilar_formato(nombre: str, n_mapas: int) -> tuple:
+    """Tupla de PasoVeto. ValueError si el formato no existe o el pool no alcanza."""
+    spec = FORMATOS_VETO.get(nombre)
+    if spec is None:
+        raise ValueError(f"Unknown veto format: {nombre}")  # FIX (EN)
+
+    pasos = list(spec["pasos"])
+    restantes = n_mapas - sum(1 for accion, _ in pasos if accion in ("ban", "pick"))
+    if restantes < 1:
+        raise ValueError(f"{nombre} needs at least {n_mapas - restantes + 1} maps")  # FIX (EN)
+
+    relleno = spec["relleno"]
+    i = 0
+    while restantes > 1:
+        pasos.append(relleno[i % len(relleno)])
+        i += 1
+        restantes -= 1
+
+    pasos.append(("decider", None))
+    pasos.append(("lado", spec["lado_decider"]))
+
+    return tuple(
+        PasoVeto(accion, equipo, _BOTONES[accion], accion in ("ban", "pick"))
+        for accion, equipo in pasos
+    )
+
+
+def _equipo_real(fase: dict, rel):
+    ganador = fase.get("coinflip", {}).get("ganador")
+    if rel == "G":
+        return ganador
+    if rel == "P":
+        return _otro(ganador)
+    return None
+
+
+def paso_actual(fase: dict):
+    """PasoVeto en curso (None si el formato terminó)."""
+    pasos = compilar_formato(fase["formato"], len(fase.get("map_pool", [])))
+    i = fase.get("paso", 0)
+    return pasos[i] if i < len(pasos) else None
+
+
+def iniciar_formato(fase: dict, nombre: str):
+    pasos = compilar_formato(nombre, len(fase.get("map_pool", [])))  # valida
+    fase["formato"] = nombre
+    fase["paso"] = 0
+    fase["picks"] = []
+    fase["estado"] = "FORMATO"
+    fase["turno_actual"] = _equipo_real(fase, pasos[0].equipo)
+
+
+def aplicar_paso(fase: dict, accion: str, valor=None):
+    """
+    Aplica el paso en curso. Devuelve None si salió bien, o el motivo:
+    "cerrada" / "paso" (no es esa acción) / "mapa" / "lado".
+    """
+    pasos = compilar_formato(fase["formato"], len(fase.get("map_pool", [])))
+    i = fase.get("paso", 0)
+    if i >= len(pasos) or not fase.get("activa", True):
+        return "cerrada"
+
+    paso = pasos[i]
+    if paso.accion != accion:
+        return "paso"
+
+    bans = fase.setdefault("bans", {})
+    picks = fase.setdefault("picks", [])
+    equipo = _equipo_real(fase, paso.equipo)
+
+    if accion in ("ban", "pick"):
+        if valor not in fase.get("map_pool", []) or not _EN_JUEGO[bans.get(valor, 0)]:
+            return "mapa"
+        if accion == "ban":
+            bans[valor] = AMBAS
+        else:
+            bans[valor] = PICK
+            picks.append({"mapa": valor, "equipo": equipo, "lados": {}})
+    else:
+        if valor not in BITS or not picks:
+            return "lado"
+        picks[-1]["lados"] = {equipo: valor, _otro(equipo): opuesta(valor)}
+
+    i += 1
+
+    # decider: el único mapa en juego se pickea solo
+    while i < len(pasos) and pasos[i].accion == "decider":
+        resto = mapas_vivos(fase)
+        if resto:
+            bans[resto[0]] = PICK
+            picks.append({"mapa": resto[0], "equipo": None, "lados": {}})
+        i += 1
+
+    fase["paso"] = i
+    if i >= len(pasos):
+        fase["activa"] = False
+        fase["mapa_actual"] = None
+    else:
+        fase["turno_actual"] = _equipo_real(fase, pasos[i].equipo)
+    return None
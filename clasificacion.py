@@ -0,0 +1,249 @@
+# =============================
+# CLASIFICACIÓN PRE-ORDENADA (INCREMENTAL) - REV
+# =============================
+# La tabla vive en torneo["tabla"] ({equipo: fila}); esta clase mantiene al
+# lado una lista ORDENADA de claves y la actualiza con bisect cada vez que
+# se registra un resultado (solo se mueven los 2 equipos del partido).
+# "top N" y "posición de X" no ordenan nada completo.
+#
+# Desempates, en orden:
+#   1) puntos  2) partidos ganados  3) enfrentamiento directo (mini-liga
+#   entre los empatados)  4) diferencia de juegos  5) juegos a favor  6) nombre
+# El directo no es un orden total (A>B>C>A), así que la lista se ordena por
+# (pts, pg, dif, gf) y los bloques empatados en (pts, pg) se resuelven al
+# consultar, solo dentro del bloque.
+# Funciones puras: sin Discord ni persistencia.
+from bisect import bisect_left, insort
+
+PTS_VICTORIA = 3
+PTS_EMPATE = 1
+
+
+def fila_vacia() -> dict:
+    return {"pj": 0, "pg": 0, "pe": 0, "pp": 0, "gf": 0, "gc": 0, "pts": 0}
+
+
+def parsear_resultado(texto):
+    """"2-1" -> (2, 1); None si no es un marcador válido."""
+    partes = str(texto or "").split("-")
+    if len(partes) != 2:
+        return None
+    try:
+        return int(partes[0]), int(partes[1])
+    except ValueError:
+        return None
+
+
+class Clasificacion:
+    __slots__ = ("tabla", "_orden", "_claves", "_h2h")
+
+    def __init__(self, tabla: dict, partidos=()):
+        self.tabla = tabla
+        self._h2h = {}  # (x, y) -> puntos que x le sacó a y
+
+        for p in partidos:
+            marcador = parsear_resultado(p.get("resultado"))
+            if marcador and p.get("a") and p.get("b"):
+                self._sumar_h2h(p["a"], p["b"], *marcador)
+
+        self._claves = {n: self._clave(n) for n in tabla}
+        self._orden = sorted(self._claves.values())
+
+    # ---------- claves ----------
+    def _clave(self, nombre) -> tuple:
+        f = self.tabla[nombre]
+        pg = f.get("pg", 0)
+        gf = f.get("gf", 0)
+        # negados: la lista queda de mejor a peor en orden ascendente
+        return (-f.get("pts", 0), -pg, -(gf - f.get("gc", 0)), -gf, nombre)
+
+    def _mover(self, nombre):
+        vieja = self._claves.get(nombre)
+        if vieja is not None:
+            i = bisect_left(self._orden, vieja)
+            del self._orden[i]
+        nueva = self._clave(nombre)
+        self._claves[nombre] = nueva
+        insort(self._orden, nueva)
+
+    def _sumar_h2h(self, a, b, ga: int, gb: int):
+        pa, pb = _puntos(ga, gb)
+        self._h2h[(a, b)] = self._h2h.get((a, b), 0) + pa
+        self._h2h[(b, a)] = self._h2h.get((b, a), 0) + pb
+
+    # ---------- escritura ----------
+    def asegurar(self, nombre) -> dict:
+        fila = self.tabla.get(nombre)
+        if fila is None:
+            fila = self.tabla[nombre] = fila_vacia()
+            self._mover(nombre)
+        else:
+            for k, v in fila_vacia().items():
+                fila.setdefault(k, v)
+        return fila
+
+    def registrar(self, a, b, ga: int, gb: int):
+        """Suma un resultado a las filas de a y b y los reubica (O(log n) + memmove)."""
+        pa, pb = _puntos(ga, gb)
+        for nombre, favor, contra, pts in ((a, ga, gb, pa), (b, gb, ga, pb)):
+            fila = self.asegurar(nombre)
+            fila["pj"] += 1
+            fila["gf"] += favor
+            fila["gc"] += contra
+            fila["pts"] += pts
+            if pts == PTS_VICTORIA:
+                fila["pg"] += 1
+            elif pts == PTS_EMPATE:
+                fila["pe"] += 1
+            else:
+                fila["pp"] += 1
+            self._mover(nombre)
+
+        self._sumar_h2h(a, b, ga, gb)
+
+    def reubicar(self, a, b, ga: int, gb: int):
+        """
+        Como registrar(), para una Clasificacion que COMPARTE las filas con
+        otra que ya sumó el resultado (ej. la de un grupo): solo reubica.
+        """
+        for nombre in (a, b):
+            if nombre in self.tabla:
+                self._mover(nombre)
+        self._sumar_h2h(a, b, ga, gb)
+
+    # ---------- lectura ----------
+    def _fin_bloque(self, clave) -> int:
+        # primera clave con (pts, pg) estrictamente peor
+        return bisect_left(self._orden, (clave[0], clave[1], float("inf")))
+
+    def _resolver(self, claves: list) -> list:
+        if len(claves) < 2:
+            return [c[-1] for c in claves]
+        nombres = [c[-1] for c in claves]
+        directo = {
+            n: sum(self._h2h.get((n, o), 0) for o in nombres if o != n)
+            for n in nombres
+        }
+        # el resto de la clave (dif, gf, nombre) ya viene en orden
+        return [c[-1] for c in sorted(claves, key=lambda c: (-directo[c[-1]], c[2:]))]
+
+    def top(self, n: int) -> list:
+        """[(equipo, fila)] de los n primeros, resolviendo solo los bloques tocados."""
+        out = []
+        i = 0
+        while i < len(self._orden) and len(out) < n:
+            fin = self._fin_bloque(self._orden[i])
+            out.extend(self._resolver(self._orden[i:fin]))
+            i = fin
+        return [(e, self.tabla[e]) for e in out[:n]]
+
+    def ordenados(self) -> list:
+        return self.top(len(self._orden))
+
+    def posicion(self, nombre):
+        """Puesto 1-based de `nombre` (None si no está en la tabla)."""
+        clave = self._claves.get(nombre)
+        if clave is None:
+            return None
+        ini = bisect_left(self._orden, clave[:2])
+        fin = self._fin_bloque(clave)
+        return ini + self._resolver(self._orden[ini:fin]).index(nombre) + 1
+
+    def __len__(self):
+        return len(self._orden)
+
+
+def _puntos(ga: int, gb: int):
+    if ga > gb:
+        return PTS_VICTORIA, 0
+    if ga < gb:
+        return 0, PTS_VICTORIA
+    return PTS_EMPATE, PTS_EMPATE
+
+
+# =============================
+# RECONSTRUCCIÓN VECTORIZADA (NumPy opcional) - REV
+# =============================
+# Para corregir resultados: la tabla se rehace DESDE CERO con los
+# resultados de torneo["partidos"] en una sola pasada por columnas
+# (bincount por equipo). Sin NumPy se usa el mismo cálculo en Python.
+try:
+    import numpy as np
+except ImportError:  # dependencia opcional
+    np = None
+
+
+def _columnas_numpy(n: int, ia, ib, ga, gb) -> dict:
+    ia = np.asarray(ia, dtype=np.intp)
+    ib = np.asarray(ib, dtype=np.intp)
+    ga = np.asarray(ga, dtype=np.int64)
+    gb = np.asarray(gb, dtype=np.int64)
+
+    def por_equipo(peso_a, peso_b):
+        return (
+            np.bincount(ia, weights=peso_a, minlength=n)
+            + np.bincount(ib, weights=peso_b, minlength=n)
+        ).astype(np.int64)
+
+    pj = np.bincount(ia, minlength=n) + np.bincount(ib, minlength=n)
+    pg = por_equipo(ga > gb, gb > ga)
+    pe = por_equipo(ga == gb, ga == gb)
+    gf = por_equipo(ga, gb)
+    gc = por_equipo(gb, ga)
+
+    return {
+        "pj": pj.tolist(),
+        "pg": pg.tolist(),
+        "pe": pe.tolist(),
+        "pp": (pj - pg - pe).tolist(),
+        "gf": gf.tolist(),
+        "gc": gc.tolist(),
+        "pts": (PTS_VICTORIA * pg + PTS_EMPATE * pe).tolist(),
+    }
+
+
+def _columnas_python(n: int, ia, ib, ga, gb) -> dict:
+    cols = {k: [0] * n for k in fila_vacia()}
+    for a, b, x, y in zip(ia, ib, ga, gb):
+        pa, pb = _puntos(x, y)
+        for i, favor, contra, pts in ((a, x, y, pa), (b, y, x, pb)):
+            cols["pj"][i] += 1
+            cols["gf"][i] += favor
+            cols["gc"][i] += contra
+            cols["pts"][i] += pts
+            clave = "pg" if pts == PTS_VICTORIA else "pe" if pts == PTS_EMPATE else "pp"
+            cols[clave][i] += 1
+    return cols
+
+
+def reconstruir_tabla(equipos, partidos, usar_numpy: bool = True) -> dict:
+    """
+    {equipo: fila} calculada solo desde los resultados ("2-1") de `partidos`.
+    `equipos` aparecen aunque no hayan jugado (filas en cero).
+    """
+    nombres = list(dict.fromkeys(equipos))
+    indice = {n: i for i, n in enumerate(nombres)}
+    ia, ib, ga, gb = [], [], [], []
+
+    for p in partidos:
+        marcador = parsear_resultado(p.get("resultado"))
+        a, b = p.get("a"), p.get("b")
+        if marcador is None or not a or not b:
+            continue
+        for n in (a, b):
+            if n not in indice:
+                indice[n] = len(nombres)
+                nombres.append(n)
+        ia.append(indice[a])
+        ib.append(indice[b])
+        ga.append(marcador[0])
+        gb.append(marcador[1])
+
+    sumar = _columnas_numpy if (usar_numpy and np is not None) else _columnas_python
+    cols = sumar(len(nombres), ia, ib, ga, gb)
+
+    claves = list(cols)
+    return {
+        n: {k: cols[k][i] for k in claves}
+        for i, n in enumerate(nombres)
+    }
@@ -0,0 +1,280 @@
+# =============================
+# CUADRO DE ELIMINACIÓN (SIMPLE / DOBLE) - REV
+# =============================
+# torneo["eliminatorias"] = lista de partidos con id 1..N ordenados por
+# llave y ronda, así el partido con id k está en cuadro[k - 1] (O(1)).
+#   {"id", "cuadro": "W" | "L" | "GF", "ronda", "a", "b", "resultado",
+#    "ganador", "bloqueado",
+#    "siguiente": id del partido al que pasa el ganador (None = final),
+#    "lado": "a" | "b" (hueco que ocupa en ese partido),
+#    "perdedor" / "lado_perdedor": a dónde cae el perdedor (solo doble),
+#    "reinicio": id de la final reset (solo la gran final)}
+# Tamaño = potencia de 2 >= equipos. Los huecos son BYE (None) y les tocan a
+# los mejores sembrados: orden estándar 1 vs N, 2 vs N-1... (1 y 2 solo se
+# cruzan en la final). Un partido al que ya le llegó todo y le falta un
+# equipo se cierra solo (BYE), también en la llave de perdedores.
+# Todo el ruteo se calcula AL CREAR el cuadro: registrar un resultado solo
+# copia ganador/perdedor a sus huecos.
+# Funciones puras: sin Discord ni persistencia.
+
+BYE = "BYE"
+NO_HACE_FALTA = "Not needed"  # FIX (EN) final reset que no se juega
+
+# llaves en orden de juego: ganadores, perdedores, gran final
+LLAVES = ("W", "L", "GF")
+
+
+def tamano_cuadro(n: int) -> int:
+    """Potencia de 2 más chica que entra `n` equipos."""
+    return 1 << max(n - 1, 0).bit_length()
+
+
+def orden_semillas(tam: int) -> list:
+    """Semillas (1-based) en orden de cuadro: 8 -> [1, 8, 4, 5, 2, 7, 3, 6]."""
+    orden = [1]
+    while len(orden) < tam:
+        espejo = len(orden) * 2 + 1
+        orden = [x for s in orden for x in (s, espejo - s)]
+    return orden
+
+
+def _partido(llave: str, ronda: int) -> dict:
+    return {
+        "id": None,
+        "cuadro": llave,
+        "ronda": ronda,
+        "a": None,
+        "b": None,
+        "resultado": None,
+        "ganador": None,
+        "bloqueado": False,
+        "siguiente": None,
+        "lado": "a",
+    }
+
+
+def _rondas(llave: str, tamanos) -> list:
+    return [[_partido(llave, r) for _ in range(n)] for r, n in enumerate(tamanos, 1)]
+
+
+def _unir(origen: dict, destino: dict, lado: str, perdedor: bool = False):
+    if perdedor:
+        origen["perdedor"], origen["lado_perdedor"] = destino, lado
+    else:
+        origen["siguiente"], origen["lado"] = destino, lado
+
+
+def crear_cuadro(equipos, doble: bool = False) -> list:
+    """
+    `equipos` ya ordenados por siembra (el 1º es el mejor).
+    doble=True agrega llave de perdedores y gran final con reset.
+    ValueError si hay menos de 2.
+    """
+    equipos = list(equipos)
+    if len(equipos) < 2:
+        raise ValueError("se necesitan al menos 2 equipos")
+
+    tam = tamano_cuadro(len(equipos))
+    k = tam.bit_length() - 1  # rondas de la llave de ganadores
+
+    # ---------- ganadores ----------
+    w = _rondas("W", [tam >> r for r in range(1, k + 1)])
+    for r in range(k - 1):
+        for i, p in enumerate(w[r]):
+            _unir(p, w[r + 1][i // 2], "ab"[i % 2])
+
+    ranuras = [
+        equipos[s - 1] if s <= len(equipos) else None
+        for s in orden_semillas(tam)
+    ]
+    for i, p in enumerate(w[0]):
+        p["a"], p["b"] = ranuras[2 * i], ranuras[2 * i + 1]
+
+    l, gf = [], []
+    if doble:
+        # ---------- perdedores ----------
+        # por cada ronda j de ganadores (desde la 2ª): una ronda "menor"
+        # (se cruzan entre ellos) y una "mayor" (reciben a los que caen)
+        l = _rondas("L", [tam >> (j + 1) for j in range(1, k) for _ in (0, 1)])
+        for i, p in enumerate(w[0]):
+            destino = l[0][i // 2] if l else None
+            if destino is not None:
+                _unir(p, destino, "ab"[i % 2], perdedor=True)
+
+        for j in range(1, k):
+            menor, mayor = l[2 * j - 2], l[2 * j - 1]
+            if j > 1:
+                for i, p in enumerate(l[2 * j - 3]):
+                    _unir(p, menor[i // 2], "ab"[i % 2])
+            for i, p in enumerate(menor):
+                _unir(p, mayor[i], "a")
+            # los que caen entran cruzados (evita revanchas inmediatas)
+            caen = w[j] if j % 2 == 0 else w[j][::-1]
+            for i, p in enumerate(caen):
+                _unir(p, mayor[i], "b", perdedor=True)
+
+        # ---------- gran final (+ reset) ----------
+        gf = _rondas("GF", [1, 1])
+        _unir(w[-1][0], gf[0][0], "a")
+        if l:
+            _unir(l[-1][0], gf[0][0], "b")
+        else:
+            _unir(w[-1][0], gf[0][0], "b", perdedor=True)  # 2 equipos
+        gf[0][0]["reinicio"] = gf[1][0]
+
+    cuadro = [p for rondas in (w, l, gf) for ronda in rondas for p in ronda]
+    for pid, p in enumerate(cuadro, 1):
+        p["id"] = pid
+    # objetos -> ids (lo que se persiste)
+    for p in cuadro:
+        for campo in ("siguiente", "perdedor", "reinicio"):
+            if isinstance(p.get(campo), dict):
+                p[campo] = p[campo]["id"]
+
+    c = Cuadro(cuadro)
+    for p in w[0]:
+        c._bye(p)
+    return cuadro
+
+
+class Cuadro:
+    """
+    Índices en memoria sobre la lista persistida: equipo -> partido
+    pendiente, pendientes por (llave, ronda) y cuántos partidos faltan
+    cerrar para que a cada uno le lleguen sus equipos.
+    """
+    __slots__ = ("partidos", "rondas", "_actual", "_pendientes", "_tramos", "_faltan")
+
+    def __init__(self, partidos: list):
+        self.partidos = partidos
+        self._actual = {}
+        self._pendientes = {}
+        self._tramos = {}  # (llave, ronda) -> [desde, hasta) en la lista
+        self._faltan = {}  # id -> partidos previos sin cerrar
+        self.rondas = {}   # llave -> cantidad de rondas
+
+        for i, p in enumerate(partidos):
+            clave = (p.get("cuadro", "W"), p.get("ronda", 1))
+            self.rondas[clave[0]] = max(self.rondas.get(clave[0], 0), clave[1])
+            tramo = self._tramos.setdefault(clave, [i, i])
+            tramo[1] = i + 1
+            if p.get("bloqueado"):
+                continue
+            self._pendientes[clave] = self._pendientes.get(clave, 0) + 1
+            for lado in ("a", "b"):
+                if p.get(lado):
+                    self._actual[p[lado]] = p["id"]
+            for campo in ("siguiente", "perdedor", "reinicio"):
+                destino = p.get(campo)
+                if destino is not None:
+                    self._faltan[destino] = self._faltan.get(destino, 0) + 1
+
+    # ---------- lectura ----------
+    def partido(self, pid):
+        try:
+            pid = int(pid)
+        except (TypeError, ValueError):
+            return None
+        if 1 <= pid <= len(self.partidos):
+            p = self.partidos[pid - 1]
+            if p.get("id") == pid:
+                return p
+        # lista vieja sin ids contiguos
+        return next((p for p in self.partidos if p.get("id") == pid), None)
+
+    def actual(self, equipo):
+        """Partido pendiente de `equipo` (None si quedó eliminado o es campeón)."""
+        return self.partido(self._actual.get(equipo))
+
+    def siguiente(self, pid):
+        p = self.partido(pid)
+        return self.partido(p.get("siguiente")) if p else None
+
+    def rondas_en_juego(self) -> list:
+        """[(llave, primera ronda con partidos sin jugar)] en orden W, L, GF."""
+        actuales = {}
+        for llave, ronda in self._pendientes:
+            actuales[llave] = min(actuales.get(llave, ronda), ronda)
+        return sorted(actuales.items(), key=lambda x: LLAVES.index(x[0]) if x[0] in LLAVES else len(LLAVES))
+
+    def ronda(self, ronda: int, llave: str = "W") -> list:
+        desde, hasta = self._tramos.get((llave, ronda), (0, 0))
+        return self.partidos[desde:hasta]
+
+    def campeon(self):
+        if not self.partidos:
+            return None
+        final = self.partidos[-1]
+        return final.get("ganador") if final.get("bloqueado") else None
+
+    # ---------- escritura ----------
+    def _cerrar(self, p: dict, ganador, perdedor, resultado):
+        p["ganador"] = ganador
+        p["resultado"] = resultado
+        p["bloqueado"] = True
+
+        clave = (p.get("cuadro", "W"), p.get("ronda", 1))
+        self._pendientes[clave] -= 1
+        if not self._pendientes[clave]:
+            del self._pendientes[clave]
+
+        for lado in ("a", "b"):
+            if p.get(lado) is not None:
+                self._actual.pop(p[lado], None)
+
+        reset = self.partido(p.get("reinicio"))
+        if reset is not None:
+            self._faltan[reset["id"]] = 0
+            if ganador == p.get("a"):
+                # ganó el que venía invicto: no hay reset
+                self._cerrar(reset, ganador, perdedor, NO_HACE_FALTA)
+            else:
+                reset["a"], reset["b"] = p.get("a"), p.get("b")
+                self._actual[reset["a"]] = self._actual[reset["b"]] = reset["id"]
+            return
+
+        self._enviar(p.get("siguiente"), p.get("lado", "a"), ganador)
+        self._enviar(p.get("perdedor"), p.get("lado_perdedor", "a"), perdedor)
+
+    def _enviar(self, pid, lado: str, equipo):
+        destino = self.partido(pid)
+        if destino is None:
+            return
+        destino[lado] = equipo
+        if equipo is not None:
+            self._actual[equipo] = destino["id"]
+        self._faltan[destino["id"]] = self._faltan.get(destino["id"], 1) - 1
+        self._bye(destino)
+
+    def _bye(self, p: dict):
+        """Si ya le llegó todo y le falta un equipo (o los dos), se cierra solo."""
+        if p.get("bloqueado") or self._faltan.get(p["id"], 0) > 0:
+            return
+        a, b = p.get("a"), p.get("b")
+        if a is not None and b is not None:
+            return
+        self._cerrar(p, a if b is None else b, None, BYE)
+
+    def registrar(self, pid, ganador: str, resultado: str | None = None):
+        """
+        Cierra el partido y mueve ganador / perdedor a sus huecos.
+        None si todo bien; si no, la clave del error:
+        "partido" | "bloqueado" | "pendiente" | "equipo".
+        """
+        p = self.partido(pid)
+        if p is None:
+            return "partido"
+        if p.get("bloqueado"):
+            return "bloqueado"
+        if not p.get("a") or not p.get("b"):
+            return "pendiente"
+
+        # el nombre viene escrito a mano: sin distinguir mayúsculas
+        texto = str(ganador or "").strip().casefold()
+        nombre = next((p[l] for l in ("a", "b") if str(p[l]).casefold() == texto), None)
+        if nombre is None:
+            return "equipo"
+
+        perdedor = p["b"] if nombre == p["a"] else p["a"]
+        self._cerrar(p, nombre, perdedor, resultado or "Finished")  # FIX (EN)
+        return None
@@ -0,0 +1,178 @@
+# =============================
+# EMPAREJAMIENTO SUIZO - REV
+# =============================
+# Cada ronda se arma desde la clasificación del momento:
+#   1) BYE (si son impares): al peor clasificado que todavía no tuvo uno
+#   2) grupos por puntaje, de mejor a peor; dentro de cada grupo la mitad
+#      de arriba juega contra la de abajo (1º vs 1º de abajo, ...)
+#   3) quien no encuentra rival sin revancha "flota" al grupo siguiente
+#   4) lo que sobra al final se cruza igual y, si queda una revancha, se
+#      intenta un intercambio con un par ya armado antes de aceptarla
+# Todo greedy por grupos: O(n²) en el peor caso, sin backtracking.
+# Funciones puras: sin Discord ni persistencia.
+import random
+
+
+def par(a, b) -> frozenset:
+    return frozenset((a, b))
+
+
+def rondas_suizo(n: int) -> int:
+    """Rondas para definir un ganador: ceil(log2(n))."""
+    return max(n - 1, 0).bit_length()
+
+
+def elegir_bye(orden: list, con_bye) -> object:
+    """El peor clasificado sin BYE previo (si todos tuvieron, el último)."""
+    for equipo in reversed(orden):
+        if equipo not in con_bye:
+            return equipo
+    return orden[-1]
+
+
+def _grupos(orden: list, puntos: dict) -> list:
+    grupos = []
+    for equipo in orden:
+        pts = puntos.get(equipo, 0)
+        if grupos and grupos[-1][0] == pts:
+            grupos[-1][1].append(equipo)
+        else:
+            grupos.append((pts, [equipo]))
+    return [g for _, g in grupos]
+
+
+def _emparejar_grupo(pool: list, jugados) -> tuple:
+    """Mitad de arriba vs mitad de abajo; devuelve (pares, sin rival)."""
+    mitad = len(pool) // 2
+    libres = list(pool[mitad:]) + list(pool[:mitad])  # preferencia: abajo primero
+    libres_set = set(pool)
+    pares = []
+
+    for a in pool[:mitad]:
+        if a not in libres_set:
+            continue
+        libres_set.discard(a)
+        rival = next((b for b in libres if b in libres_set and par(a, b) not in jugados), None)
+        if rival is None:
+            libres_set.add(a)
+            continue
+        libres_set.discard(rival)
+        pares.append((a, rival))
+
+    sobran = [e for e in pool if e in libres_set]
+    return pares, sobran
+
+
+def _reparar(pares: list, a, b, jugados) -> bool:
+    """(a, b) ya se enfrentaron: busca un par (c, d) para cruzar a-c / b-d."""
+    for i in range(len(pares) - 1, -1, -1):
+        c, d = pares[i]
+        for x, y in ((c, d), (d, c)):
+            if par(a, x) not in jugados and par(b, y) not in jugados:
+                pares[i] = (x, a)
+                pares.append((y, b))
+                return True
+    return False
+
+
+def emparejar_suizo(orden: list, puntos: dict, jugados, con_bye=()) -> tuple:
+    """
+    orden: equipos de mejor a peor. puntos: {equipo: puntaje para agrupar}.
+    jugados: set de par(a, b) ya disputados. con_bye: equipos que ya tuvieron BYE.
+    -> ([(a, b), ...], equipo_con_bye | None)
+    """
+    orden = list(orden)
+    bye = None
+    if len(orden) % 2:
+        bye = elegir_bye(orden, set(con_bye))
+        orden.remove(bye)
+
+    pares, flotan = [], []
+    for grupo in _grupos(orden, puntos):
+        nuevos, flotan = _emparejar_grupo(flotan + grupo, jugados)
+        pares.extend(nuevos)
+
+    # los que quedaron: sin rival "limpio" en todo el resto
+    while flotan:
+        a = flotan.pop(0)
+        b = next((x for x in flotan if par(a, x) not in jugados), flotan[0])
+        flotan.remove(b)
+        if par(a, b) in jugados and _reparar(pares, a, b, jugados):
+            continue
+        pares.append((a, b))  # revancha inevitable
+
+    return pares, bye
+
+
+# =============================
+# LIGA: ROUND ROBIN (MÉTODO DEL CÍRCULO) - REV
+# =============================
+# Un equipo queda fijo y el resto rota una posición por ronda; con impares
+# el fijo es un "descanso" (BYE), así cada equipo descansa exactamente una vez.
+# La ronda r se calcula sola en O(n): no hace falta armar el fixture entero.
+# Local/visita: el cruce del fijo alterna por ronda y los demás alternan por
+# posición -> cada equipo queda con locales = visitas ± 1 y a lo sumo una
+# repetición seguida (dos locales o dos visitas).
+def rondas_liga(n: int) -> int:
+    return n - 1 + (n % 2)
+
+
+def ronda_circulo(n: int, ronda: int) -> tuple:
+    """
+    Ronda `ronda` (0-based) para los equipos 0..n-1.
+    -> ([(local, visita), ...], índice con BYE | None)
+    """
+    if n < 1:
+        return [], None
+
+    m = n + (n % 2)
+
+    giro = ronda % (m - 1)
+    fijo = m - 1  # par: el último equipo; impar: el descanso (índice n)
+
+    def en(pos):
+        return fijo if pos == 0 else (pos - 1 + giro) % (m - 1)
+
+    pares, bye = [], None
+    for k in range(m // 2):
+        local, visita = en(k), en(m - 1 - k)
+        if (ronda % 2 == 1) if k == 0 else (k % 2 == 1):
+            local, visita = visita, local
+        if n in (local, visita):
+            bye = visita if local == n else local
+            continue
+        pares.append((local, visita))
+    return pares, bye
+
+
+# =============================
+# SORTEO DE GRUPOS - REV
+# =============================
+# Bombos de a `n_grupos` equipos en orden de siembra (el 1º es el mejor):
+# cada bombo se mezcla y reparte uno por grupo, así los cabezas de serie
+# nunca comparten grupo. Sin siembra se mezcla todo antes de armar bombos.
+def nombre_grupo(i: int) -> str:
+    """0 -> "A", 25 -> "Z", 26 -> "AA"..."""
+    nombre = ""
+    i += 1
+    while i:
+        i, resto = divmod(i - 1, 26)
+        nombre = chr(ord("A") + resto) + nombre
+    return nombre
+
+
+def sortear_grupos(equipos, n_grupos: int, sembrado: bool = True) -> dict:
+    """-> {"A": [equipos], "B": [...], ...} (grupos de tamaño parejo ± 1)."""
+    equipos = list(equipos)
+    n_grupos = max(1, min(n_grupos, len(equipos)))
+    if not sembrado:
+        random.shuffle(equipos)
+
+    letras = [nombre_grupo(i) for i in range(n_grupos)]
+    grupos = {letra: [] for letra in letras}
+    for i in range(0, len(equipos), n_grupos):
+        bombo = equipos[i:i + n_grupos]
+        destinos = random.sample(letras, len(bombo))
+        for equipo, letra in zip(bombo, destinos):
+            grupos[letra].append(equipo)
+    return grupos
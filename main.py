@@ -1,3 +1,5 @@
+import asyncio
+import contextvars
 import discord
 from discord.ext import commands
 import json
@@ -5,6 +7,12 @@ import os
 import random
 import uuid
 from keep_alive import keep_alive
+import baneo
+import clasificacion
+import eliminatorias
+import emparejamientos
+import modelos
+import persistencia
 
 TOKEN = os.getenv("DISCORD_TOKEN")  # nombre de la variable
 if not TOKEN:
@@ -12,7 +20,7 @@ if not TOKEN:
 # =============================
 # CONFIG
 # =============================
-DATA_FILE = "data.json"
+DATA_FILE = persistencia.DATA_FILE
 
 intents = discord.Intents.default()
 intents.message_content = True
@@ -20,31 +28,25 @@ intents.message_content = True
 bot = commands.Bot(command_prefix="!", intents=intents)
 
 # =============================
-# DATA - REV
+# DATA - REV (STORE EN MEMORIA)
 # =============================
-def load_data():
-    if not os.path.exists(DATA_FILE):
-        base = {
-            "rol_admin_torneo_id": None,
-            "rol_streamer_id": None,
-            "torneos": {},       # (legacy) 1 torneo por guild
-            "servidores": {}     # (nuevo) multi torneos por guild
-        }
-        ensure_schema(base)
-        return base
-
-    with open(DATA_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
+def _normalizar_data(data: dict) -> bool:
     # asegurar llaves nuevas sin romper lo viejo
     data.setdefault("rol_admin_torneo_id", None)
     data.setdefault("rol_streamer_id", None)
     data.setdefault("torneos", {})
     data.setdefault("servidores", {})
 
-    # migración suave a esquema multi
-    ensure_schema(data)
-    return data
+    # migración versionada: corre UNA vez al arrancar (no en cada acceso)
+    return migrar_esquema(data)
+
+def load_data():
+    """
+    Devuelve el store en memoria del proceso.
+    data.json solo se lee la primera vez; las siguientes llamadas son O(1)
+    y devuelven SIEMPRE el mismo dict.
+    """
+    return persistencia.get_store(_normalizar_data)
 
 # =============================
 # Def ensure schema - REV
@@ -54,6 +56,7 @@ def ensure_schema(data: dict):
     Garantiza estructura multi-servidor/multi-torneo.
     Migra el esquema viejo data["torneos"][guild_id] -> servidores[guild]["torneos"]["DEFAULT"]
     SOLO si ese DEFAULT aún no existe.
+    (Paso 1 -> 2 de migrar_esquema: ya no se llama en cada acceso.)
     """
     data.setdefault("servidores", {})
     data.setdefault("torneos", {})  # legacy (puede existir)
@@ -67,22 +70,67 @@ def ensure_schema(data: dict):
 
             gid_str = str(gid)
 
+            # con backend shards el servidor puede estar aún en disco
+            persistencia.cargar_servidor(data, gid_str)
+            persistencia.tocar(gid_str, "DEFAULT")
+
             srv = data["servidores"].setdefault(gid_str, {})
             torneos_srv = srv.setdefault("torneos", {})
 
             # Solo crear DEFAULT si no existe ya
-            if "DEFAULT" not in torneos_srv:
-                torneos_srv["DEFAULT"] = torneo_obj
+            if "DEFAULT" not in torneos_srv and isinstance(torneo_obj, dict):
+                torneos_srv["DEFAULT"] = modelos.expandir_torneo(torneo_obj, "DEFAULT")
 
             srv.setdefault("activo", "DEFAULT")
 # =============================
+# MIGRACIÓN DE ESQUEMA (UNA VEZ) - REV
+# =============================
+# data["schema_version"] dice hasta qué paso ya se migró el archivo.
+# Cada paso corre una sola vez en la vida del archivo; después get_server
+# y compañía no hacen ningún trabajo de migración.
+SCHEMA_VERSION = 3
+
+
+def _quitar_alias_torneo(data: dict):
+    # data["torneo"] era una copia del torneo activo que se guardaba dos veces
+    data.pop("torneo", None)
+
+
+_MIGRACIONES = {
+    1: ensure_schema,         # legacy data["torneos"] -> servidores/DEFAULT
+    2: _quitar_alias_torneo,  # alias duplicado fuera del archivo
+}
+
+
+def migrar_esquema(data: dict) -> bool:
+    """Aplica los pasos pendientes. Devuelve True si hubo que migrar algo."""
+    version = data.get("schema_version", 1)
+    if version >= SCHEMA_VERSION:
+        return False
+
+    while version < SCHEMA_VERSION:
+        paso = _MIGRACIONES.get(version)
+        if paso:
+            paso(data)
+        version += 1
+
+    data["schema_version"] = version
+    print(f"🗄️ Schema migrated to v{version}")  # FIX (EN)
+    return True
+# =============================
 # Def Save Data - REV
 # =============================
 def save_data(data):
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+    # ✅ write-behind: marca sucio y agrupa ráfagas en un solo flush
+    # (ventana DATA_SAVE_WINDOW, flush garantizado al apagar).
+    # El disco se escribe en el hilo de I/O: nunca bloquea el event loop.
+    persistencia.guardar(data)
+
+async def save_data_async(data):
+    # igual que save_data, pero espera a que el cambio esté en disco
+    await persistencia.guardar_async(data)
 
-# ✅ IMPORTANTE: esta línea debe ir DESPUÉS de ensure_schema
+# ✅ IMPORTANTE: esta línea debe ir DESPUÉS de migrar_esquema
 data = load_data()
 # =============================
 # Def Get Torneo - REV
@@ -105,24 +153,37 @@ def get_torneo(data, torneo_id):
 # =============================
 def set_torneo_activo(data, torneo_id):
     torneo = get_torneo(data, torneo_id)
-    data["torneo"] = torneo
+    _torneo_actual.set(torneo)
     return torneo
 # =============================
+# TORNEO ACTUAL (CONTEXTO POR TAREA) - REV
+# =============================
+# Reemplaza al viejo alias data["torneo"]: cada interacción corre en su
+# propia tarea, así que el "torneo activo" vive en un ContextVar y nunca
+# entra al store (ni al disco).
+_torneo_actual = contextvars.ContextVar("torneo_actual", default=None)
+
+
+def torneo_actual() -> dict | None:
+    """Torneo activo de la interacción en curso (o None)."""
+    return _torneo_actual.get()
+# =============================
 # Compat: set_torneo_activo para multi - REV
 # =============================
 def set_torneo_activo_multi(data, guild_id: int, torneo_uid: str):
     set_activo(data, guild_id, torneo_uid)
     torneo = get_torneo_v2(data, guild_id, torneo_uid)
 
-    # Para compatibilidad con rutas viejas que usan data["torneo"]
-    data["torneo"] = torneo
+    # Para compatibilidad con rutas viejas: torneo_actual() (no data["torneo"])
+    _torneo_actual.set(torneo)
     return torneo
 # =============================
 # Def get_server - REV
 # =============================
 def get_server(data: dict, guild_id: int) -> dict:
-    ensure_schema(data)
     gid = str(guild_id)
+    persistencia.cargar_servidor(data, gid)  # no-op salvo backend shards
+    persistencia.tocar(gid)
     srv = data["servidores"].setdefault(gid, {})
     srv.setdefault("torneos", {})
     srv.setdefault("activo", "DEFAULT")
@@ -144,22 +205,14 @@ def get_torneo_v2(data: dict, guild_id: int, torneo_uid: str | None = None) -> d
     if not torneo_uid:
         torneo_uid = srv.get("activo", "DEFAULT")
 
+    persistencia.tocar(guild_id, torneo_uid)
     torneos = srv.setdefault("torneos", {})
     torneo = torneos.get(torneo_uid)
     if torneo is None:
-        torneo = {}
+        # ✅ estructura mínima desde el modelo (al cargar ya viene validado)
+        torneo = modelos.nuevo_torneo(torneo_uid)
         torneos[torneo_uid] = torneo
 
-    # Campo útil dentro del torneo
-    torneo.setdefault("torneo_uid", torneo_uid)
-
-    # ✅ estructura mínima (igual que tu get_torneo legacy)
-    torneo.setdefault("nombre", None)
-    torneo.setdefault("equipos", [])
-    torneo.setdefault("partidos", [])
-    torneo.setdefault("formato_partidos", None)
-    torneo.setdefault("tabla", {})
-
     return torneo
 # =============================
 # Def ensure schema - REV
@@ -186,17 +239,572 @@ def get_torneo_multi(data: dict, guild_id: int, uid: str | None = None) -> dict:
     # Alias: obtiene torneo por UID (o activo)
     return get_torneo_v2(data, guild_id, uid)
 # =============================
-# Torneo activo por defecto (fallback) - REV
+# BLOQUEO POR TORNEO - REV
 # =============================
-# Si por alguna razón no existe data["torneo"], apuntamos al torneo ACTIVO del server actual.
-# (En callbacks/slash siempre recargas data y llamas set_torneo_activo_multi con guild_id)
-if "torneo" not in data:
-    data["torneo"] = {}
+class _BloqueoTorneo:
+    """
+    asyncio.Lock reentrante por tarea: un helper llamado DENTRO de una
+    sección bloqueada puede volver a pedir el mismo bloqueo sin deadlock.
+    """
+    __slots__ = ("_lock", "_duenio", "_nivel", "transaccion")
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._duenio = None
+        self._nivel = 0
+        self.transaccion = None  # TransaccionTorneo abierta por el dueño
+
+    async def __aenter__(self):
+        tarea = asyncio.current_task()
+        if self._duenio is not None and self._duenio is tarea:
+            self._nivel += 1
+            return self
+
+        await self._lock.acquire()
+        self._duenio = tarea
+        self._nivel = 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._nivel -= 1
+        if self._nivel == 0:
+            self._duenio = None
+            self._lock.release()
+        return False
+
+    def es_de_esta_tarea(self) -> bool:
+        return self._duenio is not None and self._duenio is asyncio.current_task()
+
+_bloqueos_torneo: dict[tuple[str, str], _BloqueoTorneo] = {}
+
+def bloqueo_torneo(guild_id: int, torneo_uid: str | None = None) -> _BloqueoTorneo:
+    """
+    Bloqueo del torneo (guild, uid). Si no se pasa uid, usa el activo.
+    Serializa los read-modify-write del MISMO torneo; torneos distintos
+    siguen en paralelo.
+    """
+    if not torneo_uid:
+        torneo_uid = get_server(load_data(), guild_id).get("activo", "DEFAULT")
+
+    clave = (str(guild_id), str(torneo_uid))
+    bloqueo = _bloqueos_torneo.get(clave)
+    if bloqueo is None:
+        bloqueo = _bloqueos_torneo[clave] = _BloqueoTorneo()
+    return bloqueo
 # =============================
-# DEFAULTS DEL TORNEO - REV
+# TRANSACCIÓN DE TORNEO (UNIT OF WORK) - REV
 # =============================
-data.setdefault("torneo", {})
-data["torneo"].setdefault("formato_partidos", None)
+class TransaccionTorneo:
+    """
+    Unidad de trabajo sobre UN torneo:
+        async with transaccion_torneo(guild_id, uid) as t:
+            t.torneo["partidos"].append(...)
+    - toma bloqueo_torneo (vista consistente, sin recargas)
+    - al salir sin error: un solo set_torneo_activo_multi + save_data
+    - si hay excepción: restaura el torneo tal como estaba (rollback)
+    Anidada en la misma tarea reutiliza la externa (commit solo al final).
+    La copia para deshacer es por unidad: cabecera + lista de partidos al
+    entrar, y cada partido recién cuando se lo busca (copy-on-write).
+    """
+    __slots__ = (
+        "guild_id", "uid", "data", "torneo", "_bloqueo", "_copia",
+        "_lista", "_partidos", "_copias_partidos", "_anidada",
+    )
+
+    def __init__(self, guild_id: int, torneo_uid: str | None = None):
+        self.guild_id = guild_id
+        self.uid = torneo_uid
+        self.data = None
+        self.torneo = None
+        self._bloqueo = None
+        self._copia = None
+        self._lista = None
+        self._partidos = None
+        self._copias_partidos = {}
+        self._anidada = False
+
+    async def __aenter__(self):
+        global data
+        data = self.data = load_data()
+        if not self.uid:
+            self.uid = get_server(data, self.guild_id).get("activo", "DEFAULT")
+
+        self._bloqueo = bloqueo_torneo(self.guild_id, self.uid)
+        await self._bloqueo.__aenter__()
+        self._anidada = self._bloqueo.transaccion is not None
+        if not self._anidada:
+            self._bloqueo.transaccion = self
+
+        self.torneo = get_torneo_v2(data, self.guild_id, self.uid)
+        if not self._anidada:
+            # copia barata (encoder C) de la cabecera; los partidos no se copian acá
+            self._copia = json.dumps({k: v for k, v in self.torneo.items() if k != "partidos"})
+            self._lista = self.torneo.get("partidos")
+            self._partidos = list(self._lista) if isinstance(self._lista, list) else None
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if not self._anidada:
+                if exc_type is None:
+                    set_torneo_activo_multi(self.data, self.guild_id, self.uid)
+                else:
+                    self._deshacer()
+                save_data(self.data)
+        finally:
+            if not self._anidada:
+                self._bloqueo.transaccion = None
+            self._copia = self._lista = self._partidos = None
+            self._copias_partidos = {}
+            await self._bloqueo.__aexit__(exc_type, exc, tb)
+        return False
+
+    def copiar_partido(self, partido: dict):
+        """Guarda el partido tal como estaba, la primera vez que se lo toca."""
+        if id(partido) not in self._copias_partidos:
+            self._copias_partidos[id(partido)] = (partido, json.dumps(partido))
+
+    def _deshacer(self):
+        # rollback IN-PLACE: las referencias al torneo y a sus partidos siguen valiendo
+        olvidar_recursos_discord(self.guild_id, self.uid, self.torneo)
+
+        self.torneo.clear()
+        self.torneo.update(json.loads(self._copia))
+        if self._lista is not None:
+            self._lista[:] = self._partidos
+            self.torneo["partidos"] = self._lista
+        for partido, copia in self._copias_partidos.values():
+            partido.clear()
+            partido.update(json.loads(copia))
+        persistencia.tocar_partidos(self.guild_id, self.uid)
+
+        # índices armados con lo deshecho (capitanes, cuadro, tabla, recursos...)
+        olvidar_indice_torneo(self.guild_id, self.uid)
+        olvidar_usuarios_torneo(self.guild_id, self.uid)
+        if str(self.guild_id) in _indice_usuarios_servidores:
+            for p in self.torneo.get("partidos", []):
+                reindexar_usuarios_partido(self.guild_id, self.uid, p)
+        if str(self.guild_id) in _indice_discord_servidores:
+            for did, entrada in self.torneo.get("recursos", {}).get("ids", {}).items():
+                _indexar_discord(self.guild_id, str(self.uid), int(did), entrada)
+
+    def partido(self, partido_id):
+        return buscar_partido(self.guild_id, self.torneo, partido_id)
+
+def transaccion_torneo(guild_id: int, torneo_uid: str | None = None) -> TransaccionTorneo:
+    return TransaccionTorneo(guild_id, torneo_uid)
+# =============================
+# ÍNDICE DE PARTIDOS (guild, uid, partido_id) - REV
+# =============================
+# (guild, uid) -> [lista partidos indexada, tamaño visto, {id_normalizado: partido}]
+_indice_partidos: dict[tuple[str, str], list] = {}
+
+def normalizar_partido_id(partido_id) -> str:
+    # tolerante a str/int ("3", 3, " 3 ")
+    return str(partido_id).strip()
+
+def _clave_torneo(guild_id: int, torneo: dict) -> tuple[str, str]:
+    return (str(guild_id), str(torneo.get("torneo_uid", "DEFAULT")))
+
+def reindexar_partidos(guild_id: int, torneo: dict) -> dict:
+    partidos = torneo.setdefault("partidos", [])
+    por_id = {}
+    for p in partidos:
+        # con ids repetidos gana el primero (igual que el for original)
+        por_id.setdefault(normalizar_partido_id(p.get("id")), p)
+    _indice_partidos[_clave_torneo(guild_id, torneo)] = [partidos, len(partidos), por_id]
+    return por_id
+
+def _entrada_indice(guild_id: int, torneo: dict) -> list:
+    partidos = torneo.get("partidos")
+    entrada = _indice_partidos.get(_clave_torneo(guild_id, torneo))
+    # la lista se reemplaza entera (sorteo) o cambia de tamaño fuera del índice -> reconstruir
+    if entrada is None or entrada[0] is not partidos or entrada[1] != len(partidos):
+        reindexar_partidos(guild_id, torneo)
+        entrada = _indice_partidos[_clave_torneo(guild_id, torneo)]
+    return entrada
+
+def buscar_partido(guild_id: int, torneo: dict, partido_id) -> dict | None:
+    """
+    Partido por id en O(1) (sin recorrer torneo["partidos"]).
+    """
+    clave = normalizar_partido_id(partido_id)
+    p = _entrada_indice(guild_id, torneo)[2].get(clave)
+    if p is not None and normalizar_partido_id(p.get("id")) != clave:
+        # alguien cambió el id del partido a mano: reconstruir una vez
+        p = reindexar_partidos(guild_id, torneo).get(clave)
+    if p is not None:
+        # quien lo busca suele modificarlo: solo ESTE partido se re-serializa
+        tocar_partido(guild_id, torneo, p)
+    return p
+
+def tocar_partido(guild_id: int, torneo: dict, partido: dict):
+    """
+    Marca el partido para el próximo flush y, dentro de una transacción de
+    esta tarea, lo copia para poder deshacerlo. Llamar ANTES de modificarlo
+    (buscar_partido ya lo hace).
+    """
+    clave = _clave_torneo(guild_id, torneo)
+    persistencia.tocar(guild_id, clave[1], partido.get("id"))
+
+    bloqueo = _bloqueos_torneo.get(clave)
+    if bloqueo is not None and bloqueo.transaccion is not None and bloqueo.es_de_esta_tarea():
+        bloqueo.transaccion.copiar_partido(partido)
+
+def registrar_partido(guild_id: int, torneo: dict, partido: dict):
+    """
+    Inserta el partido en el torneo y en el índice.
+    """
+    entrada = _entrada_indice(guild_id, torneo)
+    torneo["partidos"].append(partido)
+    entrada[1] += 1
+    entrada[2].setdefault(normalizar_partido_id(partido.get("id")), partido)
+
+def olvidar_indice_torneo(guild_id: int, torneo_uid: str):
+    _indice_partidos.pop((str(guild_id), str(torneo_uid)), None)
+    _clasificaciones.pop((str(guild_id), str(torneo_uid)), None)
+    _cuadros.pop((str(guild_id), str(torneo_uid)), None)
+    _indices_grupos.pop((str(guild_id), str(torneo_uid)), None)
+# =============================
+# CLASIFICACIÓN POR TORNEO (PRE-ORDENADA) - REV
+# =============================
+# (guild, uid) -> [tabla, Clasificacion]. Se arma UNA vez desde
+# torneo["tabla"] + resultados; después ResultadoModal la actualiza con
+# registrar() (solo se reubican los 2 equipos del partido). Si la tabla se
+# reemplaza (init_tabla_multi, recalcular_tabla) o cambia de tamaño por
+# fuera -> reconstruir.
+_clasificaciones = {}
+
+def clasificacion_torneo(guild_id: int, torneo: dict) -> clasificacion.Clasificacion:
+    tabla = torneo.setdefault("tabla", {})
+    clave = _clave_torneo(guild_id, torneo)
+    entrada = _clasificaciones.get(clave)
+    if entrada is None or entrada[0] is not tabla or len(entrada[1]) != len(tabla):
+        entrada = [tabla, clasificacion.Clasificacion(tabla, torneo.get("partidos", []))]
+        _clasificaciones[clave] = entrada
+    return entrada[1]
+
+def texto_fila_tabla(d: dict) -> str:
+    dif = d.get("gf", 0) - d.get("gc", 0)
+    return (
+        f"MP {d.get('pj', 0)} | W {d.get('pg', 0)} | D {d.get('pe', 0)} | "
+        f"L {d.get('pp', 0)} | +/- {dif:+d} | PTS {d.get('pts', 0)}"  # FIX (EN)
+    )
+
+def recalcular_tabla(guild_id: int, torneo: dict) -> clasificacion.Clasificacion:
+    """
+    Rehace torneo["tabla"] DESDE CERO con los resultados de los partidos
+    (corrige resultados editados; registrar() solo sabe sumar).
+    """
+    equipos = [e["nombre"] for e in torneo.get("equipos", []) if e.get("nombre")]
+    equipos += list(torneo.get("tabla", {}))
+    # tabla nueva (otro objeto) -> clasificacion_torneo la vuelve a armar
+    torneo["tabla"] = clasificacion.reconstruir_tabla(equipos, torneo.get("partidos", []))
+    return clasificacion_torneo(guild_id, torneo)
+# =============================
+# CUADRO DE ELIMINATORIAS POR TORNEO - REV
+# =============================
+# (guild, uid) -> [lista eliminatorias, Cuadro]. Índices equipo -> partido y
+# pendientes por ronda; se rearma si la lista se reemplaza o cambia de tamaño.
+_cuadros = {}
+
+def cuadro_torneo(guild_id: int, torneo: dict) -> eliminatorias.Cuadro:
+    partidos = torneo.setdefault("eliminatorias", [])
+    clave = _clave_torneo(guild_id, torneo)
+    entrada = _cuadros.get(clave)
+    if entrada is None or entrada[0] is not partidos or len(entrada[1].partidos) != len(partidos):
+        entrada = [partidos, eliminatorias.Cuadro(partidos)]
+        _cuadros[clave] = entrada
+    return entrada[1]
+
+def nombre_ronda(ronda: int, total: int, llave: str = "W") -> str:
+    if llave == "L":
+        return f"Losers round {ronda}"  # FIX (EN)
+    if llave == "GF":
+        return "Grand final" if ronda == 1 else "Grand final (reset)"  # FIX (EN)
+    faltan = total - ronda
+    if faltan == 0:
+        return "Final"  # FIX (EN)
+    if faltan == 1:
+        return "Semifinals"  # FIX (EN)
+    if faltan == 2:
+        return "Quarterfinals"  # FIX (EN)
+    return f"Round of {2 ** (faltan + 1)}"  # FIX (EN)
+
+# =============================
+# FASE DE GRUPOS: ÍNDICES - REV
+# =============================
+# torneo["fase_grupos"] = {"n_grupos", "clasifican", "sembrado",
+#                          "grupos": {"A": [equipos]}, "ronda", "rondas"}
+# (guild, uid) -> [grupos, tabla, {equipo: grupo}, {grupo: Clasificacion}]
+# "grupo de X" es un dict. La tabla de cada grupo es una Clasificacion sobre
+# las MISMAS filas de torneo["tabla"] (solo sus equipos), armada la primera
+# vez que se pide; ResultadoModal la reubica (reubicar) sin volver a sumar.
+# Se rearma si cambian los grupos o se reemplaza la tabla (recalcular_tabla).
+_indices_grupos = {}
+
+def _entrada_grupos(guild_id: int, torneo: dict) -> list:
+    grupos = (torneo.get("fase_grupos") or {}).get("grupos") or {}
+    tabla = torneo.setdefault("tabla", {})
+    clave = _clave_torneo(guild_id, torneo)
+    entrada = _indices_grupos.get(clave)
+    if entrada is None or entrada[0] is not grupos or entrada[1] is not tabla:
+        de = {e: g for g, equipos in grupos.items() for e in equipos}
+        entrada = [grupos, tabla, de, {}]
+        _indices_grupos[clave] = entrada
+    return entrada
+
+def grupo_de_equipo(guild_id: int, torneo: dict, equipo):
+    return _entrada_grupos(guild_id, torneo)[2].get(equipo)
+
+def grupo_de_partido(guild_id: int, torneo: dict, p: dict):
+    """Grupo si ambos equipos son del mismo grupo; si no, None."""
+    de = _entrada_grupos(guild_id, torneo)[2]
+    grupo = de.get(p.get("a"))
+    return grupo if grupo is not None and de.get(p.get("b")) == grupo else None
+
+def clasificacion_grupo(guild_id: int, torneo: dict, grupo: str) -> clasificacion.Clasificacion:
+    grupos, tabla, de, por_grupo = _entrada_grupos(guild_id, torneo)
+    clasif = por_grupo.get(grupo)
+    if clasif is None:
+        filas = {e: tabla.setdefault(e, clasificacion.fila_vacia()) for e in grupos.get(grupo, [])}
+        partidos = [
+            p for p in torneo.get("partidos", [])
+            if de.get(p.get("a")) == grupo and de.get(p.get("b")) == grupo
+        ]
+        clasif = por_grupo[grupo] = clasificacion.Clasificacion(filas, partidos)
+    return clasif
+
+def clasificados_grupos(guild_id: int, torneo: dict) -> list:
+    """
+    Los `clasifican` primeros de cada grupo, sembrados para el cuadro:
+    todos los 1º, después los 2º... y cada tanda por rendimiento.
+    """
+    fase = torneo.get("fase_grupos") or {}
+    k = max(1, int(fase.get("clasifican", 2)))
+    tandas = [[] for _ in range(k)]
+    for grupo in fase.get("grupos", {}):
+        for pos, (e, d) in enumerate(clasificacion_grupo(guild_id, torneo, grupo).top(k)):
+            tandas[pos].append((e, d))
+
+    orden = []
+    for tanda in tandas:
+        tanda.sort(key=lambda x: (
+            -x[1].get("pts", 0), -x[1].get("pg", 0),
+            -(x[1].get("gf", 0) - x[1].get("gc", 0)), -x[1].get("gf", 0), x[0]
+        ))
+        orden.extend(e for e, _ in tanda)
+    return orden
+
+_ERRORES_CUADRO = {
+    "partido": "❌ Match not found",  # FIX (EN)
+    "bloqueado": "🔒 Match locked",  # FIX (EN)
+    "pendiente": "⏳ This match is still waiting for its teams",  # FIX (EN)
+    "equipo": "❌ The winner must be one of the two teams of the match",  # FIX (EN)
+}
+# =============================
+# ÍNDICE INVERSO DE RECURSOS DISCORD - REV
+# =============================
+# Persistido POR TORNEO (viaja con su shard/registro):
+#   torneo["recursos"]["ids"] = {"<discord_id>": [partido_id | None, rol, canal_id | None]}
+# rol: "categoria", "canal", "canal_publico", "canal_partido", "canal_tabla",
+#      "mensaje_publico", "mensaje_partido", ...  (canal_id solo para mensajes)
+# En memoria:
+#   _indice_discord[discord_id] = (guild_id, uid, partido_id, rol, canal_id)
+#   _indice_discord_por_rol[(guild_id, uid, partido_id, rol)] = discord_id
+_indice_discord: dict[int, tuple] = {}
+_indice_discord_por_rol: dict[tuple, int] = {}
+_indice_discord_servidores: set[str] = set()
+
+def _a_int(x):
+    try:
+        return int(x) if x else None
+    except (TypeError, ValueError):
+        return None
+
+def _ids_recursos(torneo: dict) -> dict:
+    return torneo.setdefault("recursos", {}).setdefault("ids", {})
+
+def _indexar_discord(guild_id, uid: str, discord_id: int, entrada: list):
+    pid, rol, canal_id = entrada
+    gid = str(guild_id)
+    _indice_discord[discord_id] = (gid, uid, pid, rol, canal_id)
+    _indice_discord_por_rol[(gid, uid, pid, rol)] = discord_id
+
+def registrar_recurso_discord(
+    guild_id,
+    torneo: dict,
+    discord_id,
+    rol: str,
+    partido_id=None,
+    canal_id=None,
+):
+    """
+    Registra (o corrige) un canal/categoría/mensaje del torneo en el índice.
+    """
+    discord_id = _a_int(discord_id)
+    if not discord_id:
+        return
+
+    pid = None if partido_id is None else normalizar_partido_id(partido_id)
+    entrada = [pid, rol, _a_int(canal_id)]
+    _ids_recursos(torneo)[str(discord_id)] = entrada
+
+    if guild_id is not None:
+        _indexar_discord(guild_id, str(torneo.get("torneo_uid", "DEFAULT")), discord_id, entrada)
+    else:
+        # sin guild no se puede indexar en memoria: se reconstruye en la próxima búsqueda
+        _indice_discord_servidores.clear()
+
+def _migrar_ids_torneo(torneo: dict) -> bool:
+    """
+    Torneos viejos: arma recursos["ids"] desde lo que ya estaba guardado
+    (recursos.canales/categorias + ids sueltos de cada partido). Sin Discord.
+    """
+    ids = _ids_recursos(torneo)
+    antes = len(ids)
+
+    def alta(discord_id, rol, pid=None, canal_id=None):
+        discord_id = _a_int(discord_id)
+        if discord_id and str(discord_id) not in ids:
+            ids[str(discord_id)] = [pid, rol, _a_int(canal_id)]
+
+    recursos = torneo.get("recursos", {})
+    for cid in recursos.get("categorias", []):
+        alta(cid, "categoria")
+
+    for p in torneo.get("partidos", []):
+        pid = normalizar_partido_id(p.get("id"))
+        # el canal público es compartido por todo el torneo
+        alta(p.get("canal_publico_id"), "canal_publico")
+        alta(p.get("mensaje_publico_id"), "mensaje_publico", pid, p.get("canal_publico_id"))
+        alta(p.get("canal_partido_id"), "canal_partido", pid)
+        alta(p.get("mensaje_partido_id"), "mensaje_partido", pid, p.get("canal_partido_id"))
+        alta(p.get("mensaje_ver_partidos_id"), "mensaje_ver_partidos", pid)
+
+    for cid in recursos.get("canales", []):
+        alta(cid, "canal")
+
+    return len(ids) != antes
+
+def _asegurar_indice_discord(guild_id):
+    gid = str(guild_id)
+    if gid in _indice_discord_servidores:
+        return
+
+    srv = get_server(load_data(), guild_id)
+    for uid, torneo in srv.get("torneos", {}).items():
+        if not isinstance(torneo, dict):
+            continue
+        if _migrar_ids_torneo(torneo):
+            persistencia.tocar(guild_id, uid)
+        for did, entrada in torneo["recursos"]["ids"].items():
+            _indexar_discord(guild_id, str(uid), int(did), entrada)
+
+    _indice_discord_servidores.add(gid)
+
+def buscar_recurso_discord(guild_id, discord_id) -> tuple | None:
+    """
+    discord_id -> (guild_id, torneo_uid, partido_id, rol, canal_id) sin tocar Discord.
+    """
+    _asegurar_indice_discord(guild_id)
+    return _indice_discord.get(_a_int(discord_id))
+
+def buscar_id_discord(guild_id, torneo_uid: str, rol: str, partido_id=None) -> int | None:
+    """
+    (guild, uid, partido, rol) -> discord_id sin tocar Discord.
+    """
+    _asegurar_indice_discord(guild_id)
+    pid = None if partido_id is None else normalizar_partido_id(partido_id)
+    return _indice_discord_por_rol.get((str(guild_id), str(torneo_uid), pid, rol))
+
+def olvidar_recursos_discord(guild_id, torneo_uid: str, torneo: dict):
+    gid, uid = str(guild_id), str(torneo_uid)
+    for did, (pid, rol, _canal) in torneo.get("recursos", {}).get("ids", {}).items():
+        _indice_discord.pop(_a_int(did), None)
+        if _indice_discord_por_rol.get((gid, uid, pid, rol)) == _a_int(did):
+            _indice_discord_por_rol.pop((gid, uid, pid, rol), None)
+# =============================
+# ÍNDICE DE USUARIOS (capitanes / streamers) - REV
+# =============================
+# user_id -> {(guild_id, uid, partido_id): {"capitan_A", "capitan_B", "postulado", "streamer"}}
+_indice_usuarios: dict[int, dict[tuple, set]] = {}
+# (guild_id, uid, partido_id) -> {user_id: roles}  (para re-indexar un partido sin barrer todo)
+_usuarios_por_partido: dict[tuple, dict[int, set]] = {}
+_indice_usuarios_servidores: set[str] = set()
+
+def _roles_partido(partido: dict) -> dict[int, set]:
+    roles: dict[int, set] = {}
+
+    def alta(user_id, rol):
+        user_id = _a_int(user_id)
+        if user_id:
+            roles.setdefault(user_id, set()).add(rol)
+
+    for equipo in ("A", "B"):
+        for user_id in obtener_ids_equipo(partido, equipo):
+            alta(user_id, f"capitan_{equipo}")
+    for user_id in partido.get("streamers_postulados", []):
+        alta(user_id, "postulado")
+    for user_id in partido.get("streamers_aprobados", []):
+        alta(user_id, "streamer")
+    return roles
+
+def reindexar_usuarios_partido(guild_id, torneo_uid: str, partido: dict):
+    """
+    Refresca el índice SOLO para este partido: O(participantes del partido).
+    Llamar después de tocar capitanes / postulados / aprobados.
+    """
+    clave = (str(guild_id), str(torneo_uid), normalizar_partido_id(partido.get("id")))
+
+    for user_id in _usuarios_por_partido.pop(clave, {}):
+        por_usuario = _indice_usuarios.get(user_id)
+        if por_usuario is not None:
+            por_usuario.pop(clave, None)
+            if not por_usuario:
+                del _indice_usuarios[user_id]
+
+    roles = _roles_partido(partido)
+    if roles:
+        _usuarios_por_partido[clave] = roles
+        for user_id, r in roles.items():
+            _indice_usuarios.setdefault(user_id, {})[clave] = r
+
+def olvidar_usuarios_torneo(guild_id, torneo_uid: str):
+    gid, uid = str(guild_id), str(torneo_uid)
+    for clave in [c for c in _usuarios_por_partido if c[0] == gid and c[1] == uid]:
+        for user_id in _usuarios_por_partido.pop(clave):
+            por_usuario = _indice_usuarios.get(user_id)
+            if por_usuario is not None:
+                por_usuario.pop(clave, None)
+                if not por_usuario:
+                    del _indice_usuarios[user_id]
+
+def _asegurar_indice_usuarios(guild_id):
+    gid = str(guild_id)
+    if gid in _indice_usuarios_servidores:
+        return
+
+    srv = get_server(load_data(), guild_id)
+    for uid, torneo in srv.get("torneos", {}).items():
+        if not isinstance(torneo, dict):
+            continue
+        for p in torneo.get("partidos", []):
+            reindexar_usuarios_partido(guild_id, uid, p)
+
+    _indice_usuarios_servidores.add(gid)
+
+def partidos_de_usuario(guild_id, user_id) -> list[tuple[str, str, set]]:
+    """
+    [(torneo_uid, partido_id, roles)] del usuario en este server, sin recorrer torneos.
+    """
+    _asegurar_indice_usuarios(guild_id)
+    gid = str(guild_id)
+    return [
+        (uid, pid, roles)
+        for (g, uid, pid), roles in _indice_usuarios.get(_a_int(user_id), {}).items()
+        if g == gid
+    ]
 # =============================
 # EXTRAS TORNEO-REV (MULTI) - REV
 # =============================
@@ -211,12 +819,7 @@ def init_tabla_multi(guild_id: int, torneo_uid: str | None = None):
 
     tabla = {}
     for e in torneo.get("equipos", []):
-        tabla[e["nombre"]] = {
-            "pj": 0,
-            "pg": 0,
-            "pp": 0,
-            "pts": 0
-        }
+        tabla[e["nombre"]] = clasificacion.fila_vacia()
 
     torneo["tabla"] = tabla
     save_data(data)
@@ -224,24 +827,6 @@ def init_tabla_multi(guild_id: int, torneo_uid: str | None = None):
 # async def Crear categoria y canal-REV1 (TRACK)
 # =============================
 async def crear_categoria_y_canal(guild, categoria_nombre, canal_nombre, torneo_uid: str | None = None):
-    # ✅ cargar data para poder trackear recursos
-    global data
-    data = load_data()
-
-    # ✅ resolver UID si no viene (usa torneo activo del server)
-    if not torneo_uid:
-        try:
-            torneo_uid = get_server(data, guild.id).get("activo", "DEFAULT")
-        except:
-            torneo_uid = "DEFAULT"
-
-    # ✅ obtener torneo correcto y dejarlo activo (compat)
-    try:
-        set_torneo_activo_multi(data, guild.id, torneo_uid)
-        torneo = get_torneo_v2(data, guild.id, torneo_uid)
-    except:
-        torneo = None
-
     # ======== TU LÓGICA ORIGINAL (NO SE CAMBIA) ========
     categoria = discord.utils.get(guild.categories, name=categoria_nombre)
     if not categoria:
@@ -251,15 +836,12 @@ async def crear_categoria_y_canal(guild, categoria_nombre, canal_nombre, torneo_
     if not canal:
         canal = await guild.create_text_channel(canal_nombre, category=categoria)
 
-    # ======== ✅ NUEVO: TRACK RECURSOS (SIN AFECTAR LÓGICA) ========
+    # ======== ✅ TRACK RECURSOS (uid None = torneo activo del server) ========
+    # Dentro de otra transacción del mismo torneo NO guarda: commit al final.
     try:
-        if torneo is not None:
-            # registrar categoría y canal
-            track_recurso_torneo(torneo, categoria_id=categoria.id)
-            track_recurso_torneo(torneo, canal_id=canal.id)
-            # compat: dejar apuntando data["torneo"] al torneo correcto
-            set_torneo_activo_multi(data, guild.id, torneo_uid)
-            save_data(data)
+        async with transaccion_torneo(guild.id, torneo_uid) as t:
+            track_recurso_torneo(t.torneo, categoria_id=categoria.id, guild_id=guild.id)
+            track_recurso_torneo(t.torneo, canal_id=canal.id, guild_id=guild.id)
     except:
         pass
 
@@ -267,32 +849,22 @@ async def crear_categoria_y_canal(guild, categoria_nombre, canal_nombre, torneo_
 # =============================
 # EXTRAS ELIMINATORIAS-REV (MULTI) - REV1
 # =============================
-def generar_brackets_eliminatoria_multi(guild_id: int, torneo_uid: str | None = None):
+def generar_brackets_eliminatoria_multi(guild_id: int, torneo_uid: str | None = None, doble: bool = False):
     global data
     data = load_data()
 
     torneo = get_torneo_v2(data, guild_id, torneo_uid)
 
-    tabla = torneo.get("tabla", {})
-    ordenados = sorted(tabla.items(), key=lambda x: x[1]["pts"], reverse=True)
-    equipos = [e[0] for e in ordenados]
-
-    brackets = []
-    pid = 1
-
-    for i in range(0, len(equipos), 2):
-        if i + 1 < len(equipos):
-            brackets.append({
-                "id": pid,
-                "a": equipos[i],
-                "b": equipos[i + 1],
-                "resultado": None,
-                "ganador": None,
-                "bloqueado": False
-            })
-            pid += 1
-
-    torneo["eliminatorias"] = brackets
+    # ✅ orden con desempates, sin re-ordenar la tabla entera
+    # (con fase de grupos: solo los clasificados, 1º de grupo primero)
+    if (torneo.get("fase_grupos") or {}).get("grupos"):
+        equipos = clasificados_grupos(guild_id, torneo)
+    else:
+        equipos = [e for e, _ in clasificacion_torneo(guild_id, torneo).ordenados()]
+
+    # ✅ cuadro completo: siembra 1 vs N, BYEs a los mejores y cada partido
+    # sabe a cuál pasa su ganador (y en doble, a dónde cae el perdedor)
+    torneo["eliminatorias"] = eliminatorias.crear_cuadro(equipos, doble=doble)
     save_data(data)
 # =============================
 # MODALES-REV-EN
@@ -345,7 +917,7 @@ class NombreTorneoModal(discord.ui.Modal):
         torneo["nombre"] = self.nombre.value
         torneo["logo"] = logo
 
-        # ✅ compat: apunta data["torneo"] al torneo correcto
+        # ✅ compat: torneo_actual() apunta al torneo correcto
         set_torneo_activo_multi(data, guild_id, self.torneo_uid)
 
         save_data(data)
@@ -405,7 +977,7 @@ class EquipoModal(discord.ui.Modal):
             "logo": logo
         })
 
-        # ✅ compat: apunta data["torneo"] al torneo correcto
+        # ✅ compat: torneo_actual() apunta al torneo correcto
         set_torneo_activo_multi(data, guild_id, self.torneo_uid)
 
         save_data(data)
@@ -441,12 +1013,13 @@ class FechaEstadoModal(discord.ui.Modal):
 
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+            guild_id = interaction.guild.id
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo.get("partidos", []):
-            if str(p.get("id")) == str(self.partido_id):
+            p = buscar_partido(guild_id, torneo, self.partido_id)
+            if p is not None:
                 p["fecha"] = self.fecha.value
                 p["estado"] = self.estado.value
 
@@ -463,7 +1036,7 @@ class FechaEstadoModal(discord.ui.Modal):
                 )
                 return
 
-        await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
+            await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
 # =============================
 #  MODAL EDITAR SOLO FECHA - Rev (MULTI)-EN
 # =============================
@@ -485,12 +1058,13 @@ class EditarFechaModal(discord.ui.Modal):
 
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+            guild_id = interaction.guild.id
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo.get("partidos", []):
-            if str(p.get("id")) == str(self.partido_id):
+            p = buscar_partido(guild_id, torneo, self.partido_id)
+            if p is not None:
                 p["fecha"] = self.fecha.value
 
                 # compat
@@ -506,7 +1080,7 @@ class EditarFechaModal(discord.ui.Modal):
                 )
                 return
 
-        await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
+            await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
 # =============================
 # MODAL EDITAR SOLO ESTADO - MULTI-EN
 # =============================
@@ -528,12 +1102,13 @@ class EditarEstadoModal(discord.ui.Modal):
 
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+            guild_id = interaction.guild.id
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo.get("partidos", []):
-            if str(p.get("id")) == str(self.partido_id):
+            p = buscar_partido(guild_id, torneo, self.partido_id)
+            if p is not None:
                 p["estado"] = self.estado.value
 
                 set_torneo_activo_multi(data, guild_id, self.torneo_uid)
@@ -548,13 +1123,14 @@ class EditarEstadoModal(discord.ui.Modal):
                 )
                 return
 
-        await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
+            await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
 # =============================
 # MODAL Resultado - REV (FIX)  [MULTI]-EN
 # =============================
 class ResultadoModal(discord.ui.Modal):
-    def __init__(self, partido_id, torneo_uid: str):
-        super().__init__(title=f"Match Result {partido_id}")  # FIX (EN)
+    def __init__(self, partido_id, torneo_uid: str, correccion: bool = False):
+        titulo = "Correct Result" if correccion else "Match Result"  # FIX (EN)
+        super().__init__(title=f"{titulo} {partido_id}")
         self.partido_id = partido_id
         self.torneo_uid = torneo_uid  # ✅ NUEVO
 
@@ -584,60 +1160,54 @@ class ResultadoModal(discord.ui.Modal):
             )
             return
 
-        # ✅ MULTI: cargar data y tomar torneo por UID
-        global data
-        data = load_data()
-
+        # ✅ MULTI: torneo por UID dentro de una transacción (commit único)
         guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
-
-        for p in torneo["partidos"]:
-            if str(p.get("id")) == str(self.partido_id):
-
-                # ===== GUARDAR RESULTADO Y BLOQUEAR =====
-                p["resultado"] = self.resultado.value
-                p["estado"] = "🔴 Finished"  # FIX (EN)
-                p["bloqueado"] = True
-                save_data(data)
+        async with transaccion_torneo(guild_id, self.torneo_uid) as t:
+            torneo = t.torneo
 
-                await actualizar_todos_los_mensajes_partido(interaction.guild, p)
-                await actualizar_mensaje_publico_partido(interaction.guild, p)
+            p = buscar_partido(guild_id, torneo, self.partido_id)
+            if p is not None:
 
-                # ===== TABLA =====
                 # ✅ FIX 1: si tabla NO existe o está vacía -> inicializar
                 if not torneo.get("tabla"):
                     init_tabla_multi(guild_id, self.torneo_uid)
 
-                    # ✅ FIX 2: recargar data/torneo porque init_tabla_multi carga/guarda internamente
-                    data = load_data()
-                    torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+                # ✅ corrección: el partido ya tenía resultado -> la tabla se
+                # rehace entera al final (sumar encima contaría dos veces)
+                correccion = clasificacion.parsear_resultado(p.get("resultado")) is not None
 
-                tabla = torneo.setdefault("tabla", {})
+                # clasificación ANTES de guardar el resultado (si no, el
+                # directo de este partido se contaría dos veces al armarla)
+                clasif = None if correccion else clasificacion_torneo(guild_id, torneo)
 
-                # ✅ FIX 3: blindaje por si faltan equipos en tabla (evita KeyError)
-                def row():
-                    return {"pj": 0, "pg": 0, "pp": 0, "pts": 0}
+                # 🧩 partido de grupo: su tabla se reubica con las mismas filas
+                grupo = grupo_de_partido(guild_id, torneo, p)
+                clasif_grupo = (
+                    clasificacion_grupo(guild_id, torneo, grupo)
+                    if grupo is not None and not correccion else None
+                )
 
-                tabla.setdefault(p["a"], row())
-                tabla.setdefault(p["b"], row())
+                # ===== GUARDAR RESULTADO Y BLOQUEAR =====
+                p["resultado"] = self.resultado.value
+                p["estado"] = "🔴 Finished"  # FIX (EN)
+                p["bloqueado"] = True
 
-                tabla[p["a"]]["pj"] += 1
-                tabla[p["b"]]["pj"] += 1
+                await actualizar_todos_los_mensajes_partido(interaction.guild, p)
+                await actualizar_mensaje_publico_partido(interaction.guild, p)
 
-                if g1 > g2:
-                    tabla[p["a"]]["pg"] += 1
-                    tabla[p["a"]]["pts"] += 3
-                    tabla[p["b"]]["pp"] += 1
+                # ===== TABLA =====
+                if correccion:
+                    clasif = recalcular_tabla(guild_id, torneo)
                 else:
-                    tabla[p["b"]]["pg"] += 1
-                    tabla[p["b"]]["pts"] += 3
-                    tabla[p["a"]]["pp"] += 1
-
-                # ✅ compat: deja data["torneo"] apuntando al torneo correcto
-                set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-                save_data(data)
+                    # incremental: solo se reubican A y B
+                    # ✅ FIX 3: registrar() crea la fila si falta (evita KeyError)
+                    clasif.registrar(p["a"], p["b"], g1, g2)
+                    if clasif_grupo is not None:
+                        clasif_grupo.reubicar(p["a"], p["b"], g1, g2)
 
                 await interaction.followup.send(
+                    "✏️ Result corrected and standings recalculated"  # FIX (EN)
+                    if correccion else
                     "🏁 Result recorded, match locked and messages updated",  # FIX (EN)
                     ephemeral=True
                 )
@@ -648,28 +1218,21 @@ class ResultadoModal(discord.ui.Modal):
                     canal_tabla = await crear_categoria_y_canal(
                         guild,
                         f"📊 STANDINGS - {self.torneo_uid}",  # FIX (EN)
-                        f"tabla-{self.torneo_uid.lower()}"
+                        f"tabla-{self.torneo_uid.lower()}",
+                        self.torneo_uid  # ✅ trackea canal + categoría en ESTE torneo
                     )
-
-                    # ✅ NUEVO: TRACK de canal + categoría para borrado total por UID (aunque cambien nombres)
-                    try:
-                        track_recurso_torneo(torneo, canal_id=canal_tabla.id)
-                        if getattr(canal_tabla, "category", None):
-                            track_recurso_torneo(torneo, categoria_id=canal_tabla.category.id)
-                        set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-                        save_data(data)
-                    except:
-                        pass
+                    registrar_recurso_discord(guild_id, torneo, canal_tabla.id, "canal_tabla")
 
                     embed = discord.Embed(
                         title="📊 Standings",  # FIX (EN)
                         color=discord.Color.green()
                     )
 
-                    for eq, d in sorted(tabla.items(), key=lambda x: x[1]["pts"], reverse=True):
+                    # embeds: máximo 25 campos -> top 25 sin ordenar todo
+                    for pos, (eq, d) in enumerate(clasif.top(25), 1):
                         embed.add_field(
-                            name=eq,
-                            value=f"PJ {d['pj']} | PG {d['pg']} | PP {d['pp']} | PTS {d['pts']}",
+                            name=f"{pos}. {eq}",
+                            value=texto_fila_tabla(d),
                             inline=False
                         )
 
@@ -677,7 +1240,7 @@ class ResultadoModal(discord.ui.Modal):
 
                 return
 
-        await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
+            await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
 # =============================
 # MODAL Añadir streamers - REV (FIX) [MULTI]-EN
 # =============================
@@ -719,14 +1282,15 @@ class AñadirStreamerModal(discord.ui.Modal):
 
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        # ✅ MULTI: torneo por UID
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+            # ✅ MULTI: torneo por UID
+            guild_id = interaction.guild.id
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo["partidos"]:
+            p = buscar_partido(guild_id, torneo, self.partido_id)
             # ✅ FIX: tolerante a str/int
-            if str(p.get("id")) == str(self.partido_id):
+            if p is not None:
 
                 p.setdefault("streamers_postulados", [])
                 p.setdefault("streamers_aprobados", [])
@@ -747,6 +1311,7 @@ class AñadirStreamerModal(discord.ui.Modal):
                     u for u in p["streamers_postulados"]
                     if u not in p["streamers_aprobados"]
                 ]
+                reindexar_usuarios_partido(guild_id, self.torneo_uid, p)
 
                 # compat
                 set_torneo_activo_multi(data, guild_id, self.torneo_uid)
@@ -761,7 +1326,7 @@ class AñadirStreamerModal(discord.ui.Modal):
                 )
                 return
 
-        await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
+            await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
 # =============================
 # MODAL Asignar Capitán - REV  [MULTI]-EN
 # =============================
@@ -790,13 +1355,14 @@ class AsignarCapitanModal(discord.ui.Modal):
 
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        # ✅ MULTI: torneo por UID
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+            # ✅ MULTI: torneo por UID
+            guild_id = interaction.guild.id
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo["partidos"]:
-            if str(p.get("id")) == str(self.partido_id):
+            p = buscar_partido(guild_id, torneo, self.partido_id)
+            if p is not None:
 
                 # 🔒 INICIALIZAR ESTRUCTURA SI NO EXISTE
                 p.setdefault(
@@ -819,6 +1385,7 @@ class AsignarCapitanModal(discord.ui.Modal):
                     return
 
                 capitanes.append(user_id)
+                reindexar_usuarios_partido(guild_id, self.torneo_uid, p)
 
                 # compat
                 set_torneo_activo_multi(data, guild_id, self.torneo_uid)
@@ -846,18 +1413,16 @@ class AsignarCapitanModal(discord.ui.Modal):
                     try:
                         msg = await canal.fetch_message(mensaje_id)
                         await msg.edit(
-                            # ✅ AQUÍ estaba tu anotación:
-                            # antes: ElegirTipoBanView(torneo_id, p["id"])
-                            # ahora: pasamos guild_id + torneo_uid + partido_id
-                            view=ElegirTipoBanView(guild_id, self.torneo_uid, p["id"])
+                            # ✅ view pura: se arma con el partido ya cargado
+                            view=ElegirTipoBanView(p, self.torneo_uid)
                         )
                     except:
                         pass
 
                 return
 
-        # ✅ si no se encontró el partido
-        await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
+            # ✅ si no se encontró el partido
+            await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
 # =============================
 # MODAL Quitar capitan - REV (FIX SIN BORRAR LÓGICA) [MULTI]-EN
 # =============================
@@ -886,13 +1451,14 @@ class QuitarCapitanModal(discord.ui.Modal):
 
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        # ✅ MULTI: torneo por UID
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+            # ✅ MULTI: torneo por UID
+            guild_id = interaction.guild.id
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo["partidos"]:
-            if str(p.get("id")) == str(self.partido_id):
+            p = buscar_partido(guild_id, torneo, self.partido_id)
+            if p is not None:
 
                 # 🔒 ASEGURAR ESTRUCTURA (NO CAMBIA LÓGICA)
                 if "equipos" not in p:
@@ -908,6 +1474,7 @@ class QuitarCapitanModal(discord.ui.Modal):
 
                 if user_id in p["equipos"][self.equipo]["capitanes"]:
                     p["equipos"][self.equipo]["capitanes"].remove(user_id)
+                    reindexar_usuarios_partido(guild_id, self.torneo_uid, p)
 
                     # compat
                     set_torneo_activo_multi(data, guild_id, self.torneo_uid)
@@ -929,8 +1496,8 @@ class QuitarCapitanModal(discord.ui.Modal):
                 )
                 return
 
-        # si no encontró el partido
-        await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
+            # si no encontró el partido
+            await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
 # =============================
 # MODAL Map Pool - REV  [MULTI]-EN
 # =============================
@@ -946,7 +1513,15 @@ class MapPoolModal(discord.ui.Modal):
             style=discord.InputTextStyle.long
         )
 
+        # formatos de veto: ver baneo.FORMATOS_VETO (vacío = Extra/Final)
+        self.formato = discord.ui.InputText(
+            label="Veto format (CLASSIC / BO1 / BO3)",  # FIX (EN)
+            placeholder="CLASSIC",
+            required=False
+        )
+
         self.add_item(self.mapas)
+        self.add_item(self.formato)
 
     async def callback(self, interaction: discord.Interaction):
         # ✅ responder rápido para que no expire la interacción del modal
@@ -961,104 +1536,124 @@ class MapPoolModal(discord.ui.Modal):
             )
             return
 
+        formato = (self.formato.value or "").strip().upper()
+        if formato in ("", "CLASSIC"):
+            formato = None
+        else:
+            try:
+                baneo.compilar_formato(formato, len(mapas))  # valida formato + pool
+            except ValueError as e:
+                await interaction.followup.send(
+                    f"🚫 {e} (available: CLASSIC, {', '.join(baneo.FORMATOS_VETO)})",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
+
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        # ✅ MULTI: torneo por UID
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+            # ✅ MULTI: torneo por UID
+            guild_id = interaction.guild.id
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo["partidos"]:
-            if p["id"] != self.partido_id:
-                continue
+            p = buscar_partido(guild_id, torneo, self.partido_id)
+            if p is not None:
+                # 🎲 COINFLIP
+                ganador = random.choice(["A", "B"])
+                perdedor = "B" if ganador == "A" else "A"
 
-            # 🎲 COINFLIP
-            ganador = random.choice(["A", "B"])
-            perdedor = "B" if ganador == "A" else "A"
-
-            p["fase_baneo"] = {
-                "activa": True,
-                "coinflip": {
-                    "ganador": ganador,
-                    "eleccion": None
-                },
-                "equipos": {
-                    ganador: {
-                        "tipo": None,
-                        "baneos_restantes": 0
+                p["fase_baneo"] = {
+                    "activa": True,
+                    "coinflip": {
+                        "ganador": ganador,
+                        "eleccion": None
                     },
-                    perdedor: {
-                        "tipo": None,
-                        "baneos_restantes": 0
-                    }
-                },
-                "turno_actual": ganador,
-                "map_pool": mapas,
-                "mapa_actual": mapas[0],
-                "baneados": [],
-                "historial": [],
-                "max_baneos": len(mapas) - 1,
-                "mapas": {
-                    m: {
-                        "baneado": False,
-                        "lado_baneado": None,
-                        "lado_forzado": None
-                    } for m in mapas
-                },
-                "historial_baneos": []
-            }
-
-            # compat
-            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-            save_data(data)
+                    "equipos": {
+                        ganador: {
+                            "tipo": None,
+                            "baneos_restantes": 0
+                        },
+                        perdedor: {
+                            "tipo": None,
+                            "baneos_restantes": 0
+                        }
+                    },
+                    "turno_actual": ganador,
+                    "map_pool": mapas,
+                    "mapa_actual": mapas[0],
+                    "bans": {},  # {mapa: máscara Axis/Allies} (baneo.py)
+                    "historial": [],
+                    "max_baneos": len(mapas) - 1,
+                    "historial_baneos": []
+                }
+                if formato:
+                    baneo.iniciar_formato(p["fase_baneo"], formato)
 
-            # =============================
-            # 📢 CANAL DEL PARTIDO
-            # =============================
-            canal = interaction.guild.get_channel(p.get("canal_partido_id"))
+                # compat
+                set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+                save_data(data)
 
-            if canal:
-                nombre_ganador = p["a"] if ganador == "A" else p["b"]
-                await canal.send(
-                    f"🎲 **Coinflip completed**\n"  # FIX (EN)
-                    f"🏆 Winner: **{nombre_ganador}**\n\n"  # FIX (EN)
-                    f"👉 Choose your advantage:",  # FIX (EN)
-                    view=ElegirTipoBanView(guild_id, self.torneo_uid, self.partido_id)
-                )
+                # =============================
+                # 📢 CANAL DEL PARTIDO
+                # =============================
+                canal = interaction.guild.get_channel(p.get("canal_partido_id"))
+
+                if canal and formato:
+                    # 📋 formato de veto: arranca directo (sin Extra/Final)
+                    nombre_ganador = p["a"] if ganador == "A" else p["b"]
+                    await canal.send(
+                        f"🎲 **Coinflip completed**\n"  # FIX (EN)
+                        f"🏆 Winner: **{nombre_ganador}**\n"  # FIX (EN)
+                        f"📋 Veto format: **{formato}**"  # FIX (EN)
+                    )
+                    await canal.send(
+                        embed=construir_embed_map_pool(p["fase_baneo"], p),
+                        view=BanMapasView(p, self.torneo_uid)
+                    )
 
-                embed = discord.Embed(
-                    title="🪙 Coinflip completed",  # FIX (EN)
-                    description=f"⚔️ **{p['a']} vs {p['b']}**",
-                    color=discord.Color.gold()
-                )
+                elif canal:
+                    nombre_ganador = p["a"] if ganador == "A" else p["b"]
+                    await canal.send(
+                        f"🎲 **Coinflip completed**\n"  # FIX (EN)
+                        f"🏆 Winner: **{nombre_ganador}**\n\n"  # FIX (EN)
+                        f"👉 Choose your advantage:",  # FIX (EN)
+                        view=ElegirTipoBanView(p, self.torneo_uid)
+                    )
 
-                embed.add_field(
-                    name="🏆 Coinflip winner",  # FIX (EN)
-                    value=f"**{nombre_ganador}**",
-                    inline=False
-                )
+                    embed = discord.Embed(
+                        title="🪙 Coinflip completed",  # FIX (EN)
+                        description=f"⚔️ **{p['a']} vs {p['b']}**",
+                        color=discord.Color.gold()
+                    )
 
-                embed.add_field(
-                    name="🔀 Selection",  # FIX (EN)
-                    value="Must choose **Extra Ban** or **Final Ban**",  # FIX (EN)
-                    inline=False
-                )
+                    embed.add_field(
+                        name="🏆 Coinflip winner",  # FIX (EN)
+                        value=f"**{nombre_ganador}**",
+                        inline=False
+                    )
 
-                embed.set_footer(
-                    text="Ban phase started automatically"  # FIX (EN)
-                )
-                await canal.send(embed=embed)
+                    embed.add_field(
+                        name="🔀 Selection",  # FIX (EN)
+                        value="Must choose **Extra Ban** or **Final Ban**",  # FIX (EN)
+                        inline=False
+                    )
 
-            # =============================
-            # ✅ CONFIRMACIÓN ADMIN
-            # =============================
-            await interaction.followup.send(
-                "✅ Coinflip completed and posted in the match channel",  # FIX (EN)
-                ephemeral=True
-            )
-            return
+                    embed.set_footer(
+                        text="Ban phase started automatically"  # FIX (EN)
+                    )
+                    await canal.send(embed=embed)
+
+                # =============================
+                # ✅ CONFIRMACIÓN ADMIN
+                # =============================
+                await interaction.followup.send(
+                    "✅ Coinflip completed and posted in the match channel",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
 
-        await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
+            await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
 # =============================
 # 📝 MODAL RESULTADO ELIMINATORIO - REV [MULTI]-EN
 # =============================
@@ -1091,37 +1686,38 @@ class ResultadoEliminatoriaModal(discord.ui.Modal):
 
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
-
-        for b in torneo.get("eliminatorias", []):
-            if b["id"] == mid:
+            guild_id = interaction.guild.id
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-                if b.get("bloqueado"):
-                    await interaction.followup.send(
-                        "🔒 Match locked",  # FIX (EN)
-                        ephemeral=True
-                    )
-                    return
+            # ✅ O(1): partido por id y el ganador pasa solo a la ronda siguiente
+            cuadro = cuadro_torneo(guild_id, torneo)
+            error = cuadro.registrar(mid, self.ganador.value)
+            if error:
+                await interaction.followup.send(_ERRORES_CUADRO[error], ephemeral=True)
+                return
 
-                b["ganador"] = self.ganador.value
-                b["resultado"] = "Finished"  # FIX (EN)
-                b["bloqueado"] = True
+            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+            save_data(data)
 
-                set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-                save_data(data)
+            texto = "🏁 Elimination result recorded"  # FIX (EN)
+            campeon = cuadro.campeon()
+            if campeon:
+                texto += f"\n🏆 Champion: **{campeon}**"  # FIX (EN)
+            else:
+                # ✅ a dónde fue cada uno (índice equipo -> partido, sin recorrer)
+                p = cuadro.partido(mid)
+                for eq in (p["a"], p["b"]):
+                    sig = cuadro.actual(eq)
+                    if sig is None:
+                        texto += f"\n❌ {eq} eliminated"  # FIX (EN)
+                        continue
+                    llave = sig.get("cuadro", "W")
+                    ronda = nombre_ronda(sig.get("ronda", 1), cuadro.rondas.get(llave, 0), llave)
+                    texto += f"\n➡️ {eq}: Match {sig['id']} ({ronda})"  # FIX (EN)
 
-                await interaction.followup.send(
-                    "🏁 Elimination result recorded",  # FIX (EN)
-                    ephemeral=True
-                )
-                return
-
-        await interaction.followup.send(
-            "❌ Match not found",  # FIX (EN)
-            ephemeral=True
-        )
+            await interaction.followup.send(texto, ephemeral=True)
 # =============================
 # VIEWS ADMIN CONFIG - REV  [MULTI SIN BORRAR LÓGICA]
 # =============================
@@ -1277,9 +1873,9 @@ class PanelConfig(discord.ui.View):
         # ✅ AÑADIDO: track canal + categoría (para poder borrar TODO por UID)
         try:
             if canal_info:
-                track_recurso_torneo(torneo, canal_id=canal_info.id)
+                track_recurso_torneo(torneo, canal_id=canal_info.id, guild_id=guild.id)
                 if getattr(canal_info, "category", None):
-                    track_recurso_torneo(torneo, categoria_id=canal_info.category.id)
+                    track_recurso_torneo(torneo, categoria_id=canal_info.category.id, guild_id=guild.id)
         except:
             pass
 
@@ -1292,9 +1888,9 @@ class PanelConfig(discord.ui.View):
         # ✅ AÑADIDO: track canal + categoría
         try:
             if canal_equipos:
-                track_recurso_torneo(torneo, canal_id=canal_equipos.id)
+                track_recurso_torneo(torneo, canal_id=canal_equipos.id, guild_id=guild.id)
                 if getattr(canal_equipos, "category", None):
-                    track_recurso_torneo(torneo, categoria_id=canal_equipos.category.id)
+                    track_recurso_torneo(torneo, categoria_id=canal_equipos.category.id, guild_id=guild.id)
         except:
             pass
 
@@ -1325,7 +1921,7 @@ class PanelConfig(discord.ui.View):
 
             await canal_equipos.send(embed=embed_equipo)
 
-        # ✅ compat: data["torneo"] apunta a este UID
+        # ✅ compat: torneo_actual() apunta a este UID
         set_torneo_activo_multi(data, guild_id, uid)
         save_data(data)
 
@@ -1361,19 +1957,89 @@ class EditarPartidoButton(discord.ui.Button):
         guild_id = interaction.guild.id
         torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo["partidos"]:
-            if str(p.get("id")) == str(self.partido_id):  # ✅ FIX str/int
-                if p.get("bloqueado"):
-                    await interaction.response.send_message(
-                        "🔒 This match is already locked and cannot be modified.",  # FIX (EN)
-                        ephemeral=True
-                    )
-                    return
+        p = buscar_partido(guild_id, torneo, self.partido_id)
+        if p is not None:
+            if p.get("bloqueado"):
+                await interaction.response.send_message(
+                    "🔒 This match is already locked and cannot be modified.",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
 
         await interaction.response.send_modal(
             FechaEstadoModal(self.partido_id, self.torneo_uid)  # ✅ ahora pide UID
         )
 # =============================
+# MODAL FASE DE GRUPOS - REV [MULTI]-EN
+# =============================
+class GruposModal(discord.ui.Modal):
+    def __init__(self, torneo_uid: str):
+        super().__init__(title="Group stage")  # FIX (EN)
+        self.torneo_uid = torneo_uid
+
+        self.n_grupos = discord.ui.TextInput(
+            label="Number of groups",  # FIX (EN)
+            placeholder="8"
+        )
+        self.clasifican = discord.ui.TextInput(
+            label="Teams that qualify per group",  # FIX (EN)
+            placeholder="2",
+            required=False
+        )
+        self.sembrado = discord.ui.TextInput(
+            label="Seeded draw? (yes/no)",  # FIX (EN)
+            placeholder="yes = registration order sets the pots",  # FIX (EN)
+            required=False
+        )
+
+        self.add_item(self.n_grupos)
+        self.add_item(self.clasifican)
+        self.add_item(self.sembrado)
+
+    async def callback(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        try:
+            n_grupos = int(self.n_grupos.value)
+            clasifican = int(self.clasifican.value or 2)
+        except ValueError:
+            await interaction.followup.send(
+                "❌ Use whole numbers (e.g.: 8 groups, 2 qualifiers)",  # FIX (EN)
+                ephemeral=True
+            )
+            return
+
+        sembrado = (self.sembrado.value or "yes").strip().lower() not in ("no", "n", "random")
+
+        global data
+        data = load_data()
+
+        guild_id = interaction.guild.id
+        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+        n_equipos = len(torneo.get("equipos", []))
+
+        # cada grupo con al menos 2 equipos y clasificados <= grupo más chico
+        if n_grupos < 1 or n_grupos * 2 > n_equipos:
+            await interaction.followup.send(
+                f"❌ With {n_equipos} teams you can have between 1 and {n_equipos // 2} groups",  # FIX (EN)
+                ephemeral=True
+            )
+            return
+
+        if not 1 <= clasifican <= n_equipos // n_grupos:
+            await interaction.followup.send(
+                f"❌ Qualifiers per group must be between 1 and {n_equipos // n_grupos}",  # FIX (EN)
+                ephemeral=True
+            )
+            return
+
+        # ✅ la config se escribe junto con el sorteo, dentro del bloqueo del torneo
+        await ejecutar_sorteo(interaction, self.torneo_uid, "GRUPOS", {
+            "n_grupos": n_grupos,
+            "clasifican": clasifican,
+            "sembrado": sembrado,
+        })
+# =============================
 # View Formato Partidos - REV  [MULTI] - EN
 # =============================
 class FormatoPartidosView(discord.ui.View):
@@ -1396,48 +2062,60 @@ class FormatoPartidosView(discord.ui.View):
         style=discord.ButtonStyle.primary
     )
     async def unico(self, button, interaction):
-        global data
-        data = load_data()
+        await interaction.response.edit_message(
+            content="✅ Format selected: **Single match**",  # FIX (EN)
+            view=None
+        )
 
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+        # ✅ formato + sorteo en UNA transacción del torneo de esta vista
+        await ejecutar_sorteo(interaction, self.torneo_uid, "UNICO")
+
+    @discord.ui.button(
+        label="🧩 Groups",  # FIX (EN)
+        style=discord.ButtonStyle.secondary
+    )
+    async def grupos(self, button, interaction):
+        # cantidad de grupos / clasificados / siembra -> GruposModal
+        await interaction.response.send_modal(GruposModal(self.torneo_uid))
 
-        torneo["formato_partidos"] = "UNICO"
+    @discord.ui.button(
+        label="📅 League",  # FIX (EN)
+        style=discord.ButtonStyle.secondary
+    )
+    async def liga(self, button, interaction):
+        await interaction.response.edit_message(
+            content="✅ Format selected: **League (round robin)**",  # FIX (EN)
+            view=None
+        )
 
-        # ✅ compat: apunta data["torneo"] al torneo correcto
-        set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-        save_data(data)
+        # ✅ formato + sorteo en UNA transacción del torneo de esta vista
+        await ejecutar_sorteo(interaction, self.torneo_uid, "LIGA")
 
+    @discord.ui.button(
+        label="♟️ Swiss",  # FIX (EN)
+        style=discord.ButtonStyle.secondary
+    )
+    async def suizo(self, button, interaction):
         await interaction.response.edit_message(
-            content="✅ Format selected: **Single match**",  # FIX (EN)
+            content="✅ Format selected: **Swiss**",  # FIX (EN)
             view=None
         )
 
-        await ejecutar_sorteo(interaction)
+        # ✅ formato + sorteo en UNA transacción del torneo de esta vista
+        await ejecutar_sorteo(interaction, self.torneo_uid, "SUIZO")
 
     @discord.ui.button(
         label="🔁 Home & Away",  # FIX (EN)
         style=discord.ButtonStyle.success
     )
     async def ida_vuelta(self, button, interaction):
-        global data
-        data = load_data()
-
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
-
-        torneo["formato_partidos"] = "IDA_VUELTA"
-
-        # ✅ compat: apunta data["torneo"] al torneo correcto
-        set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-        save_data(data)
-
         await interaction.response.edit_message(
             content="✅ Format selected: **Home & Away**",  # FIX (EN)
             view=None
         )
 
-        await ejecutar_sorteo(interaction)
+        # ✅ formato + sorteo en UNA transacción del torneo de esta vista
+        await ejecutar_sorteo(interaction, self.torneo_uid, "IDA_VUELTA")
 # =============================
 #  Boton Sorteo - REV (multi-torneo)  [MULTI REAL] - ENG
 # =============================
@@ -1482,108 +2160,115 @@ class SorteoButton(discord.ui.Button):
 # =============================
 #  Def Ejecutar Sorteo - REV  [MULTI SIN BORRAR LÓGICA]  (FIX PERSISTENCIA IDS) - EN
 # =============================
-async def ejecutar_sorteo(interaction):
-    global data
-    data = load_data()
-
+async def ejecutar_sorteo(interaction, torneo_uid: str, formato: str, fase_grupos: dict | None = None):
+    """
+    Fija el formato (y la config de grupos) y sortea la primera ronda, todo
+    dentro de la transacción de `torneo_uid` (no del torneo activo).
+    """
     guild_id = interaction.guild.id
-    uid = get_server(data, guild_id).get("activo", "DEFAULT")
-
-    torneo = get_torneo_v2(data, guild_id, uid)
-
-    equipos = torneo["equipos"].copy()
-    random.shuffle(equipos)
-
-    partidos = []
-    pid = 1
-    formato = torneo["formato_partidos"]
 
-    for i in range(0, len(equipos), 2):
-        if i + 1 < len(equipos):
-            a = equipos[i]["nombre"]
-            b = equipos[i + 1]["nombre"]
+    # ✅ UNIT OF WORK: un solo commit al final (rollback si algo revienta)
+    async with transaccion_torneo(guild_id, torneo_uid) as t:
+        uid = t.uid
+        torneo = t.torneo
 
-            # 🟢 PARTIDO ÚNICO
-            partidos.append({
-                "id": pid,
-                "a": a,
-                "b": b,
-                "fecha": "⏰ Not set",  # FIX (EN)
-                "estado": "🕒 Pending",  # FIX (EN)
+        # doble click / dos admins: se vuelve a mirar con el bloqueo tomado
+        if torneo.get("partidos"):
+            await interaction.followup.send(
+                "❌ Matches have already been drawn",  # FIX (EN)
+                ephemeral=True
+            )
+            return
 
+        torneo["formato_partidos"] = formato
+        if fase_grupos is not None:
+            torneo["fase_grupos"] = fase_grupos
+
+        equipos = torneo["equipos"].copy()
+        random.shuffle(equipos)
+
+        partidos = []
+        pid = 1
+        bye = None
+
+        # ♟️ SUIZO / 📅 LIGA / 🧩 GRUPOS: solo la ronda 1 (las demás con SiguienteRondaButton)
+        # (la config de grupos llega de GruposModal en fase_grupos)
+        if formato in GENERADORES_RONDA:
+            torneo["partidos"] = []
+            torneo.pop("suizo", None)
+            torneo.pop("liga", None)
+            (torneo.get("fase_grupos") or {}).pop("grupos", None)
+            partidos, bye = GENERADORES_RONDA[formato][1](guild_id, torneo)
+            equipos = []
+
+        for i in range(0, len(equipos), 2):
+            if i + 1 < len(equipos):
+                a = equipos[i]["nombre"]
+                b = equipos[i + 1]["nombre"]
+
+                # 🟢 PARTIDO ÚNICO
                 # ✅ MULTI: amarrar partido a su torneo
-                "torneo_uid": uid
-            })
-            pid += 1
-
-            # 🔁 IDA Y VUELTA
-            if formato == "IDA_VUELTA":
-                partidos.append({
-                    "id": pid,
-                    "a": b,
-                    "b": a,
-                    "fecha": "⏰ Not set",  # FIX (EN)
-                    "estado": "🕒 Pending",  # FIX (EN)
-
-                    # ✅ MULTI: amarrar partido a su torneo
-                    "torneo_uid": uid
-                })
+                partidos.append(modelos.nuevo_partido(id=pid, a=a, b=b, torneo_uid=uid))
                 pid += 1
 
-    torneo["partidos"] = partidos
+                # 🔁 IDA Y VUELTA
+                if formato == "IDA_VUELTA":
+                    partidos.append(modelos.nuevo_partido(id=pid, a=b, b=a, torneo_uid=uid))
+                    pid += 1
 
-    # ✅ compat: apunta data["torneo"] al torneo correcto
-    set_torneo_activo_multi(data, guild_id, uid)
-    save_data(data)
+        torneo["partidos"] = partidos
+        reindexar_partidos(guild_id, torneo)
+        olvidar_usuarios_torneo(guild_id, uid)  # los partidos viejos ya no existen
+
+        await publicar_partidos(interaction, t, torneo["partidos"])
+
+    texto = "✅ Matches created successfully based on the selected format"  # FIX (EN)
+    if bye:
+        texto += f"\n☕ Bye this round: **{bye}**"  # FIX (EN)
+    await interaction.followup.send(texto, ephemeral=True)
+# =============================
+#  Def Publicar Partidos - REV  [MULTI]
+# =============================
+async def publicar_partidos(interaction, t, partidos: list):
+    """
+    Canales público/admin del torneo (se reutilizan si existen) + mensaje
+    público y panel admin de CADA partido de `partidos`.
+    Va dentro de la transacción `t` del que llama.
+    """
+    guild_id = interaction.guild.id
+    data = t.data
+    uid = t.uid
+    torneo = t.torneo
 
     guild = interaction.guild
 
     # 📺 Canal público de partidos (aislado por UID)
+    # (crear_categoria_y_canal ya trackea canal + categoría en el torneo)
     canal_partidos = await crear_categoria_y_canal(
         guild,
         f"⚔️ MATCHES - {uid}",  # FIX (EN)
-        f"matches-to-play-{uid.lower()}"  # FIX (EN)
+        f"matches-to-play-{uid.lower()}",  # FIX (EN)
+        uid
     )
-
-    # ✅ AÑADIDO: TRACK categoría/canal público (para borrado por IDs)
-    try:
-        track_recurso_torneo(
-            torneo,
-            canal_id=canal_partidos.id,
-            categoria_id=getattr(canal_partidos, "category_id", None)
-        )
-        set_torneo_activo_multi(data, guild_id, uid)
-        save_data(data)
-    except:
-        pass
+    registrar_recurso_discord(guild_id, torneo, canal_partidos.id, "canal_publico")
 
     # 🛠️ Canal ADMIN (aislado por UID)
     canal_admin = await crear_categoria_y_canal(
         guild,
         f"⚙️ TOURNAMENT ADMIN - {uid}",  # FIX (EN)
-        f"admin-matches-{uid.lower()}"  # FIX (EN)
+        f"admin-matches-{uid.lower()}",  # FIX (EN)
+        uid
     )
 
-    # ✅ AÑADIDO: TRACK categoría/canal admin (para borrado por IDs)
-    try:
-        track_recurso_torneo(
-            torneo,
-            canal_id=canal_admin.id,
-            categoria_id=getattr(canal_admin, "category_id", None)
-        )
-        set_torneo_activo_multi(data, guild_id, uid)
-        save_data(data)
-    except:
-        pass
-
     # =============================
     # PUBLICAR PARTIDOS (PÚBLICO)
     # =============================
-    for p in torneo["partidos"]:
+    rol_streamer_id = data.get("rol_streamer_id")
+
+    for p in partidos:
         embed = build_partido_embed(p)
         view_publica = discord.ui.View(timeout=None)
 
-        rol_streamer_id = data.get("rol_streamer_id")
         if rol_streamer_id:
             view_publica.add_item(
                 # ✅ MULTI: el botón público debe llevar uid
@@ -1595,47 +2280,19 @@ async def ejecutar_sorteo(interaction):
             view=view_publica
         )
 
-        # ✅ (tu guardado local se mantiene)
+        # ✅ p ES el partido real del store: no hace falta recargar
+        tocar_partido(guild_id, torneo, p)
         p["canal_publico_id"] = canal_partidos.id
         p["mensaje_publico_id"] = mensaje.id
         p["torneo_uid"] = uid
-
-        # ✅✅ AÑADIDO CLAVE: persistir sobre el PARTIDO REAL del data.json (evita None None)
-        try:
-            data = load_data()
-            torneo_real = get_torneo_v2(data, guild_id, uid)
-
-            for pp in torneo_real.get("partidos", []):
-                if str(pp.get("id")) == str(p.get("id")):
-                    pp["canal_publico_id"] = canal_partidos.id
-                    pp["mensaje_publico_id"] = mensaje.id
-                    pp["torneo_uid"] = uid
-                    break
-
-            set_torneo_activo_multi(data, guild_id, uid)
-            save_data(data)
-        except Exception as e:
-            print("⚠️ Could not persist public IDs:", repr(e))  # FIX (EN)
-
-        # ✅ AÑADIDO: re-track por si el canal/categoría cambió o venía vacío
-        try:
-            track_recurso_torneo(
-                torneo,
-                canal_id=canal_partidos.id,
-                categoria_id=getattr(canal_partidos, "category_id", None)
-            )
-        except:
-            pass
-
-        set_torneo_activo_multi(data, guild_id, uid)
-        save_data(data)
+        registrar_recurso_discord(guild_id, torneo, mensaje.id, "mensaje_publico", p["id"], canal_partidos.id)
 
     # =============================
     # PANEL ADMIN
     # =============================
     admin_id = interaction.user.id
 
-    for p in torneo["partidos"]:
+    for p in partidos:
         view = discord.ui.View(timeout=None)
 
         # ✅ TODOS estos botones ahora deben recibir uid (torneo_uid)
@@ -1652,23 +2309,190 @@ async def ejecutar_sorteo(interaction):
             f"⚔️ **{p['a']} vs {p['b']}**",
             view=view
         )
+# =============================
+# SISTEMA SUIZO (RONDA A RONDA) - REV
+# =============================
+# torneo["suizo"] = {"ronda": última generada, "rondas": total, "byes": [equipo, ...]}
+# Cada ronda se empareja desde la clasificación del momento
+# (emparejamientos.py), sin revanchas. El BYE cuenta como victoria SOLO para
+# agrupar por puntaje (la tabla no se toca).
+def generar_ronda_suiza(guild_id: int, torneo: dict) -> tuple:
+    """-> (partidos nuevos de la ronda, equipo con BYE | None). No los agrega."""
+    suizo = torneo.setdefault("suizo", {"ronda": 0, "rondas": 0, "byes": []})
+    nombres = [e["nombre"] for e in torneo.get("equipos", []) if e.get("nombre")]
+    if not suizo["rondas"]:
+        suizo["rondas"] = emparejamientos.rondas_suizo(len(nombres))
+
+    clasif = clasificacion_torneo(guild_id, torneo)
+    for n in nombres:
+        clasif.asegurar(n)
+
+    inscritos = set(nombres)
+    orden = [e for e, _ in clasif.ordenados() if e in inscritos]
+    if suizo["ronda"] == 0:
+        random.shuffle(orden)  # ronda 1: sorteo, como el formato clásico
+
+    byes = {}
+    for e in suizo["byes"]:
+        byes[e] = byes.get(e, 0) + 1
+    puntos = {
+        e: torneo["tabla"][e].get("pts", 0) + clasificacion.PTS_VICTORIA * byes.get(e, 0)
+        for e in orden
+    }
+    orden.sort(key=lambda e: -puntos[e])  # estable: respeta los desempates
+
+    jugados = {emparejamientos.par(p.get("a"), p.get("b")) for p in torneo.get("partidos", [])}
+    pares, bye = emparejamientos.emparejar_suizo(orden, puntos, jugados, byes)
+
+    suizo["ronda"] += 1
+    if bye is not None:
+        suizo["byes"].append(bye)
+
+    uid = torneo.get("torneo_uid")
+    pid = _next_partido_id(torneo)
+    nuevos = [
+        modelos.nuevo_partido(id=pid + i, a=a, b=b, torneo_uid=uid, ronda=suizo["ronda"])
+        for i, (a, b) in enumerate(pares)
+    ]
+    return nuevos, bye
+# =============================
+# LIGA (ROUND ROBIN RONDA A RONDA) - REV
+# =============================
+# torneo["liga"] = {"ronda": última generada, "rondas": total, "orden": [equipo, ...]}
+# El orden se sortea UNA vez; cada ronda sale de ahí por el método del
+# círculo (emparejamientos.py, O(n)) y se publica recién cuando el admin la
+# pide: una liga de cientos de equipos no crea todos sus partidos juntos.
+def generar_ronda_liga(guild_id: int, torneo: dict) -> tuple:
+    """-> (partidos nuevos de la ronda, equipo con BYE | None). No los agrega."""
+    liga = torneo.get("liga")
+    if liga is None:
+        orden = [e["nombre"] for e in torneo.get("equipos", []) if e.get("nombre")]
+        random.shuffle(orden)
+        liga = torneo["liga"] = {
+            "ronda": 0,
+            "rondas": emparejamientos.rondas_liga(len(orden)),
+            "orden": orden,
+        }
+
+    orden = liga["orden"]
+    pares, bye = emparejamientos.ronda_circulo(len(orden), liga["ronda"])
+    liga["ronda"] += 1
+
+    uid = torneo.get("torneo_uid")
+    pid = _next_partido_id(torneo)
+    nuevos = [
+        modelos.nuevo_partido(id=pid + i, a=orden[x], b=orden[y], torneo_uid=uid, ronda=liga["ronda"])
+        for i, (x, y) in enumerate(pares)
+    ]
+    return nuevos, (orden[bye] if bye is not None else None)
+
+# =============================
+# FASE DE GRUPOS (RONDA A RONDA) - REV
+# =============================
+# Sorteo de grupos (con o sin siembra) la primera vez; después cada ronda
+# trae la fecha r de TODOS los grupos a la vez (método del círculo por grupo).
+def generar_ronda_grupos(guild_id: int, torneo: dict) -> tuple:
+    """-> (partidos nuevos de la ronda, equipos con BYE | None). No los agrega."""
+    fase = torneo.setdefault("fase_grupos", {})
+    if not fase.get("grupos"):
+        # siembra = orden de inscripción (el 1º es cabeza de serie)
+        nombres = [e["nombre"] for e in torneo.get("equipos", []) if e.get("nombre")]
+        fase["grupos"] = emparejamientos.sortear_grupos(
+            nombres, int(fase.get("n_grupos", 1)), fase.get("sembrado", True)
+        )
+        fase["ronda"] = 0
+        fase["rondas"] = max(emparejamientos.rondas_liga(len(g)) for g in fase["grupos"].values())
 
-        # ✅ AÑADIDO: asegurar que el canal admin y su categoría estén trackeados
-        try:
-            track_recurso_torneo(
-                torneo,
-                canal_id=canal_admin.id,
-                categoria_id=getattr(canal_admin, "category_id", None)
+        clasif = clasificacion_torneo(guild_id, torneo)
+        for n in nombres:
+            clasif.asegurar(n)
+
+    ronda = fase["ronda"]
+    fase["ronda"] += 1
+
+    uid = torneo.get("torneo_uid")
+    pid = _next_partido_id(torneo)
+    nuevos, byes = [], []
+    for letra, equipos in fase["grupos"].items():
+        if ronda >= emparejamientos.rondas_liga(len(equipos)):
+            continue  # grupo más chico: ya jugó todo
+        pares, bye = emparejamientos.ronda_circulo(len(equipos), ronda)
+        for x, y in pares:
+            nuevos.append(modelos.nuevo_partido(
+                id=pid + len(nuevos), a=equipos[x], b=equipos[y],
+                torneo_uid=uid, ronda=fase["ronda"], grupo=letra
+            ))
+        if bye is not None:
+            byes.append(equipos[bye])
+    return nuevos, (", ".join(byes) or None)
+
+# formato -> (llave del estado en el torneo, generador de la ronda siguiente)
+GENERADORES_RONDA = {
+    "SUIZO": ("suizo", generar_ronda_suiza),
+    "LIGA": ("liga", generar_ronda_liga),
+    "GRUPOS": ("fase_grupos", generar_ronda_grupos),
+}
+# =============================
+#  Boton Siguiente Ronda - REV  [MULTI] - EN
+# =============================
+class SiguienteRondaButton(discord.ui.Button):
+    def __init__(self, torneo_uid: str, admin_id):
+        super().__init__(
+            label="⏭️ Next round",  # FIX (EN)
+            style=discord.ButtonStyle.primary
+        )
+        self.torneo_uid = torneo_uid
+        self.admin_id = admin_id
+
+    async def callback(self, interaction):
+        await interaction.response.defer(ephemeral=True)
+
+        if interaction.user.id != self.admin_id:
+            await interaction.followup.send(
+                "❌ Admin only",  # FIX (EN)
+                ephemeral=True
             )
-            set_torneo_activo_multi(data, guild_id, uid)
-            save_data(data)
-        except:
-            pass
+            return
 
-    await interaction.followup.send(
-        "✅ Matches created successfully based on the selected format",  # FIX (EN)
-        ephemeral=True
-    )
+        guild_id = interaction.guild.id
+        async with transaccion_torneo(guild_id, self.torneo_uid) as t:
+            torneo = t.torneo
+
+            formato = torneo.get("formato_partidos")
+            if formato not in GENERADORES_RONDA:
+                await interaction.followup.send(
+                    "❌ This tournament is not played in rounds",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
+
+            # suizo: la ronda siguiente depende de los resultados
+            # liga: el fixture ya está fijo, se puede adelantar
+            if formato == "SUIZO" and not all(p.get("bloqueado") for p in torneo.get("partidos", [])):
+                await interaction.followup.send(
+                    "⏳ Finish every match of the current round first",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
+
+            llave, generar = GENERADORES_RONDA[formato]
+            estado = torneo.get(llave) or {}
+            if estado.get("ronda", 0) >= estado.get("rondas", 0):
+                await interaction.followup.send(
+                    "🏁 All rounds have already been played",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
+
+            nuevos, bye = generar(guild_id, torneo)
+            torneo["partidos"].extend(nuevos)
+            reindexar_partidos(guild_id, torneo)
+            await publicar_partidos(interaction, t, nuevos)
+
+        texto = f"✅ Round {estado['ronda']}/{estado['rondas']} created ({len(nuevos)} matches)"  # FIX (EN)
+        if bye:
+            texto += f"\n☕ Bye this round: **{bye}**"  # FIX (EN)
+        await interaction.followup.send(texto, ephemeral=True)
 # =============================
 #  Boton Editar Fecha - REV  [MULTI SIN BORRAR LÓGICA] - EN
 # =============================
@@ -1696,10 +2520,8 @@ class EditarFechaButton(discord.ui.Button):
         guild_id = interaction.guild.id
         torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo["partidos"]:
-            if p["id"] != self.partido_id:
-                continue
-
+        p = buscar_partido(guild_id, torneo, self.partido_id)
+        if p is not None:
             # 🔒 Partido cerrado
             if p.get("bloqueado"):
                 await interaction.response.send_message(
@@ -1748,10 +2570,8 @@ class EditarEstadoButton(discord.ui.Button):
         guild_id = interaction.guild.id
         torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo["partidos"]:
-            if p["id"] != self.partido_id:
-                continue
-
+        p = buscar_partido(guild_id, torneo, self.partido_id)
+        if p is not None:
             if p.get("bloqueado"):
                 await interaction.response.send_message(
                     "🔒 This match is already closed. The status cannot be edited.",  # FIX (EN)
@@ -1841,10 +2661,7 @@ class ResultadoButton(discord.ui.Button):
         guild_id = interaction.guild.id
         torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        partido = next(
-            (p for p in torneo.get("partidos", []) if p["id"] == self.partido_id),
-            None
-        )
+        partido = buscar_partido(guild_id, torneo, self.partido_id)
 
         if not partido:
             await interaction.response.send_message(
@@ -1853,16 +2670,13 @@ class ResultadoButton(discord.ui.Button):
             )
             return
 
-        if partido.get("bloqueado"):
-            await interaction.response.send_message(
-                "🔒 This match has already been finished",  # FIX (EN)
-                ephemeral=True
-            )
-            return
+        # 🔒 partido terminado: el modal pasa a ser una CORRECCIÓN del
+        # resultado (la tabla se recalcula entera, ver ResultadoModal)
+        correccion = bool(partido.get("bloqueado"))
 
         # ✅ ABRIR MODAL (ahora pide UID)
         await interaction.response.send_modal(
-            ResultadoModal(self.partido_id, self.torneo_uid)
+            ResultadoModal(self.partido_id, self.torneo_uid, correccion)
         )
 # =============================
 #  BOTÓN CREAR CANAL DE PARTIDO - REV (FIX) [MULTI SIN BORRAR LÓGICA] - EN
@@ -1889,14 +2703,15 @@ class CrearCanalPartidoButton(discord.ui.Button):
 
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        # ✅ MULTI: torneo por UID
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+            # ✅ MULTI: torneo por UID
+            guild_id = interaction.guild.id
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo.get("partidos", []):
+            p = buscar_partido(guild_id, torneo, self.partido_id)
             # ✅ FIX: tolerante a str/int
-            if str(p.get("id")) == str(self.partido_id):
+            if p is not None:
 
                 if p.get("canal_partido_id"):
                     await interaction.followup.send(
@@ -1911,17 +2726,24 @@ class CrearCanalPartidoButton(discord.ui.Button):
                 # 📁 OBTENER / CREAR CATEGORÍA (aislada por UID)
                 # =============================
                 categoria_nombre = f"📛 BAN PHASE CHANNELS - {self.torneo_uid}"  # FIX (EN)
-                categoria = discord.utils.get(
-                    guild.categories,
-                    name=categoria_nombre
+
+                # ✅ por índice (id guardado); el nombre queda como último recurso
+                categoria = guild.get_channel(
+                    buscar_id_discord(guild_id, self.torneo_uid, "categoria_baneo") or 0
                 )
+                if not isinstance(categoria, discord.CategoryChannel):
+                    categoria = discord.utils.get(
+                        guild.categories,
+                        name=categoria_nombre
+                    )
 
                 if categoria is None:
                     categoria = await guild.create_category(categoria_nombre)
 
                 # ✅ NUEVO: TRACK categoría (aunque ya existiera)
                 try:
-                    track_recurso_torneo(torneo, categoria_id=categoria.id)
+                    track_recurso_torneo(torneo, categoria_id=categoria.id, guild_id=guild_id)
+                    registrar_recurso_discord(guild_id, torneo, categoria.id, "categoria_baneo")
                     set_torneo_activo_multi(data, guild_id, self.torneo_uid)
                     save_data(data)
                 except:
@@ -1941,7 +2763,8 @@ class CrearCanalPartidoButton(discord.ui.Button):
 
                 # ✅ NUEVO: TRACK canal (ID real para borrado total)
                 try:
-                    track_recurso_torneo(torneo, canal_id=canal.id)
+                    track_recurso_torneo(torneo, canal_id=canal.id, guild_id=guild_id)
+                    registrar_recurso_discord(guild_id, torneo, canal.id, "canal_partido", p["id"])
                     set_torneo_activo_multi(data, guild_id, self.torneo_uid)
                     save_data(data)
                 except:
@@ -1954,6 +2777,7 @@ class CrearCanalPartidoButton(discord.ui.Button):
                 # ✅ GUARDADO (IGUAL QUE ANTES)
                 p["canal_partido_id"] = canal.id
                 p["mensaje_partido_id"] = mensaje.id
+                registrar_recurso_discord(guild_id, torneo, mensaje.id, "mensaje_partido", p["id"], canal.id)
 
                 # compat
                 set_torneo_activo_multi(data, guild_id, self.torneo_uid)
@@ -1968,7 +2792,7 @@ class CrearCanalPartidoButton(discord.ui.Button):
                     "🔒 These captains will be the only ones who can:\n"  # FIX (EN)
                     "• Choose Extra / Final Ban\n"
                     "• Ban maps",  # FIX (EN)
-                    view=AsignarCapitanesView(guild_id, self.torneo_uid, p["id"])
+                    view=AsignarCapitanesView(guild_id, self.torneo_uid, p)
                 )
 
                 await interaction.followup.send(
@@ -1977,7 +2801,7 @@ class CrearCanalPartidoButton(discord.ui.Button):
                 )
                 return
 
-        await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
+            await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
 # =============================
 #  Boton postular streamers - REV (FIX)  [MULTI SIN BORRAR LÓGICA] - EN
 # =============================
@@ -2005,14 +2829,15 @@ class PostularStreamerButton(discord.ui.Button):
 
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        # ✅ MULTI: torneo por UID
-        guild_id = interaction.guild.id
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+            # ✅ MULTI: torneo por UID
+            guild_id = interaction.guild.id
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo.get("partidos", []):
+            p = buscar_partido(guild_id, torneo, self.partido_id)
             # ✅ FIX: tolerante a str/int
-            if str(p.get("id")) == str(self.partido_id):
+            if p is not None:
 
                 p.setdefault("streamers_postulados", [])
                 p.setdefault("streamers_aprobados", [])
@@ -2025,6 +2850,7 @@ class PostularStreamerButton(discord.ui.Button):
                     return
 
                 p["streamers_postulados"].append(interaction.user.id)
+                reindexar_usuarios_partido(guild_id, self.torneo_uid, p)
 
                 # compat
                 set_torneo_activo_multi(data, guild_id, self.torneo_uid)
@@ -2041,7 +2867,7 @@ class PostularStreamerButton(discord.ui.Button):
                 )
                 return
 
-        await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
+            await interaction.followup.send("❌ Match not found", ephemeral=True)  # FIX (EN)
 # =============================
 #  Boton añadir Streamers - REV  [MULTI SIN BORRAR LÓGICA] - EN
 # =============================
@@ -2064,13 +2890,8 @@ class AñadirStreamerButton(discord.ui.Button):
         set_torneo_activo_multi(data, guild_id, self.torneo_uid)
 
         # 🔍 OBTENER PARTIDO CORRECTO
-        p = None
         torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
-
-        for partido in torneo["partidos"]:
-            if partido["id"] == self.partido_id:
-                p = partido
-                break
+        p = buscar_partido(guild_id, torneo, self.partido_id)
 
         if not p:
             await interaction.response.send_message(
@@ -2120,93 +2941,52 @@ class IniciarFaseBaneoButton(discord.ui.Button):
 
         torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo["partidos"]:
-            # ✅ FIX: tolerante a str/int
-            if str(p.get("id")) == str(self.partido_id):
-
-                if p.get("resultado"):
-                    await interaction.response.send_message(
-                        "🏁 The match has already finished",  # FIX (EN)
-                        ephemeral=True
-                    )
-                    return
-
-                if p.get("fase_baneo", {}).get("activa"):
-                    await interaction.response.send_message(
-                        "🚫 The ban phase is already active",  # FIX (EN)
-                        ephemeral=True
-                    )
-                    return
-
-                if not hay_capitanes(p):
-                    await interaction.response.send_message(
-                        "🔒 The ban phase cannot be started.\n"  # FIX (EN)
-                        "❌ Both teams must have at least one captain assigned.",  # FIX (EN)
-                        ephemeral=True
-                    )
-                    return
+        p = buscar_partido(guild_id, torneo, self.partido_id)
+        # ✅ FIX: tolerante a str/int
+        if p is not None:
 
-                await interaction.response.send_modal(
-                    MapPoolModal(self.partido_id, self.torneo_uid)  # ✅ ahora pide UID
+            if p.get("resultado"):
+                await interaction.response.send_message(
+                    "🏁 The match has already finished",  # FIX (EN)
+                    ephemeral=True
                 )
                 return
-# =============================
-# Def mISMO ID
-# ============================= 
-def mismo_id(a, b) -> bool:
-    return str(a) == str(b)
-# =============================
-# Def Cambiar Turno - REV NO TOCA
-# =============================                 
-def cambiar_turno(fase):
-    actual = fase["turno_actual"]
-    tipo = fase["equipos"][actual]["tipo"]
 
-    if tipo == "extra":
-        # Extra ban banea DOS VECES
-        fase.setdefault("contador_extra", 0)
-        fase["contador_extra"] += 1
+            if p.get("fase_baneo", {}).get("activa"):
+                await interaction.response.send_message(
+                    "🚫 The ban phase is already active",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
 
-        if fase["contador_extra"] >= 2:
-            fase["contador_extra"] = 0
-            fase["turno_actual"] = "A" if actual == "B" else "B"
+            if not hay_capitanes(p):
+                await interaction.response.send_message(
+                    "🔒 The ban phase cannot be started.\n"  # FIX (EN)
+                    "❌ Both teams must have at least one captain assigned.",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
 
-    else:
-        # Final ban banea UNA VEZ
-        fase["turno_actual"] = "A" if actual == "B" else "B"
+            await interaction.response.send_modal(
+                MapPoolModal(self.partido_id, self.torneo_uid)  # ✅ ahora pide UID
+            )
+            return
+# =============================
+# Def mISMO ID
+# ============================= 
+def mismo_id(a, b) -> bool:
+    return str(a) == str(b)
 # =============================
 # Ban Mapas View - FIX (MULTI)
 # =============================
 class BanMapasView(discord.ui.View):
-    def __init__(self, torneo_id, partido_id, torneo_uid: str):
+    """
+    View PURA: se arma con el partido ya cargado (sin load/save).
+    Los callbacks de los botones son los que leen/escriben el store.
+    """
+    def __init__(self, partido: dict, torneo_uid: str):
         super().__init__(timeout=None)
 
-        global data
-        data = load_data()  # ✅ para evitar data viejo en views persistentes
-
-        # ✅ MULTI: fijar torneo correcto (compat)
-        guild_id = torneo_id  # torneo_id aquí realmente es guild_id (como ya lo usas)
-        set_torneo_activo_multi(data, guild_id, torneo_uid)
-
-        torneo = get_torneo_v2(data, guild_id, torneo_uid)
-
-        # 🔎 buscar partido (tolerante a str/int)
-        partido = None
-        for p in torneo.get("partidos", []):
-            if str(p.get("id")) == str(partido_id):
-                partido = p
-                break
-
-        if not partido:
-            ids = [str(x.get("id")) for x in torneo.get("partidos", [])]
-            self.add_item(discord.ui.Button(
-                label=f"⚠️ Partido no encontrado (busqué {partido_id})",
-                style=discord.ButtonStyle.secondary,
-                disabled=True
-            ))
-            print("❌ BanMapasView no encontró partido_id:", partido_id, "IDs en torneo:", ids)
-            return
-
         fase = partido.get("fase_baneo")
         if not fase:
             self.add_item(discord.ui.Button(
@@ -2216,14 +2996,22 @@ class BanMapasView(discord.ui.View):
             ))
             return
 
-        # ✅ asegurar mapa_actual
-        mapa_actual = fase.get("mapa_actual")
-        if (not mapa_actual) and fase.get("map_pool"):
-            fase["mapa_actual"] = fase["map_pool"][0]
-            fase["mapa_vista"] = fase["map_pool"][0]
-            mapa_actual = fase["mapa_actual"]
-            save_data(data)
+        # ✅ IMPORTANTÍSIMO: NO convertir a int
+        pid = str(partido.get("id"))
 
+        # 📋 formatos de veto: los botones salen de la tabla compilada
+        if fase.get("formato"):
+            paso = baneo.paso_actual(fase)
+            if paso is None:
+                return
+            for etiqueta, valor in paso.botones:
+                self.add_item(VetoButton(pid, paso.accion, valor, etiqueta, torneo_uid))
+            if paso.con_next:
+                self.add_item(NextMapButton(pid, torneo_uid))
+            return
+
+        # mapa_actual lo fijan MapPoolModal / Extra / Final / recalcular_mapa_actual
+        mapa_actual = fase.get("mapa_actual")
         if not mapa_actual:
             self.add_item(discord.ui.Button(
                 label="⚠️ Sin mapa actual",
@@ -2232,9 +3020,6 @@ class BanMapasView(discord.ui.View):
             ))
             return
 
-        # ✅ IMPORTANTÍSIMO: NO convertir a int
-        pid = str(partido.get("id"))
-
         # ✅ BOTONES (AHORA PASAN torneo_uid PARA MULTITORNEO)
         self.add_item(BanMapaButton(pid, mapa_actual, "Axis", torneo_uid))
         self.add_item(BanMapaButton(pid, mapa_actual, "Allies", torneo_uid))
@@ -2243,21 +3028,13 @@ class BanMapasView(discord.ui.View):
 # DEF facciones_vivas_en_mapa
 # ============================= 
 def facciones_vivas_en_mapa(fase, mapa):
-    vivas = set()
-    if f"{mapa} Axis" not in fase["baneados"]:
-        vivas.add("Axis")
-    if f"{mapa} Allies" not in fase["baneados"]:
-        vivas.add("Allies")
-    return vivas
+    # O(1): tabla por máscara
+    return set(baneo.facciones_vivas(fase, mapa))
 # =============================
 # DEF mapas_vivos - REV NO TOCA
 # ============================= 
 def mapas_vivos(fase):
-    vivos = []
-    for m in fase["map_pool"]:
-        if len(facciones_vivas_en_mapa(fase, m)) > 0:
-            vivos.append(m)
-    return vivos
+    return baneo.mapas_vivos(fase)
 # =============================
 # DEF evaluar_cierre_fase - REV NO TOCA
 # ============================= 
@@ -2266,64 +3043,9 @@ def evaluar_cierre_fase(fase):
     Retorna:
     - None → NO se puede cerrar aún
     - dict con resultado → cerrar fase
+    (RUTA_2_AUTO / RUTA_2_FINAL_BAN / RUTA_1_FINAL_BAN, ver baneo.evaluar_cierre)
     """
-
-    mapas = mapas_vivos(fase)
-
-    # ============================
-    # 🟢 RUTA 2 — 1 MAPA / 2 FACCIONES
-    # Final Ban decide FACCIÓN
-    # ============================
-    if len(mapas) == 1:
-        mapa = mapas[0]
-        facciones = facciones_vivas_en_mapa(fase, mapa)
-
-        # 1 mapa / 1 facción → cierre automático (NO Final Ban real)
-        if len(facciones) == 1:
-            faccion_final = next(iter(facciones))
-            equipo_final = fase["coinflip"]["ganador"]
-            equipo_opuesto = "B" if equipo_final == "A" else "A"
-
-            return {
-                "ruta": "RUTA_2_AUTO",
-                "mapa_final": mapa,
-                "facciones_finales": {
-                    equipo_final: faccion_final,
-                    equipo_opuesto: "Axis" if faccion_final == "Allies" else "Allies"
-                }
-            }
-
-        # 1 mapa / 2 facciones → ESPERAR Final Ban
-        if len(facciones) == 2:
-            return {
-                "ruta": "RUTA_2_FINAL_BAN",
-                "accion": "esperar_final_ban_faccion",
-                "mapa": mapa
-            }
-
-    # ============================
-    # 🟢 RUTA 1 — 2 MAPAS / 1 FACCIÓN CADA UNO
-    # Final Ban decide MAPA
-    # ============================
-    if len(mapas) == 2:
-        facciones_por_mapa = {
-            m: facciones_vivas_en_mapa(fase, m)
-            for m in mapas
-        }
-
-        # cada mapa tiene exactamente 1 facción viva
-        if all(len(v) == 1 for v in facciones_por_mapa.values()):
-            return {
-                "ruta": "RUTA_1_FINAL_BAN",
-                "accion": "esperar_final_ban_mapa",
-                "mapas": mapas,
-                "facciones_por_mapa": facciones_por_mapa
-            }
-
-    # ============================
-    # ❌ NO HAY CIERRE POSIBLE
-    # ============================
-    return 
+    return baneo.evaluar_cierre(fase)
 # ============================
 #  Boton Ban Mapa - FIX (NO followup.edit_message)  [MULTI SIN BORRAR LÓGICA]
 # ============================
@@ -2350,158 +3072,165 @@ class BanMapaButton(discord.ui.Button):
 
             global data
             data = load_data()  # ✅ para evitar data viejo
+            async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-            # ✅ MULTI: fijar torneo correcto (compat)
-            guild_id = interaction.guild.id
-            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+                # ✅ MULTI: fijar torneo correcto (compat)
+                guild_id = interaction.guild.id
+                set_torneo_activo_multi(data, guild_id, self.torneo_uid)
 
-            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+                torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-            # ✅ buscar partido
-            partido = None
-            for p in torneo.get("partidos", []):
-                if str(p.get("id")) == str(self.partido_id):
-                    partido = p
-                    break
+                # ✅ buscar partido
+                partido = buscar_partido(guild_id, torneo, self.partido_id)
 
-            if not partido:
-                await interaction.followup.send(
-                    "⚠️ Partido no encontrado para este botón.",
-                    ephemeral=True
-                )
-                return
+                if not partido:
+                    await interaction.followup.send(
+                        "⚠️ Partido no encontrado para este botón.",
+                        ephemeral=True
+                    )
+                    return
 
-            fase = partido.get("fase_baneo")
-            if not fase:
-                await interaction.followup.send(
-                    "⚠️ Este partido no tiene fase de baneo.",
-                    ephemeral=True
-                )
-                return
+                fase = partido.get("fase_baneo")
+                if not fase:
+                    await interaction.followup.send(
+                        "⚠️ Este partido no tiene fase de baneo.",
+                        ephemeral=True
+                    )
+                    return
 
-            # ==============================
-            # 🔐 SOLO CAPITANES EN TURNO
-            # ==============================
-            equipo_turno = fase["turno_actual"]
-            capitanes = obtener_ids_equipo(partido, equipo_turno)
+                # ==============================
+                # 🔐 SOLO CAPITANES EN TURNO
+                # ==============================
+                equipo_turno = fase["turno_actual"]
+                capitanes = obtener_ids_equipo(partido, equipo_turno)
 
-            if interaction.user.id not in capitanes:
-                await interaction.followup.send(
-                    "⛔ Solo el capitán del equipo en turno puede usar este botón.",
-                    ephemeral=True
-                )
-                return
+                if interaction.user.id not in capitanes:
+                    await interaction.followup.send(
+                        "⛔ Solo el capitán del equipo en turno puede usar este botón.",
+                        ephemeral=True
+                    )
+                    return
 
-            # ==============================
-            # 🚫 VALIDAR FASE ACTIVA
-            # ==============================
-            if not fase.get("activa", True):
-                await interaction.followup.send(
-                    "⛔ La fase de baneo ya finalizó.",
-                    ephemeral=True
-                )
-                return
+                # ==============================
+                # 🚫 VALIDAR FASE ACTIVA
+                # ==============================
+                if not fase.get("activa", True):
+                    await interaction.followup.send(
+                        "⛔ La fase de baneo ya finalizó.",
+                        ephemeral=True
+                    )
+                    return
 
-            # ==============================
-            # 📍 MAPA ACTUAL REAL
-            # ==============================
-            mapa_actual = fase.get("mapa_actual")
-            if not mapa_actual:
-                await interaction.followup.send(
-                    "⛔ No hay un mapa activo para banear.",
-                    ephemeral=True
-                )
-                return
+                # ==============================
+                # 📍 MAPA ACTUAL REAL
+                # ==============================
+                mapa_actual = fase.get("mapa_actual")
+                if not mapa_actual:
+                    await interaction.followup.send(
+                        "⛔ No hay un mapa activo para banear.",
+                        ephemeral=True
+                    )
+                    return
+
+                fase.setdefault("historial", [])
 
-            fase.setdefault("baneados", [])
-            fase.setdefault("historial", [])
+                # ==============================
+                # 🚫 VALIDAR BAN REPETIDO
+                # ==============================
+                resultado = fase.get("resultado")
+                if resultado and resultado.get("ruta") in ("RUTA_1_FINAL_BAN", "RUTA_2_FINAL_BAN"):
+                    if fase.get("final_ban_resuelto"):
+                        await interaction.followup.send(
+                            "⚠️ La fase de baneo ya fue definida por el Final Ban.",
+                            ephemeral=True
+                        )
+                        return
 
-            # ==============================
-            # 🚫 VALIDAR BAN REPETIDO
-            # ==============================
-            resultado = fase.get("resultado")
-            if resultado and resultado.get("ruta") in ("RUTA_1_FINAL_BAN", "RUTA_2_FINAL_BAN"):
-                if fase.get("final_ban_resuelto"):
+                if baneo.esta_baneada(fase, mapa_actual, self.faccion):
                     await interaction.followup.send(
-                        "⚠️ La fase de baneo ya fue definida por el Final Ban.",
+                        "⚠️ Esa facción ya fue baneada.",
                         ephemeral=True
                     )
                     return
 
-            clave_ban = f"{mapa_actual} {self.faccion}"
-            if clave_ban in fase["baneados"]:
-                await interaction.followup.send(
-                    "⚠️ Esa facción ya fue baneada.",
-                    ephemeral=True
-                )
-                return
+                # ==============================
+                # 🧠 TRANSICIÓN (tabla precompilada: turno + cierre)
+                # ==============================
+                maquina, estado = baneo.estado_de_fase(fase)
+                if estado >= 0:
+                    estado = maquina.apply(estado, baneo.accion_ban(fase, mapa_actual))
 
-            # ==============================
-            # 🧨 APLICAR BAN
-            # ==============================
-            fase["baneados"].append(clave_ban)
-            fase["baneos_realizados"] = fase.get("baneos_realizados", 0) + 1
+                if estado < 0:
+                    await interaction.followup.send(
+                        "⛔ Este ban no corresponde al estado de la fase.",
+                        ephemeral=True
+                    )
+                    return
 
-            nombre_equipo = partido["a"] if equipo_turno == "A" else partido["b"]
-            fase["historial"].append(
-                f"🚫 **{nombre_equipo}** baneó {self.faccion} en **{mapa_actual}**"
-            )
+                # ==============================
+                # 🧨 APLICAR BAN
+                # ==============================
+                baneo.banear(fase, mapa_actual, self.faccion)
+                fase["baneos_realizados"] = fase.get("baneos_realizados", 0) + 1
 
-            recalcular_mapa_actual(fase)
+                nombre_equipo = partido["a"] if equipo_turno == "A" else partido["b"]
+                fase["historial"].append(
+                    f"🚫 **{nombre_equipo}** baneó {self.faccion} en **{mapa_actual}**"
+                )
 
-            # ==============================
-            # 🧠 EVALUAR CIERRE GLOBAL
-            # ==============================
-            resultado = evaluar_cierre_fase(fase)
+                # turno / etapa / cierre: lo decide la máquina
+                baneo.volcar_estado(fase, maquina, estado)
+                recalcular_mapa_actual(fase)
 
-            # ✅ construir embed siempre (para refrescar UI)
-            embed = construir_embed_map_pool(fase, partido)
+                ruta = maquina.ruta(estado)
+                # mapas/facciones concretos solo hacen falta si hay cierre
+                resultado = evaluar_cierre_fase(fase) if ruta else None
 
-            # ==================================================
-            # 🟢 RUTA 2 AUTO → CIERRE REAL AUTOMÁTICO
-            # ==================================================
-            if resultado and resultado.get("ruta") == "RUTA_2_AUTO":
-                fase["activa"] = False
-                fase["mapa_final"] = resultado["mapa_final"]
-                fase["facciones_finales"] = resultado["facciones_finales"]
-                fase["resultado"] = normalizar_resultado_json(resultado)
+                # ✅ construir embed siempre (para refrescar UI)
+                embed = construir_embed_map_pool(fase, partido)
 
-                set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-                save_data(data)
+                # ==================================================
+                # 🟢 RUTA 2 AUTO → CIERRE REAL AUTOMÁTICO
+                # ==================================================
+                if ruta == baneo.RUTA_2_AUTO:
+                    fase["mapa_final"] = resultado["mapa_final"]
+                    fase["facciones_finales"] = resultado["facciones_finales"]
+                    fase["resultado"] = normalizar_resultado_json(resultado)
 
-                await interaction.message.edit(
-                    content=(
-                        "🏁 **Fase de baneo finalizada**\n\n"
-                        f"🗺️ **Mapa final:** `{fase['mapa_final']}`\n\n"
-                        f"🎖️ **{partido['a']}** → `{fase['facciones_finales'].get('A')}`\n"
-                        f"🎖️ **{partido['b']}** → `{fase['facciones_finales'].get('B')}`"
-                    ),
-                    embed=embed,
-                    view=None
-                )
-                return
+                    set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+                    save_data(data)
 
-            # ==================================================
-            # 🟡 FINAL BAN → NO SE CIERRA (solo prepara decisión)
-            # ==================================================
-            if resultado and resultado.get("ruta") in ("RUTA_1_FINAL_BAN", "RUTA_2_FINAL_BAN"):
+                    await interaction.message.edit(
+                        content=(
+                            "🏁 **Fase de baneo finalizada**\n\n"
+                            f"🗺️ **Mapa final:** `{fase['mapa_final']}`\n\n"
+                            f"🎖️ **{partido['a']}** → `{fase['facciones_finales'].get('A')}`\n"
+                            f"🎖️ **{partido['b']}** → `{fase['facciones_finales'].get('B')}`"
+                        ),
+                        embed=embed,
+                        view=None
+                    )
+                    return
 
-                equipo_finalban = None
-                try:
-                    if fase.get("equipos", {}).get("A", {}).get("tipo") == "final":
-                        equipo_finalban = "A"
-                    elif fase.get("equipos", {}).get("B", {}).get("tipo") == "final":
-                        equipo_finalban = "B"
-                except:
-                    equipo_finalban = None
+                # ==================================================
+                # 🟡 FINAL BAN → NO SE CIERRA (solo prepara decisión)
+                # ==================================================
+                if ruta in (baneo.RUTA_1_FINAL_BAN, baneo.RUTA_2_FINAL_BAN):
+                    # turno -> equipo con Final Ban, estado FINAL_BAN (máquina)
+                    fase["resultado"] = normalizar_resultado_json(resultado)
 
-                if not equipo_finalban:
-                    equipo_finalban = fase["coinflip"]["ganador"]
+                    set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+                    save_data(data)
+
+                    embed = construir_embed_map_pool(fase, partido)
 
-                fase["turno_actual"] = equipo_finalban
-                fase["estado"] = "FINAL_BAN"
-                fase["resultado"] = normalizar_resultado_json(resultado)
+                    await interaction.message.edit(
+                        embed=embed,
+                        view=BanMapasView(partido, self.torneo_uid)  # ✅ sin I/O
+                    )
+                    return
 
+                # 🔁 el cambio de turno ya quedó aplicado por volcar_estado
                 set_torneo_activo_multi(data, guild_id, self.torneo_uid)
                 save_data(data)
 
@@ -2509,25 +3238,8 @@ class BanMapaButton(discord.ui.Button):
 
                 await interaction.message.edit(
                     embed=embed,
-                    view=BanMapasView(guild_id, self.partido_id, self.torneo_uid)  # ✅ ahora pasa UID
+                    view=BanMapasView(partido, self.torneo_uid)  # ✅ sin I/O
                 )
-                return
-
-            # ==============================
-            # 🔁 CAMBIAR TURNO
-            # ==============================
-            if fase.get("estado", "NORMAL") == "NORMAL":
-                cambiar_turno(fase)
-
-            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-            save_data(data)
-
-            embed = construir_embed_map_pool(fase, partido)
-
-            await interaction.message.edit(
-                embed=embed,
-                view=BanMapasView(guild_id, self.partido_id, self.torneo_uid)  # ✅ ahora pasa UID
-            )
 
         except Exception as e:
             print("❌ ERROR BanMapaButton:", repr(e))
@@ -2545,6 +3257,87 @@ class BanMapaButton(discord.ui.Button):
             except:
                 pass
 # =============================
+#  Botón de paso de veto (formatos BO1/BO3/...) - REV
+# =============================
+_ERRORES_VETO = {
+    "cerrada": "⛔ The veto has already finished.",  # FIX (EN)
+    "paso": "⚠️ This button is from a previous step.",  # FIX (EN)
+    "mapa": "⚠️ That map is no longer available.",  # FIX (EN)
+    "lado": "⚠️ There is no picked map to choose a side on.",  # FIX (EN)
+}
+
+
+class VetoButton(discord.ui.Button):
+    def __init__(self, partido_id, accion: str, valor, etiqueta: str, torneo_uid: str):
+        super().__init__(
+            label=etiqueta,
+            style=discord.ButtonStyle.success if accion != "ban" else discord.ButtonStyle.danger
+        )
+        self.partido_id = partido_id
+        self.accion = accion
+        self.valor = valor  # None = mapa actual
+        self.torneo_uid = torneo_uid
+
+    async def callback(self, interaction: discord.Interaction):
+        global data
+        data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
+
+            guild_id = interaction.guild.id
+            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+
+            partido = buscar_partido(guild_id, torneo, self.partido_id)
+            fase = partido.get("fase_baneo") if partido else None
+            if not fase or not fase.get("formato"):
+                await interaction.response.send_message(
+                    "⚠️ Match or veto not found.",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
+
+            equipo_turno = fase.get("turno_actual")
+            if interaction.user.id not in obtener_ids_equipo(partido, equipo_turno):
+                await interaction.response.send_message(
+                    "❌ Not your turn or you are not a captain.",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
+
+            valor = self.valor if self.valor is not None else fase.get("mapa_actual")
+            error = baneo.aplicar_paso(fase, self.accion, valor)
+            if error:
+                await interaction.response.send_message(_ERRORES_VETO[error], ephemeral=True)
+                return
+
+            nombre_equipo = partido["a"] if equipo_turno == "A" else partido["b"]
+            fase.setdefault("historial", []).append(
+                f"📋 **{nombre_equipo}**: {self.accion} **{valor}**"
+            )
+
+            if fase.get("activa"):
+                recalcular_mapa_actual(fase)
+            else:
+                fase["resultado"] = {"ruta": "FORMATO", "formato": fase["formato"], "picks": fase["picks"]}
+
+            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+            save_data(data)
+
+            embed = construir_embed_map_pool(fase, partido)
+
+            if not fase.get("activa"):
+                await interaction.response.edit_message(
+                    content="🏁 **Veto finished**",  # FIX (EN)
+                    embed=embed,
+                    view=None
+                )
+                return
+
+            await interaction.response.edit_message(
+                embed=embed,
+                view=BanMapasView(partido, self.torneo_uid)
+            )
+# =============================
 # Def RECALCULAR MAPA ACTUAL - REV NO TOCA
 # =============================          
 def recalcular_mapa_actual(fase):
@@ -2579,14 +3372,8 @@ def normalizar_resultado_json(obj):
 # Def Obtener mapas Validos - REV NO TOCA
 # =============================        
 def obtener_mapas_validos(fase):
-    mapas_validos = []
-
-    for m in fase["map_pool"]:
-        bans_m = [b for b in fase["baneados"] if b.startswith(m)]
-        if len(bans_m) < 2:
-            mapas_validos.append(m)
-
-    return mapas_validos
+    # válido = le queda al menos una facción (máscara != AMBAS)
+    return baneo.mapas_vivos(fase)
 # =============================
 # Botón Next Map - FIX DATA SYNC  [MULTI SIN BORRAR LÓGICA] - EN
 # =============================
@@ -2603,83 +3390,80 @@ class NextMapButton(discord.ui.Button):
         try:
             global data
             data = load_data()  # ✅ para evitar data viejo en views persistentes
+            async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-            # ✅ MULTI: fijar torneo correcto
-            guild_id = interaction.guild.id
-            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+                # ✅ MULTI: fijar torneo correcto
+                guild_id = interaction.guild.id
+                set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+                torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-            # ✅ buscar partido en el torneo correcto
-            partido = None
-            for p in torneo.get("partidos", []):
-                if str(p.get("id")) == str(self.partido_id):
-                    partido = p
-                    break
+                # ✅ buscar partido en el torneo correcto
+                partido = buscar_partido(guild_id, torneo, self.partido_id)
 
-            if not partido:
-                await interaction.response.send_message(
-                    "⚠️ Partido no encontrado para este botón.",
-                    ephemeral=True
-                )
-                return
+                if not partido:
+                    await interaction.response.send_message(
+                        "⚠️ Partido no encontrado para este botón.",
+                        ephemeral=True
+                    )
+                    return
 
-            fase = partido.get("fase_baneo")
+                fase = partido.get("fase_baneo")
 
-            # ==============================
-            # 🚫 VALIDAR FASE ACTIVA
-            # ==============================
-            if not fase or not fase.get("activa"):
-                await interaction.response.send_message(
-                    "⚠️ La fase de baneo no está activa.",
-                    ephemeral=True
-                )
-                return
+                # ==============================
+                # 🚫 VALIDAR FASE ACTIVA
+                # ==============================
+                if not fase or not fase.get("activa"):
+                    await interaction.response.send_message(
+                        "⚠️ La fase de baneo no está activa.",
+                        ephemeral=True
+                    )
+                    return
 
-            # ==============================
-            # 🔐 SOLO CAPITANES EN TURNO
-            # ==============================
-            equipo_turno = fase["turno_actual"]
-            if interaction.user.id not in obtener_ids_equipo(partido, equipo_turno):
-                await interaction.response.send_message(
-                    "❌ No es tu turno o no eres capitán.",
-                    ephemeral=True
-                )
-                return
+                # ==============================
+                # 🔐 SOLO CAPITANES EN TURNO
+                # ==============================
+                equipo_turno = fase["turno_actual"]
+                if interaction.user.id not in obtener_ids_equipo(partido, equipo_turno):
+                    await interaction.response.send_message(
+                        "❌ No es tu turno o no eres capitán.",
+                        ephemeral=True
+                    )
+                    return
 
-            # ==============================
-            # 🗺️ MAPAS VIVOS REALES
-            # ==============================
-            mapas_validos = obtener_mapas_validos(fase)
+                # ==============================
+                # 🗺️ MAPAS VIVOS REALES
+                # ==============================
+                mapas_validos = obtener_mapas_validos(fase)
 
-            if not mapas_validos:
-                await interaction.response.send_message(
-                    "⚠️ No hay mapas disponibles.",
-                    ephemeral=True
-                )
-                return
+                if not mapas_validos:
+                    await interaction.response.send_message(
+                        "⚠️ No hay mapas disponibles.",
+                        ephemeral=True
+                    )
+                    return
 
-            mapa_actual = fase.get("mapa_actual")
+                mapa_actual = fase.get("mapa_actual")
 
-            # ==============================
-            # 🔄 ROTAR SOLO ENTRE MAPAS VIVOS
-            # ==============================
-            if mapa_actual in mapas_validos:
-                idx = mapas_validos.index(mapa_actual)
-                fase["mapa_actual"] = mapas_validos[(idx + 1) % len(mapas_validos)]
-            else:
-                fase["mapa_actual"] = mapas_validos[0]
+                # ==============================
+                # 🔄 ROTAR SOLO ENTRE MAPAS VIVOS
+                # ==============================
+                if mapa_actual in mapas_validos:
+                    idx = mapas_validos.index(mapa_actual)
+                    fase["mapa_actual"] = mapas_validos[(idx + 1) % len(mapas_validos)]
+                else:
+                    fase["mapa_actual"] = mapas_validos[0]
 
-            # compat
-            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-            save_data(data)
+                # compat
+                set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+                save_data(data)
 
-            embed = construir_embed_map_pool(fase, partido)
+                embed = construir_embed_map_pool(fase, partido)
 
-            # ✅ refrescar mensaje con la misma view (ahora pasa UID)
-            await interaction.response.edit_message(
-                embed=embed,
-                view=BanMapasView(guild_id, self.partido_id, self.torneo_uid)
-            )
+                # ✅ refrescar mensaje con la misma view (ahora pasa UID)
+                await interaction.response.edit_message(
+                    embed=embed,
+                    view=BanMapasView(partido, self.torneo_uid)
+                )
 
         except Exception as e:
             print("❌ ERROR NextMapButton:", repr(e))
@@ -2700,11 +3484,7 @@ def calcular_resultado_final(fase):
 
     # 🔒 BLINDAJE: asegurar mapa_final
     if "mapa_final" not in fase or not fase["mapa_final"]:
-        mapas_validos = []
-        for m in fase.get("map_pool", []):
-            bans_m = [b for b in fase.get("baneados", []) if b.startswith(m)]
-            if len(bans_m) < 2:
-                mapas_validos.append(m)
+        mapas_validos = baneo.mapas_vivos(fase)
 
         if len(mapas_validos) == 1:
             fase["mapa_final"] = mapas_validos[0]
@@ -2712,10 +3492,10 @@ def calcular_resultado_final(fase):
             return  # aún no se puede calcular
 
     mapa = fase["mapa_final"]
-    baneados = fase["baneados"]
+    mascara = baneo.mascara(fase, mapa)
 
-    axis_baneado = f"{mapa} Axis" in baneados
-    allies_baneado = f"{mapa} Allies" in baneados
+    axis_baneado = bool(mascara & baneo.AXIS)
+    allies_baneado = bool(mascara & baneo.ALLIES)
 
     # 🔒 BLINDAJE: asegurar equipo_final
     equipo_final = fase.get("equipo_final")
@@ -2751,31 +3531,10 @@ def calcular_resultado_final(fase):
 # VIEW Choose Ban Type - REV  [MULTI SIN BORRAR LÓGICA]  # FIX (EN)
 # =============================
 class ElegirTipoBanView(discord.ui.View):
-    def __init__(self, torneo_id, torneo_uid: str, partido):
+    """View PURA: botones Extra / Final a partir del partido ya cargado."""
+    def __init__(self, partido: dict, torneo_uid: str):
         super().__init__(timeout=None)
 
-        global data
-        data = load_data()
-
-        guild_id = torneo_id  # torneo_id here is guild_id  # FIX (EN)
-        set_torneo_activo_multi(data, guild_id, torneo_uid)
-        torneo = get_torneo_v2(data, guild_id, torneo_uid)
-
-        # 🔒 IF AN ID IS PROVIDED, FIND THE MATCH (str/int tolerant)  # FIX (EN)
-        if not isinstance(partido, dict):
-            partido_obj = None
-            for p in torneo.get("partidos", []):
-                if str(p.get("id")) == str(partido):
-                    partido_obj = p
-                    break
-            if not partido_obj:
-                return  # match not found  # FIX (EN)
-            partido = partido_obj
-
-        # 🔒 DEFENSIVE  # FIX (EN)
-        if not isinstance(partido, dict):
-            return
-
         bloqueado = not hay_capitanes(partido)
 
         # ✅ Pass UID to buttons (to avoid mixing tournaments)  # FIX (EN)
@@ -2787,42 +3546,21 @@ class ElegirTipoBanView(discord.ui.View):
 
         self.add_item(extra)
         self.add_item(final)
-
-        if not partido.get("fase_baneo"):
-            return
 # =============================
 # VIEW Assign Captains - FIX (real names) ✅ USES GLOBAL DATA  [MULTI]  # FIX (EN)
 # =============================
 class AsignarCapitanesView(discord.ui.View):
-    def __init__(self, torneo_id, torneo_uid: str, partido_id):
+    """View PURA: se arma con el partido ya cargado (sin load/save)."""
+    def __init__(self, torneo_id, torneo_uid: str, partido: dict):
         super().__init__(timeout=None)
+        partido_id = partido["id"]
         self.partido_id = partido_id
         self.torneo_uid = torneo_uid
 
-        global data
-        data = load_data()
-
         guild_id = torneo_id  # torneo_id here is guild_id  # FIX (EN)
-        set_torneo_activo_multi(data, guild_id, torneo_uid)
-        torneo = get_torneo_v2(data, guild_id, torneo_uid)
 
-        partido = None
-        for p in torneo.get("partidos", []):
-            if str(p.get("id")) == str(partido_id):
-                partido = p
-                break
-
-        # DEBUG (testing only)  # FIX (EN)
-        print(
-            "🧩 AssignCaptainsView guild_id:", guild_id,  # FIX (EN)
-            "uid:", torneo_uid,
-            "match_id:", partido_id,  # FIX (EN)
-            "found:", bool(partido),  # FIX (EN)
-            "ids:", [str(x.get("id")) for x in torneo.get("partidos", [])]
-        )
-
-        nombre_a = partido["a"] if partido else "Team A"  # FIX (EN)
-        nombre_b = partido["b"] if partido else "Team B"  # FIX (EN)
+        nombre_a = partido.get("a") or "Team A"  # FIX (EN)
+        nombre_b = partido.get("b") or "Team B"  # FIX (EN)
 
         # ✅ Pass UID to buttons (their classes will handle it)  # FIX (EN)
         self.add_item(AsignarCapitanButton(guild_id, partido_id, "A", nombre_a, torneo_uid))
@@ -2843,28 +3581,11 @@ def obtener_ids_equipo(partido, equipo):
 
     return partido["equipos"][equipo].get("capitanes", [])
 # =============================
-# UTILIDAD: HAY CAPITANES - REV NO TOCA - EN
+# UTILIDAD: HAY CAPITANES - REV - EN
 # =============================
 def hay_capitanes(partido):
-
-    # 🔒 BLINDAR ESTRUCTURA DEL PARTIDO
-    if "equipos" not in partido:
-        partido["equipos"] = {
-            "A": {"capitanes": []},
-            "B": {"capitanes": []}
-        }
-        save_data(data)
-
-    if "capitanes" not in partido["equipos"]["A"]:
-        partido["equipos"]["A"]["capitanes"] = []
-
-    if "capitanes" not in partido["equipos"]["B"]:
-        partido["equipos"]["B"]["capitanes"] = []
-
-    return (
-        len(partido["equipos"]["A"]["capitanes"]) > 0 and
-        len(partido["equipos"]["B"]["capitanes"]) > 0
-    )
+    # solo lectura: no completa estructura ni persiste nada
+    return bool(obtener_ids_equipo(partido, "A")) and bool(obtener_ids_equipo(partido, "B"))
 # =============================
 # def construir embed map pool - REV NO TOCA - EN
 # =============================
@@ -2878,13 +3599,45 @@ def construir_embed_map_pool(fase, p):
     equipo_a = p["a"]
     equipo_b = p["b"]
 
-    baneados = fase.get("baneados", [])
+    bans = fase.get("bans", {})
 
     descripcion = []
 
+    # 📋 formatos de veto: picks (con lados) y mapas descartados
+    if fase.get("formato"):
+        picks = {x["mapa"]: x for x in fase.get("picks", [])}
+        for mapa in fase["map_pool"]:
+            pick = picks.get(mapa)
+            if pick:
+                lados = pick.get("lados", {})
+                quien = (p["a"] if pick["equipo"] == "A" else p["b"]) if pick.get("equipo") else "Decider"
+                descripcion.append(
+                    f"✅ **{mapa}** ({quien})\n"
+                    f"{equipo_a}: {lados.get('A', '—')} | {equipo_b}: {lados.get('B', '—')}\n"
+                )
+            elif bans.get(mapa, 0) & baneo.AMBAS == baneo.AMBAS:
+                descripcion.append(f"~~**{mapa}**~~ ❌\n")
+            else:
+                descripcion.append(f"**{mapa}**\n")
+
+        embed.description = "\n".join(descripcion)
+
+        paso = baneo.paso_actual(fase)
+        if paso is not None:
+            equipo_turno = fase["turno_actual"]
+            nombre_turno = p["a"] if equipo_turno == "A" else p["b"]
+            objetivo = f" on {fase['mapa_actual']}" if paso.con_next and fase.get("mapa_actual") else ""  # FIX (EN)
+            embed.set_footer(
+                text=f"📋 {fase['formato']} | Step {fase.get('paso', 0) + 1}: {paso.accion}{objetivo} | Turn: {nombre_turno}"  # FIX (EN)
+            )
+        else:
+            embed.set_footer(text=f"📋 {fase['formato']} | Veto finished")  # FIX (EN)
+        return embed
+
     for mapa in fase["map_pool"]:
-        axis_baneado = f"{mapa} Axis" in baneados
-        allies_baneado = f"{mapa} Allies" in baneados
+        mascara = bans.get(mapa, 0)
+        axis_baneado = bool(mascara & baneo.AXIS)
+        allies_baneado = bool(mascara & baneo.ALLIES)
 
         # Estados visuales
         axis_icon = "🟥" if axis_baneado else "🟩"
@@ -2932,80 +3685,77 @@ class ExtraBanButton(discord.ui.Button):
 
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        # ✅ MULTI: torneo correcto por UID
-        guild_id = interaction.guild.id
-        set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+            # ✅ MULTI: torneo correcto por UID
+            guild_id = interaction.guild.id
+            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo["partidos"]:
-            if str(p.get("id")) != str(self.partido_id):
-                continue
+            p = buscar_partido(guild_id, torneo, self.partido_id)
+            if p is not None:
 
-            fase = p.get("fase_baneo")
-            if not fase or not fase.get("activa"):
-                return
+                fase = p.get("fase_baneo")
+                if not fase or not fase.get("activa"):
+                    return
 
-            if not hay_capitanes(p):
-                await interaction.response.send_message(
-                    "🔒 The ban phase cannot be started.\n"  # FIX (EN)
-                    "❌ Both teams must have at least one captain assigned.",  # FIX (EN)
-                    ephemeral=True
-                )
-                return
+                if not hay_capitanes(p):
+                    await interaction.response.send_message(
+                        "🔒 The ban phase cannot be started.\n"  # FIX (EN)
+                        "❌ Both teams must have at least one captain assigned.",  # FIX (EN)
+                        ephemeral=True
+                    )
+                    return
 
-            if fase["coinflip"].get("eleccion"):
-                await interaction.response.send_message(
-                    "⚠️ The choice has already been made",  # FIX (EN)
-                    ephemeral=True
-                )
-                return
+                if fase["coinflip"].get("eleccion"):
+                    await interaction.response.send_message(
+                        "⚠️ The choice has already been made",  # FIX (EN)
+                        ephemeral=True
+                    )
+                    return
 
-            ganador = fase["coinflip"]["ganador"]
-            perdedor = "B" if ganador == "A" else "A"
+                ganador = fase["coinflip"]["ganador"]
+                perdedor = "B" if ganador == "A" else "A"
 
-            if interaction.user.id not in obtener_ids_equipo(p, ganador):
-                await interaction.response.send_message(
-                    "❌ Only the captain of the winning team can choose",  # FIX (EN)
-                    ephemeral=True
-                )
-                return
+                if interaction.user.id not in obtener_ids_equipo(p, ganador):
+                    await interaction.response.send_message(
+                        "❌ Only the captain of the winning team can choose",  # FIX (EN)
+                        ephemeral=True
+                    )
+                    return
 
-            fase["coinflip"]["eleccion"] = "extra"
-            fase["equipos"][ganador]["tipo"] = "extra"
-            fase["equipos"][ganador]["baneos_restantes"] = 2
-            fase["equipos"][perdedor]["tipo"] = "final"
-            fase["equipos"][perdedor]["baneos_restantes"] = 1
-            fase["turno_actual"] = perdedor
+                # ganador = Extra (2), perdedor = Final (1) y abre los baneos
+                maquina, estado = baneo.estado_de_fase(fase)
+                baneo.volcar_estado(fase, maquina, maquina.apply(estado, baneo.ELEGIR_EXTRA))
 
-            fase.setdefault("baneados", [])
-            fase.setdefault("historial", [])
-            fase.setdefault("max_baneos", 3)
-            fase["mapa_actual"] = fase["map_pool"][0]
+                fase.setdefault("bans", {})
+                fase.setdefault("historial", [])
+                fase.setdefault("max_baneos", 3)
+                fase["mapa_actual"] = fase["map_pool"][0]
 
-            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-            save_data(data)
+                set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+                save_data(data)
 
-            nombre_ganador = p["a"] if ganador == "A" else p["b"]
-            nombre_perdedor = p["a"] if perdedor == "A" else p["b"]
+                nombre_ganador = p["a"] if ganador == "A" else p["b"]
+                nombre_perdedor = p["a"] if perdedor == "A" else p["b"]
 
-            await interaction.response.edit_message(
-                content=(
-                    f"🎲 **Choice made**\n\n"  # FIX (EN)
-                    f"🏆 **{nombre_perdedor}**: Final Ban (1)\n"
-                    f"⚔️ **{nombre_ganador}**: Extra Ban (2)\n\n"
-                    f"➡️ Start the map bans"  # FIX (EN)
-                ),
-                view=None
-            )
+                await interaction.response.edit_message(
+                    content=(
+                        f"🎲 **Choice made**\n\n"  # FIX (EN)
+                        f"🏆 **{nombre_perdedor}**: Final Ban (1)\n"
+                        f"⚔️ **{nombre_ganador}**: Extra Ban (2)\n\n"
+                        f"➡️ Start the map bans"  # FIX (EN)
+                    ),
+                    view=None
+                )
 
-            embed = construir_embed_map_pool(fase, p)
+                embed = construir_embed_map_pool(fase, p)
 
-            await interaction.channel.send(
-                embed=embed,
-                view=BanMapasView(guild_id, str(self.partido_id), self.torneo_uid)  # ✅ NO int()
-            )
-            return
+                await interaction.channel.send(
+                    embed=embed,
+                    view=BanMapasView(p, self.torneo_uid)  # ✅ sin I/O
+                )
+                return
 # =============================
 #  FINAL Ban BUTTON - REV  [MULTI SIN BORRAR LÓGICA]  # FIX (EN)
 # =============================
@@ -3022,14 +3772,15 @@ class FinalBanButton(discord.ui.Button):
 
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        # ✅ MULTI: torneo correcto por UID
-        guild_id = interaction.guild.id
-        set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
+            # ✅ MULTI: torneo correcto por UID
+            guild_id = interaction.guild.id
+            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)
 
-        for p in torneo["partidos"]:
-            if str(p.get("id")) == str(self.partido_id):
+            p = buscar_partido(guild_id, torneo, self.partido_id)
+            if p is not None:
 
                 fase = p.get("fase_baneo")
                 if not fase or not fase.get("activa"):
@@ -3060,18 +3811,13 @@ class FinalBanButton(discord.ui.Button):
                     )
                     return
 
-                fase["coinflip"]["eleccion"] = "final"
-                fase["equipos"][ganador]["tipo"] = "final"
-                fase["equipos"][ganador]["baneos_restantes"] = 1
-
-                fase["equipos"][perdedor]["tipo"] = "extra"
-                fase["equipos"][perdedor]["baneos_restantes"] = 2
-
-                fase["turno_actual"] = ganador
+                # ganador = Final (1) y abre los baneos, perdedor = Extra (2)
+                maquina, estado = baneo.estado_de_fase(fase)
+                baneo.volcar_estado(fase, maquina, maquina.apply(estado, baneo.ELEGIR_FINAL))
 
                 # 🔧 BLINDAJE DE FASE
                 fase["mapa_actual"] = fase["map_pool"][0]
-                fase.setdefault("baneados", [])
+                fase.setdefault("bans", {})
                 fase.setdefault("historial", [])
                 fase.setdefault("max_baneos", 3)  # 1 + 2
 
@@ -3098,7 +3844,7 @@ class FinalBanButton(discord.ui.Button):
 
                 await interaction.channel.send(
                     embed=embed,
-                    view=BanMapasView(guild_id, str(self.partido_id), self.torneo_uid)  # ✅ NO int()
+                    view=BanMapasView(p, self.torneo_uid)  # ✅ sin I/O
                 )
                 return
 # =============================
@@ -3119,18 +3865,10 @@ class AsignarCapitanButton(discord.ui.Button):
         # =============================
         # 🔎 RESPECT REAL NAME IF PROVIDED  # FIX (EN)
         # =============================
+        # (sin I/O al construir: quien arma la view ya tiene el partido)
         if not nombre_equipo:
-            data = load_data()
-            set_torneo_activo_multi(data, torneo_id, torneo_uid)  # ✅ MULTI
-
             nombre_equipo = f"Team {equipo}"  # FIX (EN) fallback seguro
 
-            torneo = get_torneo_v2(data, torneo_id, torneo_uid)  # ✅ MULTI
-            for p in torneo.get("partidos", []):
-                if str(p.get("id")) == str(partido_id):
-                    nombre_equipo = p["a"] if equipo == "A" else p["b"]
-                    break
-
         super().__init__(
             label=f"Assign Captain {nombre_equipo}",  # FIX (EN)
             style=discord.ButtonStyle.primary
@@ -3185,18 +3923,10 @@ class QuitarCapitanButton(discord.ui.Button):
         # =============================
         # 🔎 RESPECT REAL NAME IF PROVIDED  # FIX (EN)
         # =============================
+        # (sin I/O al construir: quien arma la view ya tiene el partido)
         if not nombre_equipo:
-            data = load_data()
-            set_torneo_activo_multi(data, self.torneo_id, self.torneo_uid)  # ✅ MULTI
-
             nombre_equipo = f"Team {equipo}"  # FIX (EN) fallback seguro
 
-            torneo = get_torneo_v2(data, self.torneo_id, self.torneo_uid)  # ✅ MULTI
-            for p in torneo.get("partidos", []):
-                if str(p.get("id")) == str(partido_id):
-                    nombre_equipo = p["a"] if equipo == "A" else p["b"]
-                    break
-
         super().__init__(
             label=f"Remove Captain {nombre_equipo}",  # FIX (EN)
             style=discord.ButtonStyle.danger
@@ -3231,6 +3961,15 @@ def build_partido_embed(p):
         color=discord.Color.blue()
     )
 
+    # ✅ formatos por rondas: grupo / ronda del partido
+    etiquetas = []
+    if p.get("grupo"):
+        etiquetas.append(f"🧩 Group {p['grupo']}")  # FIX (EN)
+    if p.get("ronda"):
+        etiquetas.append(f"🔢 Round {p['ronda']}")  # FIX (EN)
+    if etiquetas:
+        embed.description = " · ".join(etiquetas)
+
     embed.add_field(
         name="⏰ Date",  # FIX (EN)
         value=p.get("fecha", "⏰ Not set"),  # FIX (EN)
@@ -3362,13 +4101,16 @@ async def actualizar_todos_los_mensajes_partido(guild, partido):
     # Mensaje en "Ver Partidos"
     # ==========================
     if partido.get("mensaje_ver_partidos_id"):
-        for canal in guild.text_channels:
+        # ✅ canal sacado del índice inverso (sin recorrer guild.text_channels)
+        info = buscar_recurso_discord(guild.id, partido["mensaje_ver_partidos_id"])
+        canal = await _get_channel_safe(guild, info[4]) if info and info[4] else None
+        if canal:
             try:
-                msg = await canal.fetch_message(int(partido["mensaje_ver_partidos_id"]))
-                await msg.edit(embed=embed)
-                break
-            except:
-                continue
+                msg = await _fetch_message_safe(canal, int(partido["mensaje_ver_partidos_id"]))
+                if msg:
+                    await msg.edit(embed=embed)
+            except Exception as e:
+                print("❌ actualizar_todos_los_mensajes_partido ver_partidos:", e)
 # =============================
 #  Embed update_public_match_message - REV (MULTI) + FIX RECOVER IDS  # FIX (EN)
 # =============================
@@ -3394,57 +4136,24 @@ async def actualizar_mensaje_publico_partido(guild, partido):
     uid_low = uid.lower()
 
     # ======================================================
-    # ✅ NEW: FALLBACK if IDs are missing -> search channel/message  # FIX (EN)
+    # ✅ FALLBACK if IDs are missing -> reverse index (no channel/history scan)  # FIX (EN)
     # ======================================================
     if not canal_id or not msg_id:
         try:
-            # expected channel: partidos-a-disputar-<uid>  # FIX (EN)
-            nombre_canal = f"partidos-a-disputar-{uid_low}"
+            msg_id = msg_id or buscar_id_discord(guild.id, uid, "mensaje_publico", partido.get("id"))
+            info = buscar_recurso_discord(guild.id, msg_id) if msg_id else None
+            canal_id = canal_id or (info[4] if info else None) \
+                or buscar_id_discord(guild.id, uid, "canal_publico")
 
-            canal_fallback = None
-            for ch in getattr(guild, "text_channels", []):
-                try:
-                    if (ch.name or "").lower() == nombre_canal:
-                        canal_fallback = ch
-                        break
-                except:
-                    pass
+            if canal_id and msg_id:
+                persistencia.tocar(guild.id, uid, partido.get("id"))
+                partido["canal_publico_id"] = canal_id
+                partido["mensaje_publico_id"] = msg_id
 
-            if canal_fallback:
-                # search message by heuristic (id + teams)  # FIX (EN)
-                async for m in canal_fallback.history(limit=80, oldest_first=False):
-                    try:
-                        if not m.embeds:
-                            continue
-                        e = m.embeds[0]
-
-                        # heuristics: title/description contains id and/or teams  # FIX (EN)
-                        t = (e.title or "")
-                        d = (e.description or "")
-                        texto = f"{t}\n{d}".lower()
-
-                        ok_id = str(partido.get("id")) in texto
-                        ok_eq = (str(partido.get("a", "")).lower() in texto) and (str(partido.get("b", "")).lower() in texto)
-
-                        if ok_id or ok_eq:
-                            partido["canal_publico_id"] = canal_fallback.id
-                            partido["mensaje_publico_id"] = m.id
-
-                            # ✅ save so it doesn't become None again  # FIX (EN)
-                            try:
-                                guild_id = guild.id
-                                set_torneo_activo_multi(data, guild_id, uid)
-                                save_data(data)
-                            except:
-                                pass
-
-                            canal_id = canal_fallback.id
-                            msg_id = m.id
-                            break
-                    except:
-                        continue
+                # ✅ save so it doesn't become None again  # FIX (EN)
+                save_data(data)
         except Exception as e:
-            print("⚠️ Fallback search for public IDs failed:", repr(e))  # FIX (EN)
+            print("⚠️ Fallback lookup for public IDs failed:", repr(e))  # FIX (EN)
 
     # ======================================================
     # ✅ Normal update (if IDs exist)  # FIX (EN)
@@ -3503,17 +4212,34 @@ class TablaButton(discord.ui.Button):
             )
             return
 
+        grupos = (torneo.get("fase_grupos") or {}).get("grupos") or {}
+
         embed = discord.Embed(
-            title="📊 Standings table",  # FIX (EN)
+            title="📊 Group standings" if grupos else "📊 Standings table",  # FIX (EN)
             color=discord.Color.green()
         )
 
-        for eq, d in sorted(tabla.items(), key=lambda x: x[1]["pts"], reverse=True):
-            embed.add_field(
-                name=eq,
-                value=f"MP {d['pj']} | W {d['pg']} | L {d['pp']} | PTS {d['pts']}",  # FIX (EN)
-                inline=False
-            )
+        if grupos:
+            # 🧩 un campo por grupo (máx. 25), cada uno desde su propia clasificación
+            for letra in list(grupos)[:25]:
+                lineas = [
+                    f"{pos}. {eq} — {d.get('pts', 0)} PTS "
+                    f"({d.get('pj', 0)} MP, {d.get('gf', 0) - d.get('gc', 0):+d})"  # FIX (EN)
+                    for pos, (eq, d) in enumerate(clasificacion_grupo(guild_id, torneo, letra).top(10), 1)
+                ]
+                embed.add_field(
+                    name=f"🧩 Group {letra}",  # FIX (EN)
+                    value="\n".join(lineas) or "—",
+                    inline=True
+                )
+        else:
+            # embeds: máximo 25 campos -> top 25 sin ordenar todo
+            for pos, (eq, d) in enumerate(clasificacion_torneo(guild_id, torneo).top(25), 1):
+                embed.add_field(
+                    name=f"{pos}. {eq}",
+                    value=texto_fila_tabla(d),
+                    inline=False
+                )
 
         await interaction.channel.send(embed=embed)
         await interaction.response.send_message(
@@ -3524,50 +4250,62 @@ class TablaButton(discord.ui.Button):
 # 🏆 ADMIN BUTTON START PLAYOFFS - REV  [MULTI WITHOUT DELETING LOGIC]  # FIX (EN)
 # =============================
 class IniciarEliminatoriasButton(discord.ui.Button):
-    def __init__(self, admin_id, torneo_uid: str):
+    def __init__(self, admin_id, torneo_uid: str, doble: bool = False):
         super().__init__(
-            label="🏆 Start playoffs",  # FIX (EN)
+            label="🏆 Start double-elim playoffs" if doble else "🏆 Start playoffs",  # FIX (EN)
             style=discord.ButtonStyle.danger
         )
         self.admin_id = admin_id
         self.torneo_uid = torneo_uid  # ✅ NUEVO
+        self.doble = doble  # ✅ llave de perdedores + gran final con reset
 
     async def callback(self, interaction):
         global data
         data = load_data()
+        async with bloqueo_torneo(interaction.guild.id, self.torneo_uid):
 
-        guild_id = interaction.guild.id
-        set_torneo_activo_multi(data, guild_id, self.torneo_uid)  # ✅ compat
-        torneo = get_torneo_v2(data, guild_id, self.torneo_uid)   # ✅ correct tournament
+            guild_id = interaction.guild.id
+            set_torneo_activo_multi(data, guild_id, self.torneo_uid)  # ✅ compat
+            torneo = get_torneo_v2(data, guild_id, self.torneo_uid)   # ✅ correct tournament
 
-        if interaction.user.id != self.admin_id:
-            await interaction.response.send_message(
-                "❌ Administrators only",  # FIX (EN)
-                ephemeral=True
+            if interaction.user.id != self.admin_id:
+                await interaction.response.send_message(
+                    "❌ Administrators only",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
+
+            if not torneo.get("tabla"):
+                await interaction.response.send_message(
+                    "❌ No standings table yet",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
+
+            # con grupos entran solo los clasificados
+            fase = torneo.get("fase_grupos") or {}
+            cupos = len(fase["grupos"]) * int(fase.get("clasifican", 2)) if fase.get("grupos") else len(torneo["tabla"])
+            if cupos < 2:
+                await interaction.response.send_message(
+                    "❌ At least 2 teams are needed for playoffs",  # FIX (EN)
+                    ephemeral=True
+                )
+                return
+
+            # ✅ brackets for THIS tournament (note: your function uses legacy get_torneo)
+            generar_brackets_eliminatoria_multi(guild_id, self.torneo_uid, self.doble)
+            set_torneo_activo_multi(data, guild_id, self.torneo_uid)
+            save_data(data)
+
+            await interaction.channel.send(
+                "🏆 **PLAYOFF PHASE STARTED**",  # FIX (EN)
+                view=PanelEliminatorias(self.admin_id, self.torneo_uid)
             )
-            return
 
-        if not torneo.get("tabla"):
             await interaction.response.send_message(
-                "❌ No standings table yet",  # FIX (EN)
+                "✅ Playoffs created",  # FIX (EN)
                 ephemeral=True
             )
-            return
-
-        # ✅ brackets for THIS tournament (note: your function uses legacy get_torneo)
-        generar_brackets_eliminatoria_multi(guild_id, self.torneo_uid) # stays the same for now
-        set_torneo_activo_multi(data, guild_id, self.torneo_uid)
-        save_data(data)
-
-        await interaction.channel.send(
-            "🏆 **PLAYOFF PHASE STARTED**",  # FIX (EN)
-            view=PanelEliminatorias(self.admin_id)  # later we can make it multi if needed
-        )
-
-        await interaction.response.send_message(
-            "✅ Playoffs created",  # FIX (EN)
-            ephemeral=True
-        )
 # =============================
 # 🧩 ADMIN PLAYOFF RESULT BUTTON - REV  [MULTI]  # FIX (EN)
 # =============================
@@ -3632,20 +4370,32 @@ class VerBracketsButton(discord.ui.Button):
             )
             return
 
+        # ✅ solo las rondas en juego (un cuadro de 256 no entra en un embed)
+        cuadro = cuadro_torneo(guild_id, torneo)
+        ultimo = brackets[-1]
+        en_juego = cuadro.rondas_en_juego() or [(ultimo.get("cuadro", "W"), ultimo.get("ronda", 1))]
+        titulo = "🏆 Playoff brackets - " + " / ".join(  # FIX (EN)
+            nombre_ronda(ronda, cuadro.rondas.get(llave, 0), llave) for llave, ronda in en_juego
+        )
+        if cuadro.campeon():
+            titulo = f"🏆 Champion: {cuadro.campeon()}"  # FIX (EN)
+
         embed = discord.Embed(
-            title="🏆 Playoff brackets",  # FIX (EN)
+            title=titulo,
             color=discord.Color.gold()
         )
 
-        for b in brackets:
+        # embeds: máximo 25 campos
+        visibles = [b for llave, ronda in en_juego for b in cuadro.ronda(ronda, llave)]
+        for b in visibles[:25]:
             estado = "🔒 Locked" if b.get("bloqueado") else "🟢 Active"  # FIX (EN)
             resultado = b.get("resultado") or "Pending"  # FIX (EN)
 
             embed.add_field(
                 name=f"⚔️ Match {b.get('id')}",
-                value=f"{b.get('a')} 🆚 {b.get('b')}\n"
+                value=f"{b.get('a') or 'TBD'} 🆚 {b.get('b') or 'TBD'}\n"  # FIX (EN)
                       f"📊 {resultado}\n"
-                      f"🏅 Winner: {b.get('ganador', '—')}\n"  # FIX (EN)
+                      f"🏅 Winner: {b.get('ganador') or '—'}\n"  # FIX (EN)
                       f"{estado}",
                 inline=False
             )
@@ -3700,6 +4450,7 @@ class PanelTorneo(discord.ui.View):
         if admin_id:
             # ✅ SorteoButton now receives (torneo_uid, admin_id)
             self.add_item(SorteoButton(self.torneo_uid, admin_id))
+            self.add_item(SiguienteRondaButton(self.torneo_uid, admin_id))
 
         # ✅ these are now multi
         self.add_item(VerPartidosButton(self.torneo_uid))
@@ -3707,6 +4458,7 @@ class PanelTorneo(discord.ui.View):
 
         if admin_id:
             self.add_item(IniciarEliminatoriasButton(admin_id, self.torneo_uid))
+            self.add_item(IniciarEliminatoriasButton(admin_id, self.torneo_uid, doble=True))
 # =============================
 # Def Next partido ID
 # =============================
@@ -3747,7 +4499,7 @@ def _asegurar_equipo_en_torneo_y_tabla(torneo: dict, nombre_equipo: str):
 
     # ✅ si no existe en tabla, lo agregamos
     if nombre_equipo not in torneo["tabla"]:
-        torneo["tabla"][nombre_equipo] = {"pj": 0, "pg": 0, "pp": 0, "pts": 0}
+        torneo["tabla"][nombre_equipo] = clasificacion.fila_vacia()
 # =============================
 # track_recurso_torneo
 # =============================
@@ -3755,7 +4507,9 @@ def track_recurso_torneo(
     torneo: dict,
     *,
     canal_id: int | None = None,
-    categoria_id: int | None = None
+    categoria_id: int | None = None,
+    guild_id: int | None = None,
+    rol: str | None = None
 ):
     # 🔒 blindaje estructura
     torneo.setdefault("recursos", {})
@@ -3780,6 +4534,13 @@ def track_recurso_torneo(
     if categoria_id and categoria_id not in torneo["recursos"]["categorias"]:
         torneo["recursos"]["categorias"].append(categoria_id)
 
+    # ✅ índice inverso id -> (guild, uid, partido, rol); no pisa un rol más específico
+    ids = _ids_recursos(torneo)
+    if canal_id and (rol or str(canal_id) not in ids):
+        registrar_recurso_discord(guild_id, torneo, canal_id, rol or "canal")
+    if categoria_id and str(categoria_id) not in ids:
+        registrar_recurso_discord(guild_id, torneo, categoria_id, "categoria")
+
     # (opcional) return para debug
     return torneo["recursos"]
 # =============================
@@ -3825,7 +4586,7 @@ async def iniciar_torneo(ctx: discord.ApplicationContext):
     torneo.setdefault("creador", ctx.author.id)
     torneo.setdefault("logo", None)
 
-    # ✅ compat: data["torneo"] points to the active tournament  # FIX (EN)
+    # ✅ compat: torneo_actual() points to the active tournament  # FIX (EN)
     set_torneo_activo_multi(data, guild_id, uid)
 
     save_data(data)
@@ -3858,6 +4619,37 @@ async def add_streamer_role(
         ephemeral=True
     )
 # =============================
+# /tabla_recalcular  # FIX (EN)
+# =============================
+@bot.slash_command(
+    name="tabla_recalcular",
+    description="Rebuild the standings from all match results",  # FIX (EN)
+)
+@discord.default_permissions(administrator=True)
+async def tabla_recalcular(ctx: discord.ApplicationContext, uid: str = None):
+    global data
+    data = load_data()
+
+    guild_id = ctx.guild.id
+    srv = ensure_multi_torneo_schema(data, guild_id)
+    uid = uid.upper() if uid else None
+
+    if uid and uid not in srv.get("torneos", {}):
+        await ctx.respond("❌ That UID doesn't exist in this server. Use /torneo_listar", ephemeral=True)  # FIX (EN)
+        return
+
+    async with transaccion_torneo(guild_id, uid) as t:
+        clasif = recalcular_tabla(guild_id, t.torneo)
+
+    jugados = sum(
+        1 for p in t.torneo.get("partidos", [])
+        if clasificacion.parsear_resultado(p.get("resultado")) is not None
+    )
+    await ctx.respond(
+        f"📊 Standings rebuilt: {len(clasif)} teams, {jugados} results.",  # FIX (EN)
+        ephemeral=True
+    )
+# =============================
 # /torneo_crear  # FIX (EN)
 # =============================
 @bot.slash_command(name="torneo_crear", description="Create a new tournament in this server")  # FIX (EN)
@@ -3917,6 +4709,50 @@ async def torneo_usar(ctx: discord.ApplicationContext, uid: str):
 
     await ctx.respond(f"✅ Active tournament changed to `{uid}`.", ephemeral=True)  # FIX (EN)
 # =============================
+# /mis_partidos  # FIX (EN)
+# =============================
+@bot.slash_command(name="mis_partidos", description="List the matches where you are captain or streamer")  # FIX (EN)
+async def mis_partidos(ctx: discord.ApplicationContext):
+    global data
+    data = load_data()
+
+    guild_id = ctx.guild.id
+    srv = ensure_multi_torneo_schema(data, guild_id)
+
+    # ✅ índice usuario -> partidos (no recorre torneos)
+    nombres_rol = {
+        "capitan_A": "🧑‍✈️ Captain",  # FIX (EN)
+        "capitan_B": "🧑‍✈️ Captain",  # FIX (EN)
+        "postulado": "📝 Streamer applicant",  # FIX (EN)
+        "streamer": "🎥 Streamer",
+    }
+
+    lineas = []
+    mios = partidos_de_usuario(guild_id, ctx.author.id)
+    mios.sort(key=lambda x: (x[0], int(x[1]) if x[1].isdigit() else 0))
+
+    for uid, pid, roles in mios:
+        torneo = srv.get("torneos", {}).get(uid)
+        p = buscar_partido(guild_id, torneo, pid) if isinstance(torneo, dict) else None
+        if p is None:
+            continue
+
+        etiquetas = ", ".join(sorted({nombres_rol.get(r, r) for r in roles}))
+        lineas.append(
+            f"- `{uid}` Match #{p.get('id')}: **{p.get('a')} vs {p.get('b')}** "  # FIX (EN)
+            f"({p.get('estado', '')}) — {etiquetas}"
+        )
+
+    if not lineas:
+        await ctx.respond("📭 You are not in any match of this server.", ephemeral=True)  # FIX (EN)
+        return
+
+    texto = "\n".join(lineas)
+    if len(texto) > 1900:  # límite de 2000 caracteres de Discord
+        texto = texto[:1900].rsplit("\n", 1)[0] + "\n…"
+
+    await ctx.respond(f"📋 Your matches:\n{texto}", ephemeral=True)  # FIX (EN)
+# =============================
 # /partido_crear  # FIX (EN)
 # =============================
 @bot.slash_command(
@@ -3947,141 +4783,89 @@ async def partido_crear(
         )
         return
 
-    # ✅ set correct tournament  # FIX (EN)
-    set_torneo_activo_multi(data, guild_id, uid)
-    torneo = get_torneo_v2(data, guild_id, uid)
-
-    # ✅ ensure teams/standings (in case it's a new team name)  # FIX (EN)
-    _asegurar_equipo_en_torneo_y_tabla(torneo, equipo_a)
-    _asegurar_equipo_en_torneo_y_tabla(torneo, equipo_b)
+    # ✅ UNIT OF WORK: vista consistente + un solo commit al final  # FIX (EN)
+    async with transaccion_torneo(guild_id, uid) as t:
+        torneo = t.torneo
 
-    # ✅ create full match  # FIX (EN)
-    pid = _next_partido_id(torneo)
+        # ✅ ensure teams/standings (in case it's a new team name)  # FIX (EN)
+        _asegurar_equipo_en_torneo_y_tabla(torneo, equipo_a)
+        _asegurar_equipo_en_torneo_y_tabla(torneo, equipo_b)
 
-    partido = {
-        "id": pid,
-        "a": equipo_a.strip(),
-        "b": equipo_b.strip(),
-        "fecha": fecha if fecha else "⏰ Not defined",  # FIX (EN)
-        "estado": "🕒 Pending",  # FIX (EN)
-        "resultado": None,
-        "bloqueado": False,
-
-        # for embeds / views  # FIX (EN)
-        "equipos": {
-            "A": {"capitanes": []},
-            "B": {"capitanes": []}
-        },
-
-        # streamers
-        "streamers": [],
-        "streamers_postulados": [],
-        "streamers_aprobados": [],
+        # ✅ create full match  # FIX (EN)
+        pid = _next_partido_id(torneo)
 
         # ✅ VERY IMPORTANT so actualizar_mensaje_publico_partido
-        # rebuilds the button with the correct UID:  # FIX (EN)
-        "torneo_uid": uid
-    }
-
-    torneo.setdefault("partidos", [])
-    torneo["partidos"].append(partido)
-
-    # ✅ save  # FIX (EN)
-    set_torneo_activo_multi(data, guild_id, uid)
-    save_data(data)
-
-    guild = ctx.guild
-
-    # 📺 Public matches channel (isolated by UID)  # FIX (EN)
-    canal_partidos = await crear_categoria_y_canal(
-        guild,
-        f"⚔️ MATCHES - {uid}",  # FIX (EN)
-        f"partidos-a-disputar-{uid.lower()}"
-    )
-
-    # ✅ ADDED: track channel + category (by ID) for full deletion  # FIX (EN)
-    try:
-        track_recurso_torneo(torneo, canal_id=canal_partidos.id)
-        if getattr(canal_partidos, "category_id", None):
-            track_recurso_torneo(torneo, categoria_id=canal_partidos.category_id)
-        set_torneo_activo_multi(data, guild_id, uid)
-        save_data(data)
-    except:
-        pass
+        # rebuilds the button with the correct UID (torneo_uid)  # FIX (EN)
+        partido = modelos.nuevo_partido(
+            id=pid,
+            a=equipo_a.strip(),
+            b=equipo_b.strip(),
+            fecha=fecha if fecha else "⏰ Not defined",  # FIX (EN)
+            torneo_uid=uid
+        )
 
-    # 🛠️ Admin channel (isolated by UID)  # FIX (EN)
-    canal_admin = await crear_categoria_y_canal(
-        guild,
-        f"⚙️ TOURNAMENT ADMIN - {uid}",  # FIX (EN)
-        f"admin-partidos-{uid.lower()}"
-    )
+        # ✅ alta en torneo + índice de partidos  # FIX (EN)
+        registrar_partido(guild_id, torneo, partido)
 
-    # ✅ ADDED: track channel + category (by ID) for full deletion  # FIX (EN)
-    try:
-        track_recurso_torneo(torneo, canal_id=canal_admin.id)
-        if getattr(canal_admin, "category_id", None):
-            track_recurso_torneo(torneo, categoria_id=canal_admin.category_id)
-        set_torneo_activo_multi(data, guild_id, uid)
-        save_data(data)
-    except:
-        pass
+        guild = ctx.guild
 
-    # =============================
-    # POST MATCH (PUBLIC)
-    # =============================
-    embed = build_partido_embed(partido)
+        # 📺 Public matches channel (isolated by UID, tracked by ID)  # FIX (EN)
+        canal_partidos = await crear_categoria_y_canal(
+            guild,
+            f"⚔️ MATCHES - {uid}",  # FIX (EN)
+            f"partidos-a-disputar-{uid.lower()}",
+            uid
+        )
+        registrar_recurso_discord(guild_id, torneo, canal_partidos.id, "canal_publico")
 
-    view_publica = discord.ui.View(timeout=None)
-    rol_streamer_id = data.get("rol_streamer_id")
-    if rol_streamer_id:
-        view_publica.add_item(
-            PostularStreamerButton(partido["id"], rol_streamer_id, uid)
+        # 🛠️ Admin channel (isolated by UID, tracked by ID)  # FIX (EN)
+        canal_admin = await crear_categoria_y_canal(
+            guild,
+            f"⚙️ TOURNAMENT ADMIN - {uid}",  # FIX (EN)
+            f"admin-partidos-{uid.lower()}",
+            uid
         )
 
-    mensaje = await canal_partidos.send(embed=embed, view=view_publica)
+        # =============================
+        # POST MATCH (PUBLIC)
+        # =============================
+        embed = build_partido_embed(partido)
+
+        view_publica = discord.ui.View(timeout=None)
+        rol_streamer_id = t.data.get("rol_streamer_id")
+        if rol_streamer_id:
+            view_publica.add_item(
+                PostularStreamerButton(partido["id"], rol_streamer_id, uid)
+            )
 
-    partido["canal_publico_id"] = canal_partidos.id
-    partido["mensaje_publico_id"] = mensaje.id
+        mensaje = await canal_partidos.send(embed=embed, view=view_publica)
 
-    set_torneo_activo_multi(data, guild_id, uid)
-    save_data(data)
+        # ✅ partido ES el objeto real del store: sin recargar  # FIX (EN)
+        tocar_partido(guild_id, torneo, partido)
+        partido["canal_publico_id"] = canal_partidos.id
+        partido["mensaje_publico_id"] = mensaje.id
+        registrar_recurso_discord(guild_id, torneo, mensaje.id, "mensaje_publico", pid, canal_partidos.id)
 
-    # ✅ AÑADIDO: persistir IDs sobre el partido REAL en data.json (blindaje)
-    try:
-        data = load_data()
-        torneo_real = get_torneo_v2(data, guild_id, uid)
+        # =============================
+        # MATCH ADMIN PANEL
+        # =============================
+        admin_id = ctx.author.id
 
-        for pp in torneo_real.get("partidos", []):
-            if str(pp.get("id")) == str(partido.get("id")):
-                pp["canal_publico_id"] = canal_partidos.id
-                pp["mensaje_publico_id"] = mensaje.id
-                pp["torneo_uid"] = uid
-                break
+        view_admin = discord.ui.View(timeout=None)
+        view_admin.add_item(EditarPartidoButton(admin_id, partido["id"], uid))
+        view_admin.add_item(EditarFechaButton(admin_id, partido["id"], uid))
+        view_admin.add_item(EditarEstadoButton(admin_id, partido["id"], uid))
+        view_admin.add_item(ResultadoButton(admin_id, partido["id"], uid))
+        view_admin.add_item(CrearCanalPartidoButton(admin_id, partido["id"], uid))
+        view_admin.add_item(AñadirStreamerButton(partido["id"], uid))
+        view_admin.add_item(IniciarFaseBaneoButton(partido["id"], uid))
 
-        set_torneo_activo_multi(data, guild_id, uid)
-        save_data(data)
-    except Exception as e:
-        print("⚠️ Persistencia IDs manual falló:", repr(e))
-    # =============================
-    # MATCH ADMIN PANEL
-    # =============================
-    admin_id = ctx.author.id
-
-    view_admin = discord.ui.View(timeout=None)
-    view_admin.add_item(EditarPartidoButton(admin_id, partido["id"], uid))
-    view_admin.add_item(EditarFechaButton(admin_id, partido["id"], uid))
-    view_admin.add_item(EditarEstadoButton(admin_id, partido["id"], uid))
-    view_admin.add_item(ResultadoButton(admin_id, partido["id"], uid))
-    view_admin.add_item(CrearCanalPartidoButton(admin_id, partido["id"], uid))
-    view_admin.add_item(AñadirStreamerButton(partido["id"], uid))
-    view_admin.add_item(IniciarFaseBaneoButton(partido["id"], uid))
-
-    await canal_admin.send(
-        f"🛠️ **Admin panel – Match #{partido['id']}**\n"  # FIX (EN)
-        f"⚔️ **{partido['a']} vs {partido['b']}**\n"
-        f"🧩 Tournament UID: `{uid}`",  # FIX (EN)
-        view=view_admin
-    )
+        await canal_admin.send(
+            f"🛠️ **Admin panel – Match #{partido['id']}**\n"  # FIX (EN)
+            f"⚔️ **{partido['a']} vs {partido['b']}**\n"
+            f"🧩 Tournament UID: `{uid}`",  # FIX (EN)
+            view=view_admin
+        )
 
     await ctx.respond(
         f"✅ Extra match created (ID `{pid}`) in tournament `{uid}`.\n"  # FIX (EN)
@@ -4097,8 +4881,8 @@ import discord
 async def borrar_recursos_torneo(guild: discord.Guild, torneo: dict, uid: str):
     """
     Deletes tournament channels/categories.
-    - First tries stored IDs (torneo["recursos"])
-    - If missing, uses a fallback by names that contain the UID
+    - Uses ONLY stored IDs (torneo["recursos"] + reverse index recursos["ids"])
+    - Never enumerates guild channels or matches by name
     """  # FIX (EN)
     borrados_canales = 0
     borrados_categorias = 0
@@ -4108,15 +4892,27 @@ async def borrar_recursos_torneo(guild: discord.Guild, torneo: dict, uid: str):
 
     # ✅ NEW: normalize uid for safe comparisons  # FIX (EN)
     uid = (uid or "").upper().strip()
-    uid_low = uid.lower()
 
     # ============
-    # 1) DELETE BY IDS (RECOMMENDED)  # FIX (EN)
+    # 1) COLLECT IDS (legacy lists + reverse index)  # FIX (EN)
     # ============
+    _migrar_ids_torneo(torneo)  # old tournaments: ids saved on matches  # FIX (EN)
     recursos = torneo.get("recursos", {})
     canales_ids = list(dict.fromkeys(recursos.get("canales", [])))  # unique
     categorias_ids = list(dict.fromkeys(recursos.get("categorias", [])))
 
+    for did, (_pid, rol, _canal) in recursos.get("ids", {}).items():
+        if rol.startswith("mensaje"):
+            continue  # messages go away with their channel  # FIX (EN)
+        did = _a_int(did)
+        if rol.startswith("categoria"):
+            categorias_ids.append(did)
+        else:
+            canales_ids.append(did)
+
+    canales_ids = [c for c in dict.fromkeys(canales_ids) if c]
+    categorias_ids = [c for c in dict.fromkeys(categorias_ids) if c]
+
     # ✅ NEW: helper to delete threads if the channel supports them  # FIX (EN)
     async def _borrar_threads_de_canal(ch):
         try:
@@ -4146,6 +4942,9 @@ async def borrar_recursos_torneo(guild: discord.Guild, torneo: dict, uid: str):
         except:
             pass
 
+    # ============
+    # 2) DELETE BY IDS  # FIX (EN)
+    # ============
     # delete channels by id  # FIX (EN)
     for cid in canales_ids:
         ch = guild.get_channel(cid)
@@ -4154,17 +4953,13 @@ async def borrar_recursos_torneo(guild: discord.Guild, torneo: dict, uid: str):
 
     # delete categories by id (at the end)  # FIX (EN)
     for catid in categorias_ids:
-        cat = discord.utils.get(guild.categories, id=catid)
-        if cat:
+        cat = guild.get_channel(catid)
+        if isinstance(cat, discord.CategoryChannel):
             try:
                 if catid in borrados_ids:
                     continue
 
-                # ✅ NEW: delete threads inside (if forum/text)  # FIX (EN)
-                for ch in list(cat.channels):
-                    await _borrar_threads_de_canal(ch)
-
-                # delete channels inside the category  # FIX (EN)
+                # delete channels inside the category (with threads)  # FIX (EN)
                 for ch in list(cat.channels):
                     await _borrar_canal(ch, f"Delete tournament {uid}")  # FIX (EN)
 
@@ -4178,111 +4973,6 @@ async def borrar_recursos_torneo(guild: discord.Guild, torneo: dict, uid: str):
             except:
                 pass
 
-    # ============
-    # 2) FALLBACK BY NAMES (IF IDS WEREN'T SAVED)  # FIX (EN)
-    # ============
-    patrones_categoria = [
-        f"🏆 TORNEO - ",
-        f"⚔️ PARTIDOS - {uid}",
-        f"⚙️ ADMIN TORNEO - {uid}",
-        f"📛 CANALES FASE DE BANEO - {uid}",
-        f"📊 CLASIFICACIÓN - {uid}",
-    ]
-
-    # ✅ NEW: “safe” patterns for channels  # FIX (EN)
-    # Eg: "tabla-abc123", "admin-partidos-abc123", "partidos-a-disputar-abc123"
-    def _match_canal_seguro(nombre: str) -> bool:
-        n = (nombre or "").lower()
-        return (
-            n.endswith(f"-{uid_low}")
-            or f"-{uid_low}-" in n
-            or n.startswith(f"tabla-{uid_low}")
-            or n.startswith(f"admin-partidos-{uid_low}")
-            or n.startswith(f"partidos-a-disputar-{uid_low}")
-            or n.startswith(f"info-general-{uid_low}")
-            or n.startswith(f"equipos-{uid_low}")
-        )
-
-    # 2.1 delete loose channels (text/voice/forum/stage) outside categories  # FIX (EN)
-    # ✅ NEW: include more types besides text_channels  # FIX (EN)
-    canales_fuera = []
-
-    # ✅ FIX: in discord.py some props may not exist; use getattr defensively  # FIX (EN)
-    try:
-        canales_fuera.extend(list(getattr(guild, "text_channels", [])))
-    except:
-        pass
-    try:
-        canales_fuera.extend(list(getattr(guild, "voice_channels", [])))
-    except:
-        pass
-    try:
-        canales_fuera.extend(list(getattr(guild, "forum_channels", [])))  # discord.py 2.x
-    except:
-        pass
-    try:
-        canales_fuera.extend(list(getattr(guild, "stage_channels", [])))
-    except:
-        pass
-
-    # ✅ NEW: don't delete channels that are inside categories (only “loose”)  # FIX (EN)
-    for ch in canales_fuera:
-        try:
-            if not ch:
-                continue
-
-            # ✅ NEW: if already deleted by ID, skip  # FIX (EN)
-            if ch.id in borrados_ids:
-                continue
-
-            # ✅ NEW: only channels “outside category”  # FIX (EN)
-            if getattr(ch, "category_id", None) is not None:
-                continue
-
-            # delete only if “safe” match  # FIX (EN)
-            if _match_canal_seguro(getattr(ch, "name", "")):
-                await _borrar_canal(ch, f"Delete tournament {uid} (fallback)")  # FIX (EN)
-        except:
-            pass
-
-    # 2.2 delete tournament categories (and whatever they contain)  # FIX (EN)
-    for cat in list(guild.categories):
-        cname = cat.name or ""
-
-        # ✅ (your original logic remains)  # FIX (EN)
-        es_uid = (
-            cname.endswith(f"- {uid}")
-            or any(p in cname for p in patrones_categoria)
-            or (uid in cname)
-        )
-
-        if es_uid:
-            try:
-                # ✅ NEW: avoid deleting if already deleted by ID  # FIX (EN)
-                if cat.id in borrados_ids:
-                    continue
-
-                for ch in list(cat.channels):
-                    try:
-                        if ch.id in borrados_ids:
-                            continue
-
-                        # ✅ NEW: delete threads inside if any  # FIX (EN)
-                        await _borrar_threads_de_canal(ch)
-
-                        await _borrar_canal(ch, f"Delete tournament {uid} (fallback)")  # FIX (EN)
-                    except:
-                        pass
-
-                try:
-                    await cat.delete(reason=f"Delete tournament {uid} (fallback)")  # FIX (EN)
-                    borrados_categorias += 1
-                    borrados_ids.add(cat.id)
-                except:
-                    pass
-            except:
-                pass
-
     return borrados_canales, borrados_categorias
 # =============================
 # /torneo_borrar  # FIX (EN)
@@ -4315,60 +5005,65 @@ async def torneo_borrar(ctx: discord.ApplicationContext, uid: str):
 
     guild_id = ctx.guild.id
     uid = (uid or "").upper().strip()
+    async with bloqueo_torneo(guild_id, uid):
 
-    srv = ensure_multi_torneo_schema(data, guild_id)
-    torneos = srv.get("torneos", {})
+        srv = ensure_multi_torneo_schema(data, guild_id)
+        torneos = srv.get("torneos", {})
+
+        if uid not in torneos:
+            try:
+                await ctx.followup.send("❌ That UID doesn't exist. Use `/torneo_listar`.", ephemeral=True)  # FIX (EN)
+            except:
+                pass
+            return
 
-    if uid not in torneos:
+        torneo = torneos[uid]
+
+        # ✅ NEW: send message first (in case the channel gets deleted)  # FIX (EN)
         try:
-            await ctx.followup.send("❌ That UID doesn't exist. Use `/torneo_listar`.", ephemeral=True)  # FIX (EN)
+            await ctx.followup.send(
+                f"🗑️ Deleting tournament `{uid}`... (channels/categories + data)",  # FIX (EN)
+                ephemeral=True
+            )
         except:
             pass
-        return
-
-    torneo = torneos[uid]
-
-    # ✅ NEW: send message first (in case the channel gets deleted)  # FIX (EN)
-    try:
-        await ctx.followup.send(
-            f"🗑️ Deleting tournament `{uid}`... (channels/categories + data)",  # FIX (EN)
-            ephemeral=True
-        )
-    except:
-        pass
 
-    # 1) delete Discord resources  # FIX (EN)
-    try:
-        borrados_canales, borrados_categorias = await borrar_recursos_torneo(ctx.guild, torneo, uid)
-    except Exception:
-        borrados_canales, borrados_categorias = 0, 0
+        # 1) delete Discord resources  # FIX (EN)
+        try:
+            borrados_canales, borrados_categorias = await borrar_recursos_torneo(ctx.guild, torneo, uid)
+        except Exception:
+            borrados_canales, borrados_categorias = 0, 0
 
-    # 2) delete from data.json  # FIX (EN)
-    try:
-        del torneos[uid]
-    except:
-        pass
+        # 2) delete from data.json  # FIX (EN)
+        try:
+            del torneos[uid]
+            olvidar_indice_torneo(guild_id, uid)
+            olvidar_recursos_discord(guild_id, uid, torneo)
+            olvidar_usuarios_torneo(guild_id, uid)
+        except:
+            pass
 
-    # 3) if it was active, switch to another  # FIX (EN)
-    if srv.get("activo") == uid:
-        nuevo_activo = next(iter(torneos.keys()), "DEFAULT")
-        srv["activo"] = nuevo_activo
+        # 3) if it was active, switch to another  # FIX (EN)
+        if srv.get("activo") == uid:
+            nuevo_activo = next(iter(torneos.keys()), "DEFAULT")
+            srv["activo"] = nuevo_activo
 
-    save_data(data)
+        # ✅ borrado durable antes de confirmar (sin bloquear el loop)
+        await save_data_async(data)
 
-    # ✅ NEW: try followup; if the channel was deleted, DM as fallback  # FIX (EN)
-    msg_final = (
-        f"✅ Tournament `{uid}` deleted.\n"  # FIX (EN)
-        f"📌 Channels deleted: `{borrados_canales}` | Categories deleted: `{borrados_categorias}`"  # FIX (EN)
-    )
+        # ✅ NEW: try followup; if the channel was deleted, DM as fallback  # FIX (EN)
+        msg_final = (
+            f"✅ Tournament `{uid}` deleted.\n"  # FIX (EN)
+            f"📌 Channels deleted: `{borrados_canales}` | Categories deleted: `{borrados_categorias}`"  # FIX (EN)
+        )
 
-    try:
-        await ctx.followup.send(msg_final, ephemeral=True)
-    except:
         try:
-            await ctx.author.send(msg_final)
+            await ctx.followup.send(msg_final, ephemeral=True)
         except:
-            pass
+            try:
+                await ctx.author.send(msg_final)
+            except:
+                pass
 # =============================
 # READY
 # =============================
@@ -4376,5 +5071,11 @@ async def torneo_borrar(ctx: discord.ApplicationContext, uid: str):
 async def on_ready():
     print(f"✅ Bot conectado como {bot.user}")
 
+    # ✅ SIGTERM (deploy / docker stop): cerrar el bot y bajar el store a disco
+    persistencia.instalar_apagado(bot.close)
+
+    # ✅ backend shards: leer los guilds en el hilo de I/O, no en los callbacks
+    await persistencia.precargar_servidores(load_data(), [g.id for g in bot.guilds])
+
 keep_alive()  # ⬅️ antes de bot.run
 bot.run(TOKEN)
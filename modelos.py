@@ -0,0 +1,326 @@
+from dataclasses import MISSING, dataclass, field, fields
+
+import baneo
+
+# =============================
+# MODELOS TIPADOS (dataclasses con __slots__) - REV
+# =============================
+# Forma canónica de Torneo / Partido / FaseBaneo / TablaRow.
+# - from_json(): valida y corrige tipos UNA vez (al cargar)
+# - to_json(): omite los campos que tienen su valor por defecto (disco compacto)
+# - to_json(completo=True): lo mismo + los campos de _SIEMPRE aunque valgan
+#   su default (los que el código lee con d["..."]); es la forma del store
+# El store sigue siendo de dicts (las vistas los mutan en el lugar): los
+# modelos solo validan y convierten, no achican la memoria. Por eso el store
+# NO materializa el resto de los defaults (el código usa .get / setdefault).
+# Las llaves que el modelo no conoce viajan en `extra`: no se pierde nada.
+
+
+def _default(f):
+    if f.default is not MISSING:
+        return f.default
+    if f.default_factory is not MISSING:
+        return f.default_factory()
+    return None
+
+
+def _a_json(valor, completo: bool):
+    if isinstance(valor, _Modelo):
+        return valor.to_json(completo)
+    if isinstance(valor, list):
+        return [_a_json(v, completo) for v in valor]
+    if isinstance(valor, dict):
+        return {k: _a_json(v, completo) for k, v in valor.items()}
+    return valor
+
+
+def _int_o_igual(x):
+    # ids de Discord: int si se puede, si no se deja como vino
+    try:
+        return int(x)
+    except (TypeError, ValueError):
+        return x
+
+
+def _int(x, por_defecto: int = 0) -> int:
+    try:
+        return int(x)
+    except (TypeError, ValueError):
+        return por_defecto
+
+
+def _lista(x) -> list:
+    return list(x) if isinstance(x, (list, tuple)) else []
+
+
+def _dict(x) -> dict:
+    return dict(x) if isinstance(x, dict) else {}
+
+
+class _Modelo:
+    __slots__ = ()
+
+    # cache por clase: nombres de campo (sin "extra")
+    _NOMBRES: dict = {}
+
+    # campos que el store tiene siempre (modo completo), aunque valgan su default
+    _SIEMPRE = frozenset()
+
+    @classmethod
+    def _campos(cls) -> frozenset:
+        nombres = _Modelo._NOMBRES.get(cls)
+        if nombres is None:
+            nombres = frozenset(f.name for f in fields(cls) if f.name != "extra")
+            _Modelo._NOMBRES[cls] = nombres
+        return nombres
+
+    @classmethod
+    def from_json(cls, d):
+        if isinstance(d, cls):
+            return d
+
+        nombres = cls._campos()
+        conocidos, extra = {}, {}
+        for k, v in _dict(d).items():
+            if k in nombres:
+                conocidos[k] = v
+            else:
+                extra[k] = v
+
+        obj = cls(**conocidos, extra=extra)
+        obj._validar()
+        return obj
+
+    def _validar(self):
+        pass
+
+    def to_json(self, completo: bool = False) -> dict:
+        out = {}
+        for f in fields(self):
+            if f.name == "extra":
+                continue
+
+            valor = getattr(self, f.name)
+            por_defecto = _default(f)
+
+            if valor == por_defecto and not (completo and f.name in self._SIEMPRE):
+                continue
+
+            out[f.name] = _a_json(valor, completo)
+
+        out.update(self.extra)
+        return out
+
+
+@dataclass(slots=True, eq=True)
+class TablaRow(_Modelo):
+    pj: int = 0
+    pg: int = 0
+    pe: int = 0   # empates
+    pp: int = 0
+    gf: int = 0   # juegos a favor
+    gc: int = 0   # juegos en contra
+    pts: int = 0
+    extra: dict = field(default_factory=dict)
+
+    _SIEMPRE = frozenset({"pj", "pg", "pe", "pp", "gf", "gc", "pts"})
+
+    def _validar(self):
+        self.pj = _int(self.pj)
+        self.pg = _int(self.pg)
+        self.pe = _int(self.pe)
+        self.pp = _int(self.pp)
+        self.gf = _int(self.gf)
+        self.gc = _int(self.gc)
+        self.pts = _int(self.pts)
+
+
+@dataclass(slots=True, eq=True)
+class FaseBaneo(_Modelo):
+    # defaults = los mismos que ya asumía el código (.get / setdefault)
+    activa: bool = True
+    coinflip: dict = field(default_factory=dict)
+    equipos: dict = field(default_factory=dict)
+    turno_actual: str | None = None
+    map_pool: list = field(default_factory=list)
+    mapa_actual: str | None = None
+    mapa_vista: str | None = None
+    baneados: list = field(default_factory=list)  # legacy: ver bans
+    bans: dict = field(default_factory=dict)      # {mapa: máscara} (baneo.py)
+    historial: list = field(default_factory=list)
+    max_baneos: int = 3
+    mapas: dict = field(default_factory=dict)
+    historial_baneos: list = field(default_factory=list)
+    contador_extra: int = 0
+    estado: str = "NORMAL"
+    resultado: dict | None = None
+    formato: str | None = None                    # None = Extra/Final clásico
+    paso: int = 0
+    picks: list = field(default_factory=list)
+    extra: dict = field(default_factory=dict)
+
+    # las llaves con las que BanMapasView arma la fase
+    _SIEMPRE = frozenset({
+        "activa", "coinflip", "equipos", "turno_actual", "map_pool", "mapa_actual",
+        "bans", "historial", "max_baneos", "historial_baneos",
+    })
+
+    def _validar(self):
+        self.activa = bool(self.activa)
+        self.coinflip = _dict(self.coinflip)
+        self.equipos = {k: _dict(v) for k, v in _dict(self.equipos).items()}
+        self.map_pool = [str(m) for m in _lista(self.map_pool)]
+        self.bans = {str(m): _int(v) & baneo.TODOS for m, v in _dict(self.bans).items() if _int(v)}
+        self.baneados = _lista(self.baneados)
+        if self.baneados:
+            # "Omaha Axis" -> {"Omaha": 1}; lo que no calza queda en baneados
+            self.bans, self.baneados = baneo.convertir_legacy(self.map_pool, self.baneados, self.bans)
+        self.historial = _lista(self.historial)
+        self.max_baneos = _int(self.max_baneos, 3)
+        self.mapas = _dict(self.mapas)
+        self.historial_baneos = _lista(self.historial_baneos)
+        self.contador_extra = _int(self.contador_extra)
+        self.paso = _int(self.paso)
+        self.picks = [p for p in _lista(self.picks) if isinstance(p, dict)]
+
+
+def _equipos_partido(x) -> dict:
+    equipos = _dict(x)
+    for lado in ("A", "B"):
+        eq = _dict(equipos.get(lado))
+        eq["capitanes"] = [_int_o_igual(u) for u in _lista(eq.get("capitanes"))]
+        equipos[lado] = eq
+    return equipos
+
+
+@dataclass(slots=True, eq=True)
+class Partido(_Modelo):
+    id: int | str | None = None
+    a: str = ""
+    b: str = ""
+    fecha: str = "⏰ Not set"
+    estado: str = "🕒 Pending"
+    torneo_uid: str | None = None
+    resultado: str | None = None
+    bloqueado: bool = False
+    equipos: dict = field(default_factory=lambda: _equipos_partido(None))
+    streamers: list = field(default_factory=list)
+    streamers_postulados: list = field(default_factory=list)
+    streamers_aprobados: list = field(default_factory=list)
+    canal_publico_id: int | None = None
+    mensaje_publico_id: int | None = None
+    canal_partido_id: int | None = None
+    mensaje_partido_id: int | None = None
+    fase_baneo: FaseBaneo | None = None
+    extra: dict = field(default_factory=dict)
+
+    # las llaves con las que el sorteo arma cada partido
+    _SIEMPRE = frozenset({"id", "a", "b", "fecha", "estado", "torneo_uid"})
+
+    def _validar(self):
+        self.a = "" if self.a is None else str(self.a)
+        self.b = "" if self.b is None else str(self.b)
+        self.bloqueado = bool(self.bloqueado)
+        self.equipos = _equipos_partido(self.equipos)
+        self.streamers = _lista(self.streamers)
+        self.streamers_postulados = [_int_o_igual(u) for u in _lista(self.streamers_postulados)]
+        self.streamers_aprobados = [_int_o_igual(u) for u in _lista(self.streamers_aprobados)]
+        for campo in ("canal_publico_id", "mensaje_publico_id", "canal_partido_id", "mensaje_partido_id"):
+            valor = getattr(self, campo)
+            if valor is not None:
+                setattr(self, campo, _int_o_igual(valor))
+        if self.fase_baneo is not None:
+            self.fase_baneo = FaseBaneo.from_json(self.fase_baneo)
+
+
+@dataclass(slots=True, eq=True)
+class Torneo(_Modelo):
+    torneo_uid: str | None = None
+    nombre: str | None = None
+    equipos: list = field(default_factory=list)
+    partidos: list = field(default_factory=list)
+    formato_partidos: str | None = None
+    tabla: dict = field(default_factory=dict)
+    creador: int | None = None
+    logo: str | None = None
+    recursos: dict = field(default_factory=dict)
+    extra: dict = field(default_factory=dict)
+
+    _SIEMPRE = frozenset({"torneo_uid", "nombre", "equipos", "partidos", "formato_partidos", "tabla"})
+
+    def _validar(self):
+        self.equipos = [e for e in _lista(self.equipos) if isinstance(e, dict)]
+        self.partidos = [Partido.from_json(p) for p in _lista(self.partidos)]
+        self.tabla = {str(k): TablaRow.from_json(v) for k, v in _dict(self.tabla).items()}
+        self.recursos = _dict(self.recursos)
+        # los partidos heredan el uid del torneo (en disco no se repite)
+        if self.torneo_uid:
+            for p in self.partidos:
+                if p.torneo_uid is None:
+                    p.torneo_uid = self.torneo_uid
+
+# =============================
+# CONVERSIÓN STORE <-> DISCO - REV
+# =============================
+def nuevo_torneo(torneo_uid: str) -> dict:
+    return Torneo(torneo_uid=torneo_uid).to_json(completo=True)
+
+
+def nuevo_partido(**campos) -> dict:
+    return Partido.from_json(campos).to_json(completo=True)
+
+
+def expandir_torneo(torneo: dict, torneo_uid: str | None = None) -> dict:
+    """Disco -> store: valida una vez y deja las llaves de _SIEMPRE."""
+    if torneo_uid and not torneo.get("torneo_uid"):
+        torneo = {**torneo, "torneo_uid": torneo_uid}
+    return Torneo.from_json(torneo).to_json(completo=True)
+
+
+def compactar_partido(partido: dict, torneo_uid: str | None = None) -> dict:
+    p = Partido.from_json(partido)
+    if torneo_uid is not None and p.torneo_uid == torneo_uid:
+        p.torneo_uid = None  # se recupera del torneo al cargar
+    return p.to_json()
+
+
+def compactar_torneo(torneo: dict, con_partidos: bool = True) -> dict:
+    """Store -> disco: omite defaults (y el uid repetido en cada partido)."""
+    t = Torneo.from_json({k: v for k, v in torneo.items() if k != "partidos"})
+    out = t.to_json()
+    if con_partidos:
+        uid = torneo.get("torneo_uid")
+        out["partidos"] = [compactar_partido(p, uid) for p in torneo.get("partidos", [])]
+    return out
+
+
+def expandir_servidor(srv: dict):
+    torneos = srv.get("torneos")
+    if isinstance(torneos, dict):
+        for uid, torneo in list(torneos.items()):
+            if isinstance(torneo, dict):
+                torneos[uid] = expandir_torneo(torneo, uid)
+
+
+def expandir_data(data: dict):
+    for srv in data.get("servidores", {}).values():
+        if isinstance(srv, dict):
+            expandir_servidor(srv)
+
+
+def compactar_data(data: dict) -> dict:
+    """Copia superficial de `data` con los torneos compactados (para snapshots)."""
+    out = dict(data)
+    out.pop("torneo", None)  # alias del torneo activo: nunca va a disco
+
+    servidores = {}
+    for gid, srv in data.get("servidores", {}).items():
+        srv = dict(srv)
+        if isinstance(srv.get("torneos"), dict):
+            srv["torneos"] = {
+                uid: compactar_torneo(t) if isinstance(t, dict) else t
+                for uid, t in srv["torneos"].items()
+            }
+        servidores[gid] = srv
+    out["servidores"] = servidores
+    return out
@@ -0,0 +1,1019 @@
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import signal
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import modelos
+
+# =============================
+# CONFIG
+# =============================
+DATA_FILE = os.getenv("DATA_FILE", "data.json")
+
+# log append-only con los cambios posteriores al último snapshot (data.json)
+WAL_FILE = os.getenv("DATA_WAL_FILE", DATA_FILE + ".wal")
+
+# al pasar este tamaño el log se compacta en un snapshot nuevo
+WAL_MAX_BYTES = int(os.getenv("DATA_WAL_MAX_BYTES", str(1024 * 1024)))
+
+# backend de persistencia: "json" (data.json + log), "sqlite" o "shards"
+DATA_BACKEND = os.getenv("DATA_BACKEND", "json").lower()
+DB_FILE = os.getenv("DATA_DB_FILE", "data.db")
+SHARDS_DIR = os.getenv("DATA_SHARDS_DIR", "data_shards")
+
+# ventana (segundos) en la que se agrupan los save_data antes de escribir
+GUARDADO_VENTANA_SEG = float(os.getenv("DATA_SAVE_WINDOW", "2.0"))
+
+# llaves de la raíz que NO viajan en el registro "raiz" del log
+# (servidores va por unidades; torneos es legacy -> solo snapshot;
+#  torneo es el viejo alias del torneo activo -> no se persiste)
+_RAIZ_EXCLUIDAS = ("servidores", "torneo", "torneos")
+
+# =============================
+# STORE EN MEMORIA - REV
+# =============================
+# data.json se lee UNA sola vez por proceso. Todos los callbacks trabajan
+# sobre este mismo dict (autoritativo) y el archivo queda solo como destino
+# de persistencia.
+_store = None
+
+
+def base_data() -> dict:
+    return {
+        "rol_admin_torneo_id": None,
+        "rol_streamer_id": None,
+        "torneos": {},       # (legacy) 1 torneo por guild
+        "servidores": {}     # (nuevo) multi torneos por guild
+    }
+
+
+def leer_archivo(path: str = DATA_FILE) -> dict:
+    if not os.path.exists(path):
+        return base_data()
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_store(normalizar=None) -> dict:
+    """
+    Devuelve el dict en memoria. Solo la primera llamada toca el disco
+    (snapshot + replay del log); `normalizar(data)` se aplica una vez.
+    Si `normalizar` devuelve True (migró algo), el resultado se persiste
+    enseguida y se compacta (snapshot sin restos del esquema viejo).
+    """
+    global _store
+    if _store is None:
+        data = _backend.cargar()
+        # disco compacto -> store completo (validado una sola vez)
+        modelos.expandir_data(data)
+        # huellas ANTES de normalizar: así lo migrado cuenta como cambio
+        _inicializar_huellas(data)
+        _store = data
+        if normalizar and normalizar(data):
+            guardar(data)
+            compactar()
+    return _store
+
+
+def descartar_store():
+    """Olvida la copia en memoria (la próxima lectura vuelve a leer el disco)."""
+    global _store
+    _store = None
+    _huellas.clear()
+    _conocidos.clear()
+    _candidatos.clear()
+    _partidos_tocados.clear()
+    _servidores_cargados.clear()
+
+# =============================
+# DETECCIÓN DE CAMBIOS POR UNIDAD - REV
+# =============================
+# El store se parte en unidades: raíz, servidor (sin torneos), cabecera de
+# torneo (+ orden de partidos) y cada partido. Solo se revisan las unidades
+# "candidatas" (tocadas vía get_server / get_torneo_v2 / buscar_partido) y
+# solo se escriben las que de verdad cambiaron (huella del JSON compacto).
+# De un torneo tocado se re-serializan SOLO sus partidos tocados, los nuevos
+# y los que cambiaron de objeto (sorteo); no todos en cada flush.
+_huellas = {}       # (gid, uid) -> {"_": cabecera, pid: (partido, hash)} ; "raiz"/gid -> hash
+_conocidos = {}     # gid -> set(uids) ya persistidos
+_candidatos = set() # ("srv", gid) | ("torneo", gid, uid)
+_partidos_tocados = {}  # (gid, uid) -> set(pids) | None (= todos)
+
+
+def tocar(guild_id, torneo_uid: str | None = None, partido_id=None):
+    """Marca una unidad (servidor, torneo o partido) como posible cambio para el próximo flush."""
+    gid = str(guild_id)
+    if torneo_uid is None:
+        _candidatos.add(("srv", gid))
+        return
+
+    uid = str(torneo_uid)
+    _candidatos.add(("torneo", gid, uid))
+    if partido_id is not None:
+        tocados = _partidos_tocados.setdefault((gid, uid), set())
+        if tocados is not None:
+            tocados.add(str(partido_id))
+
+
+def tocar_partidos(guild_id, torneo_uid: str):
+    """Como tocar(), pero revisa TODOS los partidos (p. ej. tras un rollback)."""
+    gid, uid = str(guild_id), str(torneo_uid)
+    _candidatos.add(("torneo", gid, uid))
+    _partidos_tocados[(gid, uid)] = None
+
+
+def _dump(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _cabecera_torneo(torneo: dict):
+    pids = [str(p.get("id")) for p in torneo.get("partidos", [])]
+    if len(set(pids)) != len(pids):
+        # ids repetidos/None -> no se puede direccionar por partido
+        return {"t": modelos.compactar_torneo(torneo), "orden": None}, []
+
+    cabecera = modelos.compactar_torneo(torneo, con_partidos=False)
+    return {"t": cabecera, "orden": pids}, pids
+
+
+def _registros_torneo(regs: list, gid: str, uid: str, torneo: dict):
+    huellas = _huellas.setdefault((gid, uid), {})
+    _conocidos.setdefault(gid, set()).add(uid)
+
+    tocados = _partidos_tocados.pop((gid, uid), set())
+    todos = tocados is None or "_" not in huellas
+
+    cabecera, pids = _cabecera_torneo(torneo)
+    v = _dump(cabecera)
+    if huellas.get("_") != hash(v):
+        huellas["_"] = hash(v)
+        regs.append({"op": "torneo", "g": gid, "u": uid, "v": v})
+        # cambió el orden: fuera las huellas de partidos que ya no están
+        vivos = set(pids)
+        for pid in [k for k in huellas if k != "_" and k not in vivos]:
+            del huellas[pid]
+
+    for pid, p in zip(pids, torneo.get("partidos", [])):
+        previa = huellas.get(pid)
+        # sin tocar y mismo objeto -> no cambió (se ahorra el JSON)
+        if not todos and pid not in tocados and previa is not None and previa[0] is p:
+            continue
+        v = _dump(modelos.compactar_partido(p, uid))
+        if previa is None or previa[1] != hash(v):
+            regs.append({"op": "partido", "g": gid, "u": uid, "p": pid, "v": v})
+        huellas[pid] = (p, hash(v))
+
+
+def _registros_servidor(regs: list, gid: str, srv: dict):
+    v = _dump({k: val for k, val in srv.items() if k != "torneos"})
+    if _huellas.get(gid) != hash(v):
+        _huellas[gid] = hash(v)
+        regs.append({"op": "srv", "g": gid, "v": v})
+
+    vivos = set(srv.get("torneos", {}))
+    for uid in _conocidos.get(gid, set()) - vivos:
+        regs.append({"op": "del_torneo", "g": gid, "u": uid})
+        _conocidos[gid].discard(uid)
+        _huellas.pop((gid, uid), None)
+
+    for uid in vivos - _conocidos.get(gid, set()):
+        _registros_torneo(regs, gid, uid, srv["torneos"][uid])
+
+
+def _registros_candidatos(regs: list, data: dict, candidatos):
+    servidores = data.get("servidores", {})
+    # servidores primero: así un torneo nuevo/borrado se resuelve una sola vez
+    for clave in sorted(candidatos, key=len):
+        gid = clave[1]
+        srv = servidores.get(gid)
+
+        if srv is None:
+            if gid in _conocidos:
+                regs.append({"op": "del_srv", "g": gid})
+                for uid in _conocidos.pop(gid):
+                    _huellas.pop((gid, uid), None)
+                _huellas.pop(gid, None)
+            continue
+
+        if clave[0] == "srv":
+            _registros_servidor(regs, gid, srv)
+            continue
+
+        uid = clave[2]
+        torneo = srv.get("torneos", {}).get(uid)
+        if torneo is None:
+            _registros_servidor(regs, gid, srv)
+        else:
+            _registros_torneo(regs, gid, uid, torneo)
+
+
+def calcular_cambios(data: dict) -> list:
+    """
+    Devuelve los registros (dicts con "v" ya serializado) de lo que cambió
+    desde el último flush y consume los candidatos.
+    """
+    regs = []
+
+    v = _dump({k: val for k, val in data.items() if k not in _RAIZ_EXCLUIDAS})
+    if _huellas.get("raiz") != hash(v):
+        _huellas["raiz"] = hash(v)
+        regs.append({"op": "raiz", "v": v})
+
+    candidatos = list(_candidatos)
+    _candidatos.clear()
+    _registros_candidatos(regs, data, candidatos)
+    return regs
+
+
+def registros_completos(data: dict) -> list:
+    """Todas las unidades como registros (y huellas al día con `data`)."""
+    _huellas.clear()
+    _conocidos.clear()
+    _candidatos.clear()
+    _partidos_tocados.clear()
+
+    for gid, srv in data.get("servidores", {}).items():
+        _candidatos.add(("srv", gid))
+        for uid in srv.get("torneos", {}):
+            _candidatos.add(("torneo", gid, uid))
+
+    return calcular_cambios(data)
+
+
+def _inicializar_huellas(data: dict):
+    # mismo cálculo que un flush, pero descartando los registros
+    registros_completos(data)
+
+# =============================
+# CARGA BAJO DEMANDA POR SERVIDOR - REV
+# =============================
+# Con backends perezosos (shards) cada guild se lee recién la primera vez
+# que se pide vía get_server. Para el resto es un no-op.
+_servidores_cargados = set()
+
+
+def cargar_servidor(data: dict, guild_id):
+    gid = str(guild_id)
+    if not _backend.perezoso or gid in _servidores_cargados:
+        return
+    _servidores_cargados.add(gid)
+
+    servidores = data.setdefault("servidores", {})
+    if gid in servidores:
+        return
+
+    srv = _backend.cargar_servidor(gid)
+    if srv is None:
+        return
+
+    _registrar_servidor(data, gid, srv)
+
+
+def _registrar_servidor(data: dict, gid: str, srv: dict):
+    modelos.expandir_servidor(srv)
+    data.setdefault("servidores", {})[gid] = srv
+    # huellas solo de ESTE servidor (no consume candidatos ajenos)
+    _registros_candidatos([], data, [("srv", gid)])
+
+
+async def precargar_servidores(data: dict, guild_ids):
+    """
+    Lee en el hilo de I/O los shards de los guilds indicados (p. ej. en
+    on_ready), para que get_server no tenga que leer disco en un callback.
+    """
+    if not _backend.perezoso:
+        return
+
+    loop = asyncio.get_running_loop()
+    for guild_id in guild_ids:
+        gid = str(guild_id)
+        if gid in _servidores_cargados:
+            continue
+
+        srv = await loop.run_in_executor(_io, _backend.cargar_servidor, gid)
+
+        # pudo cargarse sincrónicamente mientras esperábamos
+        if gid in _servidores_cargados:
+            continue
+        _servidores_cargados.add(gid)
+
+        if srv is not None and gid not in data.setdefault("servidores", {}):
+            _registrar_servidor(data, gid, srv)
+
+
+def aplicar_registro(data: dict, reg: dict):
+    """Aplica un registro ya parseado del log (replay)."""
+    op = reg["op"]
+    v = reg.get("v")
+    servidores = data.setdefault("servidores", {})
+
+    if op == "raiz":
+        for k in [k for k in data if k not in _RAIZ_EXCLUIDAS]:
+            del data[k]
+        data.update(v)
+
+    elif op == "srv":
+        srv = servidores.setdefault(reg["g"], {})
+        torneos = srv.get("torneos", {})
+        srv.clear()
+        srv.update(v)
+        srv["torneos"] = torneos
+
+    elif op == "del_srv":
+        servidores.pop(reg["g"], None)
+
+    elif op == "torneo":
+        torneos = servidores.setdefault(reg["g"], {}).setdefault("torneos", {})
+        torneo = v["t"]
+        if v["orden"] is not None:
+            viejos = {str(p.get("id")): p for p in torneos.get(reg["u"], {}).get("partidos", [])}
+            # huecos de partidos nuevos: los rellena el registro "partido" del mismo lote
+            torneo["partidos"] = [viejos.get(pid, {"id": pid}) for pid in v["orden"]]
+        torneos[reg["u"]] = torneo
+
+    elif op == "partido":
+        torneo = servidores.setdefault(reg["g"], {}).setdefault("torneos", {}).setdefault(reg["u"], {})
+        partidos = torneo.setdefault("partidos", [])
+        for i, p in enumerate(partidos):
+            if str(p.get("id")) == reg["p"]:
+                partidos[i] = v
+                break
+        else:
+            partidos.append(v)
+
+    elif op == "del_torneo":
+        servidores.get(reg["g"], {}).get("torneos", {}).pop(reg["u"], None)
+
+# =============================
+# BACKEND JSON: LOG (WAL) + SNAPSHOT - REV
+# =============================
+# Cada flush agrega UNA línea al log con el lote de registros. Un lote
+# cortado a la mitad (crash) no se parsea, se ignora entero y al cargar se
+# corta del archivo (el próximo lote arranca en una línea limpia). La
+# compactación escribe un snapshot nuevo de forma atómica (tmp + replace)
+# y recién después vacía el log.
+class BackendJson:
+    perezoso = False
+
+    def __init__(self, path: str = DATA_FILE, wal_path: str = WAL_FILE):
+        self.path = path
+        self.wal_path = wal_path
+        self.seq = 0
+        self.tam_log = 0  # bytes del log (se lleva en memoria: sin stat en el loop)
+
+    def cargar(self) -> dict:
+        data = leer_archivo(self.path)
+        self.seq = data.pop("wal_seq", 0) or 0
+        snapshot_seq = self.seq
+
+        if not os.path.exists(self.wal_path):
+            return data
+        self.tam_log = os.path.getsize(self.wal_path)
+
+        valido = 0  # bytes hasta la última línea completa
+        with open(self.wal_path, "rb") as f:
+            for linea in f:
+                # sin "\n" final = escritura cortada aunque el JSON parsee
+                if not linea.endswith(b"\n"):
+                    break
+                try:
+                    lote = json.loads(linea)
+                    n, lote_regs = lote["n"], lote["regs"]
+                except (ValueError, KeyError, TypeError):
+                    break  # cola cortada por un crash
+
+                valido += len(linea)
+                if n <= snapshot_seq:
+                    continue  # ya está en el snapshot
+
+                for reg in lote_regs:
+                    aplicar_registro(data, reg)
+                self.seq = n
+
+        if valido < self.tam_log:
+            # ✅ se corta la cola rota: si no, el próximo "ab" se pega al
+            # fragmento y todos los lotes siguientes se pierden al reiniciar
+            os.truncate(self.wal_path, valido)
+            self.tam_log = valido
+
+        return data
+
+    def _linea_lote(self, regs: list) -> str:
+        self.seq += 1
+
+        partes = []
+        for reg in regs:
+            meta = {k: val for k, val in reg.items() if k != "v"}
+            if "v" in reg:
+                partes.append(_dump(meta)[:-1] + ',"v":' + reg["v"] + "}")
+            else:
+                partes.append(_dump(meta))
+
+        return '{"n":%d,"regs":[%s]}\n' % (self.seq, ",".join(partes))
+
+    def preparar(self, regs: list, data: dict):
+        return regs
+
+    def escribir(self, regs: list):
+        linea = self._linea_lote(regs).encode("utf-8")
+        try:
+            with open(self.wal_path, "ab") as f:
+                f.write(linea)
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            # sin medias líneas en el log: el lote se reintenta entero
+            if os.path.exists(self.wal_path):
+                os.truncate(self.wal_path, self.tam_log)
+            raise
+        self.tam_log += len(linea)
+
+    def necesita_compactar(self) -> bool:
+        return self.tam_log > WAL_MAX_BYTES
+
+    def hay_log(self) -> bool:
+        return self.tam_log > 0
+
+    def preparar_snapshot(self, data: dict):
+        # JSON compacto: con indent json usa el encoder en Python puro (lento)
+        # y sin los valores por defecto de los modelos
+        return _dump(modelos.compactar_data(data))
+
+    def compactar(self, texto: str):
+        if texto.startswith("{") and texto != "{}":
+            texto = '{"wal_seq":%d,' % self.seq + texto[1:]
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+        with open(self.wal_path, "w", encoding="utf-8"):
+            pass
+        self.tam_log = 0
+
+# =============================
+# BACKEND SQLITE (OPCIONAL) - REV
+# =============================
+# Un solo archivo en modo WAL con tablas indexadas por
+# (guild_id, torneo_uid, partido_id). Recibe los MISMOS registros que el
+# log JSON y los aplica como upserts/deletes en una transacción por flush.
+# La fase de baneo vive en su propia tabla (es lo que más se escribe).
+_SQL_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS raiz (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    datos TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS servidores (
+    guild_id TEXT PRIMARY KEY,
+    datos TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS torneos (
+    guild_id TEXT NOT NULL,
+    torneo_uid TEXT NOT NULL,
+    datos TEXT NOT NULL,
+    PRIMARY KEY (guild_id, torneo_uid)
+);
+CREATE TABLE IF NOT EXISTS partidos (
+    guild_id TEXT NOT NULL,
+    torneo_uid TEXT NOT NULL,
+    partido_id TEXT NOT NULL,
+    datos TEXT NOT NULL,
+    PRIMARY KEY (guild_id, torneo_uid, partido_id)
+);
+CREATE TABLE IF NOT EXISTS fases_baneo (
+    guild_id TEXT NOT NULL,
+    torneo_uid TEXT NOT NULL,
+    partido_id TEXT NOT NULL,
+    datos TEXT NOT NULL,
+    PRIMARY KEY (guild_id, torneo_uid, partido_id)
+);
+"""
+
+
+class BackendSqlite:
+    perezoso = False
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self.db = None
+
+    def _conectar(self):
+        if self.db is None:
+            # check_same_thread=False: el flush puede correr fuera del hilo principal
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(_SQL_ESQUEMA)
+        return self.db
+
+    def cargar(self) -> dict:
+        db = self._conectar()
+        data = base_data()
+
+        fila = db.execute("SELECT datos FROM raiz WHERE id = 1").fetchone()
+        if fila:
+            aplicar_registro(data, {"op": "raiz", "v": json.loads(fila[0])})
+
+        for gid, datos in db.execute("SELECT guild_id, datos FROM servidores"):
+            aplicar_registro(data, {"op": "srv", "g": gid, "v": json.loads(datos)})
+
+        for gid, uid, datos in db.execute("SELECT guild_id, torneo_uid, datos FROM torneos"):
+            aplicar_registro(data, {"op": "torneo", "g": gid, "u": uid, "v": json.loads(datos)})
+
+        fases = {
+            (gid, uid, pid): json.loads(datos)
+            for gid, uid, pid, datos in db.execute(
+                "SELECT guild_id, torneo_uid, partido_id, datos FROM fases_baneo"
+            )
+        }
+        for gid, uid, pid, datos in db.execute(
+            "SELECT guild_id, torneo_uid, partido_id, datos FROM partidos"
+        ):
+            partido = json.loads(datos)
+            if (gid, uid, pid) in fases:
+                partido["fase_baneo"] = fases[(gid, uid, pid)]
+            aplicar_registro(data, {"op": "partido", "g": gid, "u": uid, "p": pid, "v": partido})
+
+        return data
+
+    def preparar(self, regs: list, data: dict):
+        return regs
+
+    def escribir(self, regs: list):
+        db = self._conectar()
+        with db:
+            for reg in regs:
+                self._aplicar(db, reg)
+
+    def _aplicar(self, db, reg: dict):
+        op = reg["op"]
+
+        if op == "raiz":
+            db.execute("INSERT OR REPLACE INTO raiz (id, datos) VALUES (1, ?)", (reg["v"],))
+
+        elif op == "srv":
+            db.execute(
+                "INSERT OR REPLACE INTO servidores (guild_id, datos) VALUES (?, ?)",
+                (reg["g"], reg["v"])
+            )
+
+        elif op == "del_srv":
+            for tabla in ("servidores", "torneos", "partidos", "fases_baneo"):
+                db.execute(f"DELETE FROM {tabla} WHERE guild_id = ?", (reg["g"],))
+
+        elif op == "torneo":
+            clave = (reg["g"], reg["u"])
+            db.execute(
+                "INSERT OR REPLACE INTO torneos (guild_id, torneo_uid, datos) VALUES (?, ?, ?)",
+                (*clave, reg["v"])
+            )
+
+            # partidos que ya no están en el orden -> fuera
+            orden = json.loads(reg["v"])["orden"]
+            vivos = set(orden or [])
+            existentes = [
+                pid for (pid,) in db.execute(
+                    "SELECT partido_id FROM partidos WHERE guild_id = ? AND torneo_uid = ?", clave
+                )
+            ]
+            for pid in existentes:
+                if pid not in vivos:
+                    self._borrar_partido(db, *clave, pid)
+
+        elif op == "partido":
+            partido = json.loads(reg["v"])
+            fase = partido.pop("fase_baneo", None)
+            clave = (reg["g"], reg["u"], reg["p"])
+
+            db.execute(
+                "INSERT OR REPLACE INTO partidos (guild_id, torneo_uid, partido_id, datos) "
+                "VALUES (?, ?, ?, ?)",
+                (*clave, _dump(partido))
+            )
+            if fase is None:
+                db.execute(
+                    "DELETE FROM fases_baneo WHERE guild_id = ? AND torneo_uid = ? AND partido_id = ?",
+                    clave
+                )
+            else:
+                db.execute(
+                    "INSERT OR REPLACE INTO fases_baneo (guild_id, torneo_uid, partido_id, datos) "
+                    "VALUES (?, ?, ?, ?)",
+                    (*clave, _dump(fase))
+                )
+
+        elif op == "del_torneo":
+            for tabla in ("torneos", "partidos", "fases_baneo"):
+                db.execute(
+                    f"DELETE FROM {tabla} WHERE guild_id = ? AND torneo_uid = ?",
+                    (reg["g"], reg["u"])
+                )
+
+    def _borrar_partido(self, db, gid: str, uid: str, pid: str):
+        for tabla in ("partidos", "fases_baneo"):
+            db.execute(
+                f"DELETE FROM {tabla} WHERE guild_id = ? AND torneo_uid = ? AND partido_id = ?",
+                (gid, uid, pid)
+            )
+
+    def necesita_compactar(self) -> bool:
+        return False
+
+    def hay_log(self) -> bool:
+        return False
+
+    def preparar_snapshot(self, data: dict):
+        return None
+
+    def compactar(self, texto):
+        self._conectar().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+# =============================
+# BACKEND SHARDS (1 ARCHIVO POR TORNEO) - REV
+# =============================
+# DATA_SHARDS_DIR/
+#   _raiz.json                 -> config global (roles)
+#   <guild_id>/_servidor.json  -> datos del server (activo, ...)
+#   <guild_id>/<torneo_uid>.json
+# Un flush reescribe SOLO los archivos de las unidades que cambiaron, así
+# que el I/O por interacción no depende de cuántos servers tenga el bot.
+# Los guilds se leen bajo demanda (cargar_servidor).
+class BackendShards:
+    perezoso = True
+
+    def __init__(self, directorio: str = SHARDS_DIR):
+        self.dir = directorio
+
+    def _ruta(self, *partes) -> str:
+        return os.path.join(self.dir, *partes)
+
+    def _leer(self, ruta: str):
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def cargar(self) -> dict:
+        if not os.path.isdir(self.dir) and os.path.exists(DATA_FILE):
+            return self._migrar_desde_json()
+
+        data = base_data()
+        ruta_raiz = self._ruta("_raiz.json")
+        if os.path.exists(ruta_raiz):
+            aplicar_registro(data, {"op": "raiz", "v": self._leer(ruta_raiz)})
+        return data
+
+    def cargar_servidor(self, gid: str):
+        carpeta = self._ruta(gid)
+        if not os.path.isdir(carpeta):
+            return None
+
+        srv = {}
+        ruta_srv = os.path.join(carpeta, "_servidor.json")
+        if os.path.exists(ruta_srv):
+            srv.update(self._leer(ruta_srv))
+
+        torneos = srv.setdefault("torneos", {})
+        for nombre in sorted(os.listdir(carpeta)):
+            if nombre.endswith(".json") and not nombre.startswith("_"):
+                torneos[nombre[:-5]] = self._leer(os.path.join(carpeta, nombre))
+        return srv
+
+    def _migrar_desde_json(self) -> dict:
+        # primera vez con shards: se parte el data.json (+ log) existente
+        data = BackendJson().cargar()
+        regs = registros_completos(data)
+        self.escribir(self.preparar(regs, data))
+        _servidores_cargados.update(data.get("servidores", {}))
+        return data
+
+    def preparar(self, regs: list, data: dict):
+        """Se corre en el loop: arma el contenido final de cada archivo."""
+        ops = []
+        torneos = []
+        servidores = data.get("servidores", {})
+
+        for reg in regs:
+            op = reg["op"]
+            if op == "raiz":
+                ops.append(("escribir", ("_raiz.json",), reg["v"]))
+            elif op == "srv":
+                ops.append(("escribir", (reg["g"], "_servidor.json"), reg["v"]))
+            elif op == "del_srv":
+                ops.append(("borrar_dir", (reg["g"],), None))
+            elif op == "del_torneo":
+                ops.append(("borrar", (reg["g"], reg["u"] + ".json"), None))
+            elif (reg["g"], reg["u"]) not in torneos:
+                torneos.append((reg["g"], reg["u"]))
+
+        for gid, uid in torneos:
+            torneo = servidores.get(gid, {}).get("torneos", {}).get(uid)
+            if torneo is not None:
+                ops.append(("escribir", (gid, uid + ".json"), _dump(modelos.compactar_torneo(torneo))))
+        return ops
+
+    def escribir(self, ops: list):
+        for accion, partes, contenido in ops:
+            ruta = self._ruta(*partes)
+
+            if accion == "escribir":
+                os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                tmp = ruta + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(contenido)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, ruta)
+
+            elif accion == "borrar":
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+
+            elif accion == "borrar_dir":
+                shutil.rmtree(ruta, ignore_errors=True)
+
+    def necesita_compactar(self) -> bool:
+        return False
+
+    def hay_log(self) -> bool:
+        return False
+
+    def preparar_snapshot(self, data: dict):
+        return None
+
+    def compactar(self, texto):
+        pass
+
+
+def _crear_backend():
+    if DATA_BACKEND == "sqlite":
+        return BackendSqlite()
+    if DATA_BACKEND == "shards":
+        return BackendShards()
+    return BackendJson()
+
+
+_backend = _crear_backend()
+
+
+def compactar():
+    """Pliega lo pendiente en un snapshot nuevo (JSON) / checkpoint (SQLite)."""
+    global _compactacion_programada
+    if _store is None:
+        return None
+
+    # el flush previo no debe volver a programar otra compactación
+    _compactacion_programada = True
+    try:
+        flush()
+    finally:
+        _compactacion_programada = False
+
+    # la foto se serializa en el loop (consistente); el disco, en el hilo de I/O
+    return _enviar(_backend.compactar, _backend.preparar_snapshot(_store))
+
+# =============================
+# IMPORTADOR data.json -> SQLite - REV
+# =============================
+def importar_json_a_sqlite(json_path: str = DATA_FILE, db_path: str = DB_FILE):
+    """
+    Importación de una sola vez: lee data.json (+ su log) y vuelca todo en
+    db_path. Uso: python persistencia.py importar [data.json] [data.db]
+    """
+    data = BackendJson(json_path, json_path + ".wal").cargar()
+    BackendSqlite(db_path).escribir(registros_completos(data))
+    return data
+
+# =============================
+# HILO DE I/O - REV
+# =============================
+# Toda escritura a disco corre en UN hilo dedicado (FIFO, así el orden del
+# log se respeta). En el loop solo se calcula QUÉ escribir; el event loop
+# nunca espera al disco. Sin loop (scripts / apagado) se escribe directo.
+_io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persistencia-io")
+_ultima_tarea = None
+
+
+def _reportar_error(fut):
+    if not fut.cancelled() and fut.exception() is not None:
+        print("❌ Error de persistencia en el hilo de I/O:", repr(fut.exception()))
+
+
+def _esperar_io():
+    # exception() espera sin relanzar: el error ya lo reportó el callback
+    if _ultima_tarea is not None and not _ultima_tarea.done():
+        _ultima_tarea.exception()
+
+
+def _enviar(fn, *args, al_fallar=None):
+    """
+    Corre fn(*args) en el hilo de I/O. Si falla, al_fallar() se llama en el
+    hilo del loop (o enseguida, sin loop).
+    """
+    global _ultima_tarea
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _esperar_io()
+        try:
+            fn(*args)
+        except Exception:
+            if al_fallar is not None:
+                al_fallar()
+            raise
+        return None
+
+    _ultima_tarea = _io.submit(fn, *args)
+    _ultima_tarea.add_done_callback(_reportar_error)
+    if al_fallar is not None:
+        def _revisar(fut):
+            if fut.cancelled() or fut.exception() is None:
+                return
+            try:
+                loop.call_soon_threadsafe(al_fallar)
+            except RuntimeError:
+                al_fallar()  # loop cerrado (apagando): _cerrar() corre después
+        _ultima_tarea.add_done_callback(_revisar)
+    return _ultima_tarea
+
+
+async def esperar_escrituras():
+    """Espera a que el hilo de I/O termine lo encolado hasta ahora."""
+    if _ultima_tarea is not None and not _ultima_tarea.done():
+        await asyncio.wrap_future(_ultima_tarea)
+
+# =============================
+# GUARDADO DIFERIDO (WRITE-BEHIND) - REV
+# =============================
+# save_data() ya no escribe: solo marca el store como sucio y programa UN
+# flush dentro de la ventana. Todas las llamadas que lleguen mientras tanto
+# se agrupan en esa misma escritura.
+_sucio = False
+_flush_programado = None
+
+
+def guardar(data: dict):
+    global _store, _sucio
+    _store = data
+    _sucio = True
+    _programar_flush()
+
+
+async def guardar_async(data: dict):
+    """Como guardar(), pero vuelve recién cuando el cambio está en disco."""
+    guardar(data)
+    flush()
+    await esperar_escrituras()
+
+
+def _programar_flush():
+    global _flush_programado
+    if _flush_programado is not None:
+        return  # ya hay un flush en camino -> se agrupa
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # sin event loop (arranque / scripts) -> escribir directo
+        flush()
+        return
+
+    _flush_programado = loop.call_later(max(GUARDADO_VENTANA_SEG, 0), flush)
+
+
+def flush():
+    """Manda YA lo pendiente al hilo de I/O (si hay algo). Idempotente."""
+    global _sucio, _flush_programado
+    if _flush_programado is not None:
+        _flush_programado.cancel()
+        _flush_programado = None
+
+    if not _sucio or _store is None:
+        return
+
+    _sucio = False
+    regs = calcular_cambios(_store)
+    if regs:
+        _enviar(
+            _backend.escribir,
+            _backend.preparar(regs, _store),
+            al_fallar=lambda: _lote_fallido(regs),
+        )
+
+    if _backend.necesita_compactar():
+        _programar_compactacion()
+
+
+def _lote_fallido(regs: list):
+    """
+    El lote no llegó a disco, pero calcular_cambios ya dio sus huellas por
+    escritas: se olvidan y sus unidades vuelven a ser candidatas, así el
+    próximo flush las reescribe enteras (con lo que haya en el store).
+    """
+    global _sucio
+    for reg in regs:
+        op, gid = reg["op"], reg.get("g")
+        if op == "raiz":
+            _huellas.pop("raiz", None)
+        elif op in ("srv", "del_srv"):
+            _huellas.pop(gid, None)
+            # del_srv: gid "conocido" -> se vuelve a emitir el borrado
+            _conocidos.setdefault(gid, set())
+            _candidatos.add(("srv", gid))
+        else:  # torneo / partido / del_torneo
+            _huellas.pop((gid, reg["u"]), None)
+            _conocidos.setdefault(gid, set()).add(reg["u"])
+            _candidatos.add(("torneo", gid, reg["u"]))
+
+    _sucio = True
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # sin loop: lo reintenta el próximo guardar() / _cerrar()
+    _programar_flush()
+
+
+_compactacion_programada = False
+
+
+def _programar_compactacion():
+    global _compactacion_programada
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # sin loop: se compacta al cerrar
+
+    if _compactacion_programada:
+        return
+    _compactacion_programada = True
+
+    def _correr():
+        global _compactacion_programada
+        _compactacion_programada = False
+        compactar()
+
+    # compactador en segundo plano: corre en su propio turno del loop
+    loop.call_soon(_correr)
+
+
+def _cerrar():
+    # el executor ya no acepta tareas al apagar: todo va sincrónico
+    _esperar_io()
+    flush()
+    if _store is not None and _backend.hay_log():
+        compactar()
+
+
+# ✅ al apagar el bot (bot.run devuelve / sys.exit) no se pierde nada.
+# atexit NO corre con un SIGTERM sin manejar: para eso está instalar_apagado().
+atexit.register(_cerrar)
+
+
+def instalar_apagado(cerrar_bot=None):
+    """
+    SIGTERM / SIGINT en el loop: cierra el bot (`cerrar_bot`, corrutina) y
+    después baja todo a disco con _cerrar(). Sin esto, un SIGTERM mata el
+    proceso sin atexit y se pierde lo que estaba dentro de la ventana.
+    """
+    loop = asyncio.get_running_loop()
+    apagando = False
+
+    async def _apagar():
+        try:
+            if cerrar_bot is not None:
+                await cerrar_bot()
+        finally:
+            _cerrar()
+
+    def _senal():
+        nonlocal apagando
+        if apagando:
+            return
+        apagando = True
+        loop.create_task(_apagar())
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, _senal)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: queda solo atexit
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "importar":
+        origen = sys.argv[2] if len(sys.argv) > 2 else DATA_FILE
+        destino = sys.argv[3] if len(sys.argv) > 3 else DB_FILE
+        importar_json_a_sqlite(origen, destino)
+        print(f"✅ {origen} importado en {destino}")
+    else:
+        print("Uso: python persistencia.py importar [data.json] [data.db]")
@@ -0,0 +1,230 @@
+# =============================
+# TEST: MaquinaBaneo == REGLAS DE ANTES - REV
+# =============================
+# Recorre TODOS los estados alcanzables de la máquina (pools de 3 a 9 mapas)
+# y en cada transición compara contra las reglas que usaba BanMapaButton
+# antes de la máquina (cambiar_turno + evaluar_cierre_fase, copiadas abajo
+# tal cual): turno, contador del Extra, etapa, cierre y ruta.
+# Correr con: python -m pytest -q test_baneo.py
+import copy
+
+import baneo
+
+POOLS = range(3, 10)
+FACCIONES = ("Axis", "Allies")
+
+
+# =============================
+# REGLAS DE ANTES (referencia, NO TOCAR)
+# =============================
+def cambiar_turno(fase):
+    actual = fase["turno_actual"]
+    tipo = fase["equipos"][actual]["tipo"]
+
+    if tipo == "extra":
+        # Extra ban banea DOS VECES
+        fase.setdefault("contador_extra", 0)
+        fase["contador_extra"] += 1
+
+        if fase["contador_extra"] >= 2:
+            fase["contador_extra"] = 0
+            fase["turno_actual"] = "A" if actual == "B" else "B"
+
+    else:
+        # Final ban banea UNA VEZ
+        fase["turno_actual"] = "A" if actual == "B" else "B"
+
+
+def facciones_vivas_en_mapa(fase, mapa):
+    return {f for f in FACCIONES if f"{mapa} {f}" not in fase["baneados"]}
+
+
+def mapas_vivos(fase):
+    return [m for m in fase["map_pool"] if facciones_vivas_en_mapa(fase, m)]
+
+
+def evaluar_cierre_fase(fase):
+    mapas = mapas_vivos(fase)
+
+    if len(mapas) == 1:
+        facciones = facciones_vivas_en_mapa(fase, mapas[0])
+        if len(facciones) == 1:
+            return "RUTA_2_AUTO"
+        if len(facciones) == 2:
+            return "RUTA_2_FINAL_BAN"
+
+    if len(mapas) == 2:
+        if all(len(facciones_vivas_en_mapa(fase, m)) == 1 for m in mapas):
+            return "RUTA_1_FINAL_BAN"
+
+    return None
+
+
+def elegir_antes(fase, eleccion):
+    ganador = fase["coinflip"]["ganador"]
+    perdedor = "B" if ganador == "A" else "A"
+    extra, final = (ganador, perdedor) if eleccion == "extra" else (perdedor, ganador)
+
+    fase["coinflip"]["eleccion"] = eleccion
+    fase["equipos"][extra]["tipo"] = "extra"
+    fase["equipos"][final]["tipo"] = "final"
+    # en los dos casos arranca el equipo Final
+    fase["turno_actual"] = final
+
+
+def banear_antes(fase, mapa, faccion):
+    """Lo que hacía BanMapaButton.callback después de validar el ban."""
+    fase["baneados"].append(f"{mapa} {faccion}")
+    ruta = evaluar_cierre_fase(fase)
+
+    if ruta == "RUTA_2_AUTO":
+        fase["activa"] = False
+    elif ruta:
+        fase["turno_actual"] = "A" if fase["equipos"]["A"]["tipo"] == "final" else "B"
+        fase["estado"] = "FINAL_BAN"
+    elif fase.get("estado", "NORMAL") == "NORMAL":
+        cambiar_turno(fase)
+    return ruta
+
+
+# =============================
+# AYUDAS
+# =============================
+def fase_nueva(n, ganador):
+    pool = [f"M{i}" for i in range(n)]
+    return {
+        "activa": True,
+        "coinflip": {"ganador": ganador, "eleccion": None},
+        "equipos": {"A": {"tipo": None}, "B": {"tipo": None}},
+        "turno_actual": ganador,
+        "map_pool": pool,
+        "baneados": [],
+        "estado": "NORMAL",
+    }
+
+
+def a_bans(fase):
+    """Fase de antes (strings "Mapa Facción") -> fase nueva (máscaras)."""
+    nueva = copy.deepcopy(fase)
+    del nueva["baneados"]
+    nueva["bans"] = {}
+    for clave in fase["baneados"]:
+        mapa, faccion = clave.rsplit(" ", 1)
+        baneo.banear(nueva, mapa, faccion)
+    return nueva
+
+
+def vista(fase):
+    """Lo que decide la máquina, leído de una fase de antes."""
+    return (
+        fase["turno_actual"],
+        fase.get("contador_extra", 0),
+        fase.get("estado", "NORMAL"),
+        fase.get("activa", True),
+    )
+
+
+def bans_posibles(fase):
+    """Un ban de cada tipo: mapa entero vivo (por facción) y mapa a medias."""
+    llenos, medios = [], []
+    for mapa in fase["map_pool"]:
+        vivas = facciones_vivas_en_mapa(fase, mapa)
+        if len(vivas) == 2 and not llenos:
+            llenos = [(mapa, f) for f in FACCIONES]
+        elif len(vivas) == 1 and not medios:
+            medios = [(mapa, next(iter(vivas)))]
+    return [(baneo.BAN_MAPA_LLENO, llenos), (baneo.BAN_MAPA_MEDIO, medios)]
+
+
+def recorrer(n):
+    """
+    BFS sobre los estados de la máquina, con una fase de antes que llega a
+    cada uno. Devuelve (estados visitados, rutas vistas).
+    """
+    m = baneo.maquina(n)
+    pendientes = []
+    visitados = {}
+    rutas = set()
+
+    for ganador in ("A", "B"):
+        inicial = m.inicial(ganador)
+        for accion, eleccion in ((baneo.ELEGIR_EXTRA, "extra"), (baneo.ELEGIR_FINAL, "final")):
+            fase = fase_nueva(n, ganador)
+            elegir_antes(fase, eleccion)
+            estado = m.apply(inicial, accion)
+            assert estado >= 0
+            assert baneo.estado_de_fase(a_bans(fase)) == (m, estado)
+            if estado not in visitados:
+                visitados[estado] = fase
+                pendientes.append(estado)
+
+    while pendientes:
+        estado = pendientes.pop()
+        fase = visitados[estado]
+
+        for accion, bans in bans_posibles(fase):
+            sig = m.apply(estado, accion)
+            if not fase.get("activa", True) or not bans:
+                # fase cerrada o sin mapas de ese tipo: la máquina no deja
+                assert sig == -1, (n, fase, accion)
+                continue
+            assert sig >= 0, (n, fase, accion)
+
+            for mapa, faccion in bans:
+                antes = copy.deepcopy(fase)
+                ruta = banear_antes(antes, mapa, faccion)
+
+                nueva = a_bans(fase)
+                baneo.banear(nueva, mapa, faccion)
+                baneo.volcar_estado(nueva, m, sig)
+
+                assert vista(nueva) == vista(antes), (n, fase, mapa, faccion)
+                assert m.ruta(sig) == ruta, (n, fase, mapa, faccion)
+                assert baneo.estado_de_fase(a_bans(antes)) == (m, sig)
+                rutas.add(ruta)
+
+            if sig not in visitados:
+                visitados[sig] = antes
+                pendientes.append(sig)
+
+    return visitados, rutas
+
+
+# =============================
+# TESTS
+# =============================
+def test_todos_los_estados_como_antes():
+    for n in POOLS:
+        visitados, rutas = recorrer(n)
+        # alcanzó todo lo que la máquina compiló desde las 2 elecciones
+        assert len(visitados) == len(baneo.maquina(n).estados) - 2
+        assert {"RUTA_1_FINAL_BAN", "RUTA_2_FINAL_BAN", "RUTA_2_AUTO"} <= rutas
+
+
+def test_extra_banea_dos_veces_seguidas():
+    m = baneo.maquina(7)
+    # ganador A elige Extra -> arranca B (Final): B, A, A, B, A, A ...
+    estado = m.apply(m.inicial("A"), baneo.ELEGIR_EXTRA)
+    turnos = []
+    for _ in range(6):
+        turnos.append(m.estados[estado].turno)
+        estado = m.apply(estado, baneo.BAN_MAPA_LLENO)
+    assert turnos == ["B", "A", "A", "B", "A", "A"]
+
+
+def test_ruta_1_final_ban_la_decide_el_final():
+    # 3 mapas: medio ban en dos y el tercero entero -> 2 mapas / 1 facción
+    fase = fase_nueva(3, "A")
+    elegir_antes(fase, "final")  # A es Final
+    for mapa, faccion in (("M0", "Axis"), ("M1", "Allies"), ("M2", "Axis"), ("M2", "Allies")):
+        ruta = banear_antes(fase, mapa, faccion)
+    assert ruta == "RUTA_1_FINAL_BAN"
+
+    m, estado = baneo.estado_de_fase(a_bans(fase))
+    assert m.ruta(estado) == "RUTA_1_FINAL_BAN"
+    assert m.estados[estado].turno == "A"
+
+    # el Final banea una facción -> queda 1 mapa / 1 facción -> cierre automático
+    fin = m.apply(estado, baneo.BAN_MAPA_MEDIO)
+    assert m.ruta(fin) == "RUTA_2_AUTO"
+    assert m.apply(fin, baneo.BAN_MAPA_MEDIO) == -1